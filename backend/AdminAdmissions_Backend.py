@@ -1,70 +1,92 @@
 from flask import Blueprint, request, jsonify
-import sqlite3
 import os
-import uuid
 from datetime import datetime, timedelta
-# Import the new mailer function
-from mailer_utils import send_admission_verification_email 
+from db_utils import get_connection as get_db_connection
+from query_utils import QueryParamError, id_list, select_columns, stream_json_array, stream_keyset_page
+from email_queue import enqueue_email, enqueue_emails
+from upload_utils import UploadError, parse_upload_form, upload_spec
+from upload_store import is_object_name
+from Admission_Backend import ADMISSION_UPLOADS
 
 admin_admission_bp = Blueprint('admin_admission_bp', __name__)
 
 # Configuration
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-DB_PATH = os.path.join(BASE_DIR, "smartcity.db")
 UPLOAD_FOLDER = os.path.join(BASE_DIR, 'uploads', 'admissions')
 MAX_FILE_SIZE = 1 * 1024 * 1024  # 1MB
-ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg'}
+# Admin edits may also replace the signature with an image file
+ADMIN_ADMISSION_UPLOADS = {
+    **ADMISSION_UPLOADS,
+    'father_signature': upload_spec(MAX_FILE_SIZE),
+}
 
 if not os.path.exists(UPLOAD_FOLDER):
     os.makedirs(UPLOAD_FOLDER)
 
-def get_db_connection():
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    return conn
-
-def allowed_file(filename):
-    return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
-
-def save_file(file, label):
-    if file and file.filename != '':
-        if not allowed_file(file.filename):
-            return None, "Invalid file type. Only images are allowed."
-        
-        file.seek(0, os.SEEK_END)
-        size = file.tell()
-        file.seek(0)
-        
-        if size > MAX_FILE_SIZE:
-            return None, "File exceeds 1MB limit."
-
-        ext = file.filename.rsplit('.', 1)[1].lower()
-        filename = f"{uuid.uuid4().hex}_{label}.{ext}"
-        file_path = os.path.join(UPLOAD_FOLDER, filename)
-        file.save(file_path)
-        return filename, None
-    return None, None
+# Server-side filters for the admissions list (?status=&admission_class=&date_from=&date_to=&email=)
+ADMISSION_FILTERS = {
+    'status': 'status = ?',
+    'admission_class': 'admission_class = ?',
+    'date_from': 'admission_date >= ?',
+    'date_to': 'admission_date <= ?',
+    'email': 'email = ?',
+}
+
+# Columns that may be requested with ?fields=a,b,c
+ADMISSION_COLUMNS = (
+    'id', 'admission_class', 'admission_date', 'student_name', 'gender', 'dob', 'religion', 'b_form_no',
+    'father_name', 'father_cnic', 'father_occupation', 'mother_name', 'mother_education', 'monthly_income',
+    'contact_no', 'home_address', 'postal_address', 'has_disability', 'major_disability',
+    'additional_disability', 'disability_cert_no', 'emergency_contact', 'prev_school_details',
+    'leaving_reason', 'email', 'father_signature', 'father_cnic_front_path', 'father_cnic_back_path',
+    'student_photos_path', 'b_form_file_path', 'school_cert_file_path', 'status', 'deleted_at',
+)
+# Named projections (?fields=summary): what the admin tables show; the rest comes from GET /admin/admissions/<id>
+ADMISSION_PROJECTIONS = {
+    'summary': ('id', 'student_name', 'admission_class', 'admission_date', 'father_name', 'contact_no',
+                'email', 'status', 'deleted_at'),
+}
 
 # 1. GET ALL ADMISSIONS (ACTIVE ONLY)
 @admin_admission_bp.route("/admin/admissions", methods=["GET"])
 def get_all_admissions():
     try:
-        conn = get_db_connection()
-        rows = conn.execute("SELECT * FROM admissions WHERE deleted_at IS NULL ORDER BY id DESC").fetchall()
-        conn.close()
-        return jsonify([dict(row) for row in rows]), 200
+        columns = select_columns(request.args, ADMISSION_COLUMNS, ADMISSION_PROJECTIONS)
+        return stream_keyset_page("admissions", "deleted_at IS NULL", request.args, ADMISSION_FILTERS, columns)
+    except QueryParamError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+# 1b. GET ONE ADMISSION (full record for the profile / edit modal)
+@admin_admission_bp.route("/admin/admissions/<int:id>", methods=["GET"])
+def get_admission(id):
+    conn = get_db_connection()
+    try:
+        columns = select_columns(request.args, ADMISSION_COLUMNS, ADMISSION_PROJECTIONS)
+        student = conn.execute(f"SELECT {columns} FROM admissions WHERE id = ?", (id,)).fetchone()
+        if not student:
+            return jsonify({"error": "Admission not found"}), 404
+        return jsonify(dict(student)), 200
+    except QueryParamError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    finally:
+        conn.close()
+
 # 2. GET RECYCLE BIN (DELETED WITHIN LAST 30 DAYS)
 @admin_admission_bp.route("/admin/admissions/trash", methods=["GET"])
 def get_trash_admissions():
     try:
+        columns = select_columns(request.args, ADMISSION_COLUMNS, ADMISSION_PROJECTIONS)
         thirty_days_ago = (datetime.now() - timedelta(days=30)).strftime('%Y-%m-%d %H:%M:%S')
-        conn = get_db_connection()
-        rows = conn.execute("SELECT * FROM admissions WHERE deleted_at IS NOT NULL AND deleted_at >= ? ORDER BY deleted_at DESC", (thirty_days_ago,)).fetchall()
-        conn.close()
-        return jsonify([dict(row) for row in rows]), 200
+        return stream_json_array(
+            f"SELECT {columns} FROM admissions WHERE deleted_at IS NOT NULL AND deleted_at >= ? ORDER BY deleted_at DESC",
+            (thirty_days_ago,)
+        )
+    except QueryParamError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -101,12 +123,13 @@ def permanent_delete_admission(id):
         student = conn.execute("SELECT * FROM admissions WHERE id = ?", (id,)).fetchone()
         
         if student:
-            # Delete associated files
+            # Delete associated files. Stored objects may be shared with other records: the
+            # delete trigger releases them and upload_store removes the unreferenced ones
             file_cols = ['student_photos_path', 'b_form_file_path', 'father_cnic_front_path', 
                          'father_cnic_back_path', 'school_cert_file_path', 'father_signature']
             for col in file_cols:
                 file_path = student[col]
-                if file_path and not file_path.startswith('data:'):
+                if file_path and not file_path.startswith('data:') and not is_object_name(file_path):
                     full_path = os.path.join(UPLOAD_FOLDER, file_path)
                     if os.path.exists(full_path):
                         os.remove(full_path)
@@ -127,28 +150,67 @@ def update_status(id):
         new_status = data.get('status')
         conn = get_db_connection()
         conn.execute("UPDATE admissions SET status = ? WHERE id = ?", (new_status, id))
-        conn.commit()
         if new_status == "Verified":
             student = conn.execute("SELECT * FROM admissions WHERE id = ?", (id,)).fetchone()
-            if student:
-                student_data = dict(student)
-                if student_data.get('email'):
-                    send_admission_verification_email(student_data)
+            if student and student['email']:
+                # Committed together with the status; delivered by the outbox workers
+                enqueue_email('admission_verified', student, conn)
+        conn.commit()
         conn.close()
         return jsonify({"message": f"Status updated to {new_status}"}), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+# 5b. BULK STATUS UPDATE
+# Body: {"ids": [1, 2, 3], "status": "Verified"}; one transaction, verification emails are queued
+BULK_STATUSES = ('Pending', 'Verified', 'Rejected')
+
+@admin_admission_bp.route("/admin/admissions/status", methods=["PUT"])
+def bulk_update_status():
+    conn = get_db_connection()
+    try:
+        data = request.get_json(silent=True)
+        ids = id_list(data)
+        new_status = data.get('status')
+        if new_status not in BULK_STATUSES:
+            return jsonify({"error": f"status must be one of {', '.join(BULK_STATUSES)}"}), 400
+
+        placeholders = ','.join('?' * len(ids))
+        conn.execute("BEGIN IMMEDIATE")
+        students = {row['id']: row for row in conn.execute(
+            f"SELECT * FROM admissions WHERE id IN ({placeholders}) AND deleted_at IS NULL", ids)}
+        conn.executemany("UPDATE admissions SET status = ? WHERE id = ?", [(new_status, i) for i in students])
+
+        results = []
+        for admission_id in ids:
+            if admission_id not in students:
+                results.append({"id": admission_id, "ok": False, "message": "Admission not found"})
+                continue
+            results.append({"id": admission_id, "ok": True, "message": f"Status updated to {new_status}"})
+        if new_status == "Verified":
+            enqueue_emails('admission_verified',
+                           [{**dict(s), 'status': new_status} for s in students.values() if s['email']], conn)
+        conn.commit()
+        return jsonify({"updated": len(students), "failed": len(ids) - len(students), "results": results}), 200
+    except QueryParamError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    finally:
+        conn.close()
+
 # 6. UPDATE ADMISSION
 @admin_admission_bp.route("/admin/admissions/<int:id>", methods=["PUT"])
 def update_admission(id):
     try:
         if request.content_type and 'multipart/form-data' in request.content_type:
-            data = request.form
-            files = request.files
+            try:
+                data, uploads = parse_upload_form(ADMIN_ADMISSION_UPLOADS)
+            except UploadError as e:
+                return jsonify({"error": str(e)}), e.status
         else:
             data = request.json
-            files = {}
+            uploads = {}
 
         conn = get_db_connection()
         fields = []
@@ -169,14 +231,9 @@ def update_admission(id):
         }
 
         for file_key, db_column in file_mapping.items():
-            if file_key in files:
-                new_filename, error = save_file(files[file_key], file_key)
-                if error:
-                    conn.close()
-                    return jsonify({"error": f"{file_key}: {error}"}), 400
-                if new_filename:
-                    fields.append(f"{db_column} = ?")
-                    values.append(new_filename)
+            if file_key in uploads:
+                fields.append(f"{db_column} = ?")
+                values.append(uploads[file_key].filename)
 
         if not fields:
             conn.close()
@@ -1,37 +1,75 @@
-from flask import Blueprint, request, jsonify
-import os
-import uuid
-import sqlite3
+from flask import Blueprint, request, jsonify, Response
 from datetime import datetime, timedelta
-from werkzeug.utils import secure_filename
-from mailer_utils import send_verification_email
+from db_utils import get_connection
+from room_snapshot import room_snapshot
+from query_utils import QueryParamError, id_list, select_columns, stream_keyset_page
+from email_queue import enqueue_email, enqueue_emails
+from upload_utils import UploadError, parse_upload_form
+from Booking_Backend import BOOKING_UPLOADS
 
 admin_bp = Blueprint('admin_bp', __name__)
 
-BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-DB_PATH = os.path.join(BASE_DIR, "smartcity.db")
-UPLOAD_FOLDER = os.path.join(BASE_DIR, 'uploads')
+# Server-side filters for the booking lists (?status=&room=&date_from=&date_to=&email=)
+BOOKING_FILTERS = {
+    'status': 'status = ?',
+    'room': 'room_number = ?',
+    'date_from': 'check_in_date >= ?',
+    'date_to': 'check_in_date <= ?',
+    'email': 'email = ?',
+}
 
-if not os.path.exists(UPLOAD_FOLDER):
-    os.makedirs(UPLOAD_FOLDER)
-
-def get_connection():
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    return conn
+# Columns that may be requested with ?fields=a,b,c
+BOOKING_COLUMNS = (
+    'id', 'student_name', 'father_name', 'cnic', 'contact', 'email', 'profession', 'institute_name',
+    'emergency_contact_name', 'emergency_contact', 'address', 'check_in_date', 'security_deposit',
+    'room_number', 'bed_id', 'has_vehicle', 'vehicle_type', 'vehicle_number', 'status',
+    'photo_path', 'cnic_front_path', 'cnic_back_path', 'proof_path', 'voucher_path', 'signature_path',
+    'is_deleted', 'updated_at',
+)
+# Named projections (?fields=summary): what the admin tables show; the rest comes from GET /admin/bookings/<id>
+BOOKING_PROJECTIONS = {
+    'summary': ('id', 'student_name', 'cnic', 'contact', 'email', 'profession', 'institute_name',
+                'check_in_date', 'room_number', 'bed_id', 'status', 'updated_at'),
+}
 
 # --- 1. GET ALL ACTIVE BOOKINGS ---
 @admin_bp.route("/admin/bookings", methods=["GET"])
 def get_bookings():
+    try:
+        columns = select_columns(request.args, BOOKING_COLUMNS, BOOKING_PROJECTIONS)
+        return stream_keyset_page("bookings", "is_deleted = 0", request.args, BOOKING_FILTERS, columns)
+    except QueryParamError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+# --- 1b. SINGLE BOOKING (full record, loaded when a profile / edit form is opened) ---
+@admin_bp.route("/admin/bookings/<int:id>", methods=["GET"])
+def get_booking(id):
     conn = get_connection()
     try:
-        rows = conn.execute("SELECT * FROM bookings WHERE is_deleted=0 ORDER BY id DESC").fetchall()
-        return jsonify([dict(row) for row in rows])
+        columns = select_columns(request.args, BOOKING_COLUMNS, BOOKING_PROJECTIONS)
+        booking = conn.execute(f"SELECT {columns} FROM bookings WHERE id = ?", (id,)).fetchone()
+        if not booking:
+            return jsonify({"error": "Booking not found"}), 404
+        return jsonify(dict(booking)), 200
+    except QueryParamError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
     finally:
         conn.close()
 
+def verify_conflict(booking, bed_status):
+    """Why the booking's bed cannot be marked occupied (None if it can)"""
+    bed_id = booking['bed_id']
+    if bed_status == 'occupied':
+        return f"❌ Conflict: Bed {bed_id} is already occupied. Re-assign bed before verifying."
+    # The hold ran out and the bed was released; it can only be taken back while still free
+    if booking['status'] == 'Expired' and bed_status is not None and bed_status != 'free':
+        return f"❌ Conflict: The hold on bed {bed_id} expired and it has been reserved again. Re-assign bed before verifying."
+    return None
+
 # --- 2. VERIFY RESIDENT ---
 @admin_bp.route("/admin/verify/<int:id>", methods=["PATCH"])
 def verify_resident(id):
@@ -45,17 +83,103 @@ def verify_resident(id):
         bed_id = booking['bed_id']
         check_bed = cursor.execute("SELECT status FROM beds WHERE bed_number=?", (bed_id,)).fetchone()
         
-        if check_bed and check_bed['status'] == 'occupied':
-            return jsonify({
-                "message": f"❌ Conflict: Bed {bed_id} is already occupied. Re-assign bed before verifying."
-            }), 409
+        conflict = verify_conflict(booking, check_bed['status'] if check_bed else None)
+        if conflict:
+            return jsonify({"message": conflict}), 409
 
         cursor.execute("UPDATE bookings SET status='Verified' WHERE id=?", (id,))
         cursor.execute("UPDATE beds SET status='occupied' WHERE bed_number=?", (bed_id,))
         
-        email_sent = send_verification_email(dict(booking))
+        # Queued in this transaction; the outbox workers do the SMTP round trip after commit
+        if booking['email']:
+            enqueue_email('booking_verified', booking, conn)
+        conn.commit()
+        room_snapshot.refresh_beds(conn, [bed_id])
+        return jsonify({"message": "Resident verified successfully!", "email_status": "Queued" if booking['email'] else "No email"})
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    finally:
+        conn.close()
+
+# --- 2b. BULK VERIFY / REJECT ---
+# Body: {"ids": [1, 2, 3]}. All transitions happen in one transaction, emails are queued,
+# and the response reports the outcome per id.
+
+def _load_bulk(conn, ids):
+    """Bookings by id plus the current status of their beds, read inside the bulk transaction"""
+    placeholders = ','.join('?' * len(ids))
+    bookings = {row['id']: row for row in conn.execute(f"SELECT * FROM bookings WHERE id IN ({placeholders})", ids)}
+    bed_ids = list({b['bed_id'] for b in bookings.values() if b['bed_id']})
+    bed_status = {}
+    if bed_ids:
+        placeholders = ','.join('?' * len(bed_ids))
+        bed_status = {row['bed_number']: row['status'] for row in
+                      conn.execute(f"SELECT bed_number, status FROM beds WHERE bed_number IN ({placeholders})", bed_ids)}
+    return bookings, bed_status
+
+@admin_bp.route("/admin/verify/bulk", methods=["PATCH"])
+def bulk_verify_residents():
+    conn = get_connection()
+    try:
+        ids = id_list(request.get_json(silent=True))
+        conn.execute("BEGIN IMMEDIATE")
+        bookings, bed_status = _load_bulk(conn, ids)
+
+        results, verified = [], []
+        for booking_id in ids:
+            booking = bookings.get(booking_id)
+            if not booking:
+                results.append({"id": booking_id, "ok": False, "message": "Booking not found"})
+                continue
+            conflict = verify_conflict(booking, bed_status.get(booking['bed_id']))
+            if conflict:
+                results.append({"id": booking_id, "ok": False, "message": conflict})
+                continue
+            # A later id in this batch on the same bed now sees it as taken
+            bed_status[booking['bed_id']] = 'occupied'
+            verified.append(booking)
+            results.append({"id": booking_id, "ok": True, "message": "Resident verified"})
+
+        conn.executemany("UPDATE bookings SET status='Verified' WHERE id=?", [(b['id'],) for b in verified])
+        conn.executemany("UPDATE beds SET status='occupied' WHERE bed_number=?",
+                         [(b['bed_id'],) for b in verified if b['bed_id']])
+        enqueue_emails('booking_verified', [b for b in verified if b['email']], conn)
         conn.commit()
-        return jsonify({"message": "Resident verified successfully!", "email_status": "Sent" if email_sent else "Failed"})
+        room_snapshot.refresh_beds(conn, [b['bed_id'] for b in verified])
+        return jsonify({"verified": len(verified), "failed": len(ids) - len(verified), "results": results}), 200
+    except QueryParamError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    finally:
+        conn.close()
+
+@admin_bp.route("/admin/reject/bulk", methods=["PATCH"])
+def bulk_reject_bookings():
+    conn = get_connection()
+    try:
+        ids = id_list(request.get_json(silent=True))
+        conn.execute("BEGIN IMMEDIATE")
+        bookings, _ = _load_bulk(conn, ids)
+
+        results, rejected = [], []
+        for booking_id in ids:
+            booking = bookings.get(booking_id)
+            if not booking:
+                results.append({"id": booking_id, "ok": False, "message": "Booking not found"})
+                continue
+            rejected.append(booking)
+            results.append({"id": booking_id, "ok": True, "message": "Application rejected"})
+
+        conn.executemany("UPDATE bookings SET status='Rejected' WHERE id=?", [(b['id'],) for b in rejected])
+        # Same rule as reject_booking: an expired hold already gave the bed back
+        conn.executemany("UPDATE beds SET status='free' WHERE bed_number=?",
+                         [(b['bed_id'],) for b in rejected if b['bed_id'] and b['status'] != 'Expired'])
+        conn.commit()
+        room_snapshot.refresh_beds(conn, [b['bed_id'] for b in rejected])
+        return jsonify({"rejected": len(rejected), "failed": len(ids) - len(rejected), "results": results}), 200
+    except QueryParamError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
     finally:
@@ -67,14 +191,20 @@ def soft_delete_booking(id):
     conn = get_connection()
     cursor = conn.cursor()
     try:
-        res = cursor.execute("SELECT bed_id FROM bookings WHERE id=?", (id,)).fetchone()
-        if res and res['bed_id']:
-            cursor.execute("UPDATE beds SET status='free' WHERE bed_number=?", (res['bed_id'],))
-            
+        res = cursor.execute("SELECT bed_id, status FROM bookings WHERE id=?", (id,)).fetchone()
+        # Same rule as reject_booking, and never free a bed another live booking now holds
+        if res and res['bed_id'] and res['status'] != 'Expired':
+            cursor.execute("""UPDATE beds SET status='free' WHERE bed_number=? AND NOT EXISTS (
+                                  SELECT 1 FROM bookings WHERE bed_id=beds.bed_number AND id<>?
+                                  AND is_deleted=0 AND status IN ('Pending', 'Verified'))""",
+                           (res['bed_id'], id))
+
         # We store the current timestamp to handle 30-day auto-deletion later
         deletion_date = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
         cursor.execute("UPDATE bookings SET is_deleted=1, updated_at=? WHERE id=?", (deletion_date, id))
         conn.commit()
+        if res:
+            room_snapshot.refresh_beds(conn, [res['bed_id']])
         return jsonify({"message": "Resident moved to Recycle Bin"})
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -88,18 +218,17 @@ def get_trashed_bookings():
     conn = get_connection()
     try:
         cursor = conn.cursor()
-        # 1. Check if column exists before running auto-delete to prevent 500 errors
-        cursor.execute("PRAGMA table_info(bookings)")
-        columns = [info[1] for info in cursor.fetchall()]
-        
-        if 'updated_at' in columns:
+        # 1. Auto-delete anything trashed more than 30 days ago (updated_at is guaranteed by migration 001)
+        if not request.args.get('cursor'):
             thirty_days_ago = (datetime.now() - timedelta(days=30)).strftime('%Y-%m-%d %H:%M:%S')
             cursor.execute("DELETE FROM bookings WHERE is_deleted=1 AND updated_at < ?", (thirty_days_ago,))
             conn.commit()
 
-        # 2. Always fetch as list
-        rows = cursor.execute("SELECT * FROM bookings WHERE is_deleted=1 ORDER BY id DESC").fetchall()
-        return jsonify([dict(row) for row in rows]) # This returns [] if empty
+        # 2. Always stream as list
+        columns = select_columns(request.args, BOOKING_COLUMNS, BOOKING_PROJECTIONS)
+        return stream_keyset_page("bookings", "is_deleted = 1", request.args, BOOKING_FILTERS, columns) # [] if empty
+    except QueryParamError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         print(f"Error: {e}")
         return jsonify([]), 500 # Return empty array even on error to prevent frontend crash
@@ -123,6 +252,8 @@ def restore_booking(id):
                 cursor.execute("UPDATE beds SET status='occupied' WHERE bed_number=?", (resident['bed_id'],))
         
         conn.commit()
+        if resident:
+            room_snapshot.refresh_beds(conn, [resident['bed_id']])
         return jsonify({"message": "Resident restored successfully and bed status updated"})
     except Exception as e:
         print(f"Restore error: {e}")
@@ -147,22 +278,15 @@ def permanent_delete(id):
 
 @admin_bp.route("/admin/rooms_detailed", methods=["GET"])
 def get_rooms_detailed():
-    conn = get_connection()
     try:
-        rooms = conn.execute("SELECT * FROM rooms").fetchall()
-        detailed_rooms = []
-        for room in rooms:
-            beds = conn.execute("SELECT * FROM beds WHERE room_id=?", (room["id"],)).fetchall()
-            detailed_rooms.append({
-                "room_id": room["id"],
-                "room_number": room["room_number"],
-                "beds": [dict(b) for b in beds]
-            })
-        return jsonify(detailed_rooms)
+        # Served from the pre-serialized snapshot (see room_snapshot.py)
+        version, payload = room_snapshot.get()
+        response = Response(payload, mimetype="application/json")
+        response.headers["X-Snapshot-Version"] = str(version)
+        response.set_etag(f"{room_snapshot.epoch}-{version}")
+        return response.make_conditional(request)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
-    finally:
-        conn.close()
 
 # --- 6. REJECT BOOKING ---
 @admin_bp.route("/admin/reject/<int:id>", methods=["PATCH"])
@@ -177,11 +301,12 @@ def reject_booking(id):
         # Update booking status to Rejected
         cursor.execute("UPDATE bookings SET status='Rejected' WHERE id=?", (id,))
         
-        # If bed was reserved, free it up
-        if booking['bed_id']:
+        # If bed was reserved, free it up (an expired hold already released it, maybe to someone else)
+        if booking['bed_id'] and booking['status'] != 'Expired':
             cursor.execute("UPDATE beds SET status='free' WHERE bed_number=?", (booking['bed_id'],))
         
         conn.commit()
+        room_snapshot.refresh_beds(conn, [booking['bed_id']])
         return jsonify({"message": "Application rejected successfully"}), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -190,8 +315,10 @@ def reject_booking(id):
 
 @admin_bp.route("/admin/bookings/<int:id>", methods=["PUT"])
 def update_booking(id):
-    data = request.form
-    files = request.files
+    try:
+        data, uploads = parse_upload_form(BOOKING_UPLOADS)
+    except UploadError as e:
+        return jsonify({"error": str(e)}), e.status
     conn = get_connection()
     cursor = conn.cursor()
     try:
@@ -213,12 +340,8 @@ def update_booking(id):
         
         paths = {col: current[col] for col in file_map.values()}
         for key, db_col in file_map.items():
-            if key in files:
-                file = files[key]
-                if file.filename != '':
-                    filename = f"{uuid.uuid4().hex}_{secure_filename(file.filename)}"
-                    file.save(os.path.join(UPLOAD_FOLDER, filename))
-                    paths[db_col] = filename
+            if key in uploads:
+                paths[db_col] = uploads[key].filename
 
         cursor.execute("""
             UPDATE bookings SET 
@@ -242,6 +365,7 @@ def update_booking(id):
         ))
         
         conn.commit()
+        room_snapshot.refresh_beds(conn, [current['bed_id'], new_bed_id])
         return jsonify({"message": "Full Profile and Assignment Updated Successfully"})
     except Exception as e:
         return jsonify({"error": str(e)}), 500
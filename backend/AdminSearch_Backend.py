@@ -0,0 +1,91 @@
+from flask import Blueprint, request, jsonify
+import re
+from db_utils import get_connection
+from query_utils import QueryParamError, page_params, paged_response
+from AdminBookings_Backend import BOOKING_PROJECTIONS
+from AdminAdmissions_Backend import ADMISSION_PROJECTIONS
+
+admin_search_bp = Blueprint('admin_search_bp', __name__)
+
+SEARCH_PAGE_SIZE = 20
+
+# Each searchable kind: FTS table, base table, live-row condition and the columns returned per hit
+SEARCH_SOURCES = {
+    'bookings': {
+        'fts': 'bookings_fts',
+        'table': 'bookings',
+        'active': 't.is_deleted = 0',
+        'columns': BOOKING_PROJECTIONS['summary'],
+    },
+    'admissions': {
+        'fts': 'admissions_fts',
+        'table': 'admissions',
+        'active': 't.deleted_at IS NULL',
+        'columns': ADMISSION_PROJECTIONS['summary'],
+    },
+}
+
+# type=all mixes both kinds, so it returns a common shape
+ALL_COLUMNS = {
+    'bookings': "t.id, t.student_name, t.father_name, t.cnic, t.contact, t.email, t.status",
+    'admissions': "t.id, t.student_name, t.father_name, t.father_cnic AS cnic, t.contact_no AS contact, t.email, t.status",
+}
+
+
+def fts_query(text):
+    """
+    Turn free text into a safe FTS5 query: every word becomes a quoted prefix term
+    and all of them must match. 'ali 0300' -> '"ali"* "0300"*'
+    """
+    words = re.findall(r'\w+', text)
+    if not words:
+        raise QueryParamError("q must contain letters or digits")
+    return ' '.join(f'"{word}"*' for word in words)
+
+
+def search_select(kind, columns):
+    source = SEARCH_SOURCES[kind]
+    return f"""
+        SELECT '{kind}' AS type, {columns}, bm25({source['fts']}) AS rank
+        FROM {source['fts']} JOIN {source['table']} t ON t.id = {source['fts']}.rowid
+        WHERE {source['fts']} MATCH ? AND {source['active']}
+    """
+
+
+# --- RANKED SEARCH OVER RESIDENTS AND APPLICANTS ---
+# GET /admin/search?q=ali&type=bookings|admissions|all&limit=20&cursor=<X-Next-Cursor>
+@admin_search_bp.route("/admin/search", methods=["GET"])
+def admin_search():
+    try:
+        q = request.args.get('q', '').strip()
+        if not q:
+            return jsonify({"error": "q is required"}), 400
+        kind = request.args.get('type', 'all')
+        if kind not in SEARCH_SOURCES and kind != 'all':
+            return jsonify({"error": "type must be bookings, admissions or all"}), 400
+
+        match = fts_query(q)
+        # Hits are ordered by rank, not id, so the cursor is the offset of the next page
+        limit, offset = page_params(request.args, SEARCH_PAGE_SIZE)
+        offset = offset or 0
+
+        if kind == 'all':
+            sql = ' UNION ALL '.join(search_select(k, ALL_COLUMNS[k]) for k in SEARCH_SOURCES)
+            params = [match] * len(SEARCH_SOURCES)
+        else:
+            sql = search_select(kind, ', '.join(f"t.{c}" for c in SEARCH_SOURCES[kind]['columns']))
+            params = [match]
+        sql += " ORDER BY rank LIMIT ? OFFSET ?"
+
+        conn = get_connection()
+        try:
+            rows = conn.execute(sql, params + [limit + 1, offset]).fetchall()
+        finally:
+            conn.close()
+
+        next_cursor = offset + limit if len(rows) > limit else None
+        return paged_response([dict(row) for row in rows[:limit]], next_cursor)
+    except QueryParamError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
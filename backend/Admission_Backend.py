@@ -1,63 +1,36 @@
-from flask import Blueprint, request, jsonify
-import sqlite3
-import os
-import uuid
-from werkzeug.utils import secure_filename
+from flask import Blueprint, jsonify
+from db_utils import get_connection as get_db_connection
+from signature_utils import save_signature
+from upload_utils import UploadError, parse_upload_form, upload_spec
 
 admission_bp = Blueprint('admission_bp', __name__)
 
-# Configuration for file storage
-UPLOAD_FOLDER = 'uploads/admissions'
-ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg'}
+# Documents are kept in the content-addressed upload store (upload_store)
 MAX_FILE_SIZE = 1 * 1024 * 1024  # 1 MB in bytes
 
-if not os.path.exists(UPLOAD_FOLDER):
-    os.makedirs(UPLOAD_FOLDER)
-
-def get_db_connection():
-    conn = sqlite3.connect("smartcity.db")
-    conn.row_factory = sqlite3.Row
-    return conn
-
-def allowed_file(filename):
-    return '.' in filename and \
-           filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
-
-def save_file(file, label):
-    if file and file.filename != '':
-        # Check file extension
-        if not allowed_file(file.filename):
-            raise ValueError(f"Invalid file type for {label}. Only JPG, JPEG, and PNG are allowed.")
-        
-        # Check file size server-side
-        file.seek(0, os.SEEK_END)
-        size = file.tell()
-        file.seek(0) # Reset file pointer after checking size
-        
-        if size > MAX_FILE_SIZE:
-            raise ValueError(f"File {label} exceeds the 1MB size limit.")
-
-        ext = file.filename.rsplit('.', 1)[1].lower()
-        filename = f"{uuid.uuid4().hex}_{label}.{ext}"
-        file_path = os.path.join(UPLOAD_FOLDER, filename)
-        file.save(file_path)
-        return filename
-    return None
+# Document fields (JPG/PNG, checked by magic bytes)
+ADMISSION_DOCUMENTS = ('father_cnic_front', 'father_cnic_back', 'student_photos', 'b_form_file', 'school_cert_file')
+# Photos and CNICs also get thumbnail/preview variants for the admin viewer (image_variants)
+ADMISSION_PREVIEWED = ('father_cnic_front', 'father_cnic_back', 'student_photos')
+ADMISSION_UPLOADS = {key: upload_spec(MAX_FILE_SIZE, variants=key in ADMISSION_PREVIEWED) for key in ADMISSION_DOCUMENTS}
 
 @admission_bp.route("/admission", methods=["POST"])
 def submit_admission():
     try:
-        # 1. Collect Text Data
-        data = request.form
-        
-        # 2. Collect and Save Files with validation
-        files = request.files
+        # 1-2. Collect Text Data and Files; files are streamed into the upload store and validated as they arrive
         try:
-            f_cnic_front = save_file(files.get('father_cnic_front'), 'cnic_front')
-            f_cnic_back = save_file(files.get('father_cnic_back'), 'cnic_back')
-            s_photo = save_file(files.get('student_photos'), 'student_photo')
-            b_form = save_file(files.get('b_form_file'), 'b_form')
-            s_cert = save_file(files.get('school_cert_file'), 'school_cert')
+            data, uploads = parse_upload_form(ADMISSION_UPLOADS)
+        except UploadError as e:
+            return jsonify({"message": str(e)}), e.status
+        saved = {key: upload.filename for key, upload in uploads.items()}
+        f_cnic_front = saved.get('father_cnic_front')
+        f_cnic_back = saved.get('father_cnic_back')
+        s_photo = saved.get('student_photos')
+        b_form = saved.get('b_form_file')
+        s_cert = saved.get('school_cert_file')
+        try:
+            # The canvas arrives as a Base64 data URL; keep only the PNG's filename in the row
+            signature = save_signature(data.get('father_signature'))
         except ValueError as ve:
             return jsonify({"message": str(ve)}), 400
 
@@ -87,7 +60,7 @@ def submit_admission():
             data.get('postal_address'), data.get('has_disability'), data.get('major_disability'),
             data.get('additional_disability'), data.get('disability_cert_no'), data.get('emergency_contact'),
             data.get('prev_school_details'), data.get('leaving_reason'), data.get('email'),
-            data.get('father_signature'), # Storing the Base64 canvas data
+            signature,
             f_cnic_front, f_cnic_back, s_photo, b_form, s_cert
         )
 
@@ -101,13 +74,6 @@ def submit_admission():
         print(f"Submission Error: {str(e)}")
         return jsonify({"message": "Failed to submit application", "error": str(e)}), 500
 
-@admission_bp.route("/admin/admissions", methods=["GET"])
-def get_admissions():
-    conn = get_db_connection()
-    rows = conn.execute("SELECT * FROM admissions ORDER BY id DESC").fetchall()
-    conn.close()
-    return jsonify([dict(row) for row in rows])
-
 @admission_bp.route("/admin/admissions/<int:id>", methods=["DELETE"])
 def delete_admission(id):
     conn = get_db_connection()
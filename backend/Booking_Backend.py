@@ -1,65 +1,65 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, jsonify
 import os
-import uuid
-from werkzeug.utils import secure_filename
-import sqlite3
+from db_utils import get_connection
+from room_snapshot import room_snapshot
+from bed_holds import DEFAULT_HOLD_MINUTES, HOLD_EXPIRES_SQL
+from query_utils import stream_json_array
+from upload_utils import UploadError, parse_upload_form, upload_spec
 
 booking_bp = Blueprint('booking_bp', __name__)
 
-BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-DB_PATH = os.path.join(BASE_DIR, "smartcity.db")
-UPLOAD_FOLDER = os.path.join(BASE_DIR, 'uploads')
+# Per-document cap for hostel applications (phone photos, screen captures)
+MAX_DOCUMENT_SIZE = int(os.getenv("BOOKING_MAX_DOCUMENT_BYTES", str(5 * 1024 * 1024)))
+BOOKING_DOCUMENTS = ('photo', 'cnic_front', 'cnic_back', 'proof_profession', 'fee_voucher', 'signature')
+# Photos, CNICs and vouchers also get thumbnail/preview variants for the admin viewer (image_variants)
+BOOKING_PREVIEWED = ('photo', 'cnic_front', 'cnic_back', 'fee_voucher')
+BOOKING_UPLOADS = {key: upload_spec(MAX_DOCUMENT_SIZE, variants=key in BOOKING_PREVIEWED) for key in BOOKING_DOCUMENTS}
 
-def get_connection():
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    return conn
 @booking_bp.route("/user/bookings/<string:email>", methods=["GET"])
 def get_user_bookings(email):
-    conn = get_connection()
     try:
         # URL decode the email if needed
         from urllib.parse import unquote
         email = unquote(email)
         
-        bookings = conn.execute(
+        return stream_json_array(
             "SELECT * FROM bookings WHERE email = ? AND is_deleted = 0 ORDER BY id DESC", 
             (email,)
-        ).fetchall()
-        return jsonify([dict(booking) for booking in bookings])
+        )
     except Exception as e:
         print(f"Error fetching user bookings: {e}")
         return jsonify({"error": str(e)}), 500
-    finally:
-        conn.close()
 
 @booking_bp.route("/booking", methods=["POST"])
 def add_booking():
-    data = request.form
-    files = request.files
+    # 1. Stream the documents into the upload store (size and type checked while reading)
+    #    before touching the bed; if the booking fails they stay unreferenced and are collected
+    try:
+        data, uploads = parse_upload_form(BOOKING_UPLOADS)
+    except UploadError as e:
+        return jsonify({"message": str(e)}), e.status
+    paths = {key: uploads[key].filename if key in uploads else None for key in BOOKING_DOCUMENTS}
+
     conn = get_connection()
     cursor = conn.cursor()
 
     bed_id = data.get("bed_id")
+    reserved = False
 
     try:
-        # 1. Check if bed is still free (Safety check)
-        check = cursor.execute("SELECT status FROM beds WHERE bed_number=?", (bed_id,)).fetchone()
-        if check and check['status'] != 'free':
+        # 2. Reserve the bed: only one conditional UPDATE can flip it from 'free',
+        #    and committing right away keeps the write lock off the file I/O below.
+        #    The hold expires after the room type's hold length (see bed_holds.py)
+        won = cursor.execute(f"""UPDATE beds SET status='Reserved', hold_expires_at={HOLD_EXPIRES_SQL}
+                                 WHERE bed_number=? AND status='free'""",
+                             (DEFAULT_HOLD_MINUTES, bed_id)).rowcount == 1
+        conn.commit()
+        if not won:
+            if not cursor.execute("SELECT 1 FROM beds WHERE bed_number=?", (bed_id,)).fetchone():
+                return jsonify({"message": "Selected bed does not exist."}), 400
             return jsonify({"message": "This bed was just booked by someone else. Please select another."}), 409
-
-        # 2. Handle File Uploads
-        paths = {}
-        doc_keys = ['photo', 'cnic_front', 'cnic_back', 'proof_profession', 'fee_voucher', 'signature']
-        for key in doc_keys:
-            if key in files:
-                file = files[key]
-                if file.filename != '':
-                    filename = f"{uuid.uuid4().hex}_{secure_filename(file.filename)}"
-                    file.save(os.path.join(UPLOAD_FOLDER, filename))
-                    paths[key] = filename
-                else: paths[key] = None
-            else: paths[key] = None
+        reserved = True
+        room_snapshot.refresh_beds(conn, [bed_id])
 
         # 3. Insert Booking
         cursor.execute("""
@@ -82,13 +82,16 @@ def add_booking():
             paths['proof_profession'], paths['fee_voucher'], paths['signature']
         ))
 
-        # 4. Mark Bed as Reserved
-        cursor.execute("UPDATE beds SET status='Reserved' WHERE bed_number=?", (bed_id,))
-
         conn.commit()
         return jsonify({"message": "Booking submitted successfully!"}), 201
     except Exception as e:
         print(f"CRITICAL ERROR: {e}")
+        if reserved:
+            # Give the bed back for the failed booking
+            conn.rollback()
+            cursor.execute("UPDATE beds SET status='free' WHERE bed_number=? AND status='Reserved'", (bed_id,))
+            conn.commit()
+            room_snapshot.refresh_beds(conn, [bed_id])
         return jsonify({"message": "Internal Server Error", "error": str(e)}), 500
     finally:
         conn.close()
\ No newline at end of file
@@ -1,86 +1,37 @@
 from flask import Blueprint, request, jsonify
-import sqlite3
-import os
 import datetime
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
+from db_utils import get_connection as get_db
+from email_queue import enqueue_emails, enqueue_message
+from mailer_utils import build_fee_reminder_emails
+from smtp_utils import email_configured
+from query_utils import QueryParamError, keyset_query, split_page
 
 ai_fee_bp = Blueprint('ai_fee', __name__)
 
-DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "smartcity.db")
+# Server-side filters for /get-reminders (?status=&fee_type=&date_from=&date_to=)
+REMINDER_FILTERS = {
+    'status': 'status = ?',
+    'fee_type': 'fee_type = ?',
+    'date_from': 'due_date >= ?',
+    'date_to': 'due_date <= ?',
+}
+REMINDER_PAGE_SIZE = 50
 
-# Email Configuration
-EMAIL_ADDRESS = os.getenv("EMAIL_USER")
-EMAIL_PASSWORD = os.getenv("EMAIL_PASS")
-SMTP_SERVER = "smtp.gmail.com"
-SMTP_PORT = 587
-
-def get_db():
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    return conn
-
-def init_fee_tables():
-    """Initialize fee reminder tables"""
-    conn = get_db()
-    cursor = conn.cursor()
-    
-    # Create fee_reminders table
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS fee_reminders (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            student_name TEXT NOT NULL,
-            father_name TEXT NOT NULL,
-            class_room TEXT,
-            amount REAL NOT NULL,
-            due_date TEXT NOT NULL,
-            fee_type TEXT NOT NULL,
-            tone TEXT NOT NULL,
-            email TEXT NOT NULL,
-            phone TEXT,
-            admission_no TEXT,
-            late_fee REAL DEFAULT 0,
-            remarks TEXT,
-            message_subject TEXT,
-            message_body TEXT,
-            status TEXT DEFAULT 'pending',
-            email_sent BOOLEAN DEFAULT 0,
-            email_sent_at TIMESTAMP,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            sent_by TEXT,
-            deleted BOOLEAN DEFAULT 0,
-            deleted_at TIMESTAMP
-        )
-    ''')
-    
-    # Create recycle_bin table for soft deletes
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS fee_recycle_bin (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            original_id INTEGER,
-            student_name TEXT,
-            father_name TEXT,
-            amount REAL,
-            due_date TEXT,
-            fee_type TEXT,
-            email TEXT,
-            phone TEXT,
-            status TEXT,
-            deleted_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            scheduled_delete TIMESTAMP,
-            restored BOOLEAN DEFAULT 0,
-            restored_at TIMESTAMP,
-            FOREIGN KEY (original_id) REFERENCES fee_reminders (id)
-        )
-    ''')
-    
-    conn.commit()
-    conn.close()
-    print("✅ Fee reminder tables initialized successfully.")
-
-# Initialize tables
-init_fee_tables()
+# Campaign recipients per fee_type (enrolled students / verified residents) and the
+# column behind the optional class (School) or room (Hostel) filter
+CAMPAIGN_SOURCES = {
+    'school': {
+        'sql': """SELECT id, student_name, father_name, admission_class, email, contact_no
+                  FROM admissions WHERE deleted_at IS NULL AND status = 'Verified'""",
+        'filter': 'admission_class',
+    },
+    'hostel': {
+        'sql': """SELECT id, student_name, father_name, room_number, bed_id, email, contact
+                  FROM bookings WHERE is_deleted = 0 AND status = 'Verified'""",
+        'filter': 'room_number',
+    },
+}
+CAMPAIGN_TONES = ('formal', 'friendly', 'strict')
 
 def get_institution_name(fee_type):
     """Get institution name based on fee type"""
@@ -312,55 +263,20 @@ def send_email():
         
         institution = get_institution_name(fee_type)
         
-        # Create email message
-        msg = MIMEMultipart('alternative')
-        msg['From'] = f"{institution} <{EMAIL_ADDRESS}>"
-        msg['To'] = recipient_email
-        msg['Subject'] = subject
-        
-        # HTML version
-        html_body = f"""
-        <html>
-        <body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333;">
-            <div style="background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); padding: 20px; text-align: center;">
-                <h1 style="color: white; margin: 0;">{institution}</h1>
-            </div>
-            <div style="padding: 20px;">
-                {body.replace(chr(10), '<br>')}
-            </div>
-        </body>
-        </html>
-        """
-        
-        # Attach parts
-        part1 = MIMEText(body, 'plain')
-        part2 = MIMEText(html_body, 'html')
-        msg.attach(part1)
-        msg.attach(part2)
-        
-        # Send email
-        if EMAIL_ADDRESS and EMAIL_PASSWORD:
-            server = smtplib.SMTP(SMTP_SERVER, SMTP_PORT)
-            server.starttls()
-            server.login(EMAIL_ADDRESS, EMAIL_PASSWORD)
-            server.send_message(msg)
-            server.quit()
-            
-            # Update database
-            if reminder_id:
-                conn = get_db()
-                conn.execute('''
-                    UPDATE fee_reminders 
-                    SET email_sent = 1, email_sent_at = CURRENT_TIMESTAMP, status = 'sent'
-                    WHERE id = ?
-                ''', (reminder_id,))
-                conn.commit()
-                conn.close()
+        # HTML and text versions from the fee_reminder template
+        message = build_fee_reminder_emails([{
+            'message_subject': subject, 'message_body': body, 'institution': institution, 'email': recipient_email
+        }])[0]
+        
+        # Queue it; the outbox workers send it and then mark the reminder as sent
+        if email_configured():
+            outbox_id = enqueue_message(kind='fee_reminder', ref_id=reminder_id, **message)
             
             return jsonify({
                 'success': True,
-                'message': 'Email sent successfully'
-            }), 200
+                'message': 'Email queued for delivery',
+                'outbox_id': outbox_id
+            }), 202
         else:
             return jsonify({'error': 'Email not configured'}), 500
             
@@ -368,6 +284,206 @@ def send_email():
         print(f"Error in send_email: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+# ==================== CAMPAIGNS ====================
+
+def parse_campaign(data):
+    """Validate a campaign request; raises QueryParamError with a message for the client"""
+    if not data:
+        raise QueryParamError("No data provided")
+    fee_type = str(data.get('fee_type', '')).strip().title()
+    if fee_type.lower() not in CAMPAIGN_SOURCES:
+        raise QueryParamError("fee_type must be School or Hostel")
+    try:
+        due_date = datetime.datetime.strptime(str(data.get('due_date', '')), '%Y-%m-%d').strftime('%Y-%m-%d')
+    except ValueError:
+        raise QueryParamError("due_date must be YYYY-MM-DD")
+    try:
+        amount = float(data.get('amount'))
+        late_fee = float(data.get('late_fee') or 0)
+    except (TypeError, ValueError):
+        raise QueryParamError("amount and late_fee must be numbers")
+    if amount <= 0 or late_fee < 0:
+        raise QueryParamError("amount must be positive and late_fee not negative")
+    tone = data.get('tone', 'formal')
+    if tone not in CAMPAIGN_TONES:
+        raise QueryParamError(f"tone must be one of {', '.join(CAMPAIGN_TONES)}")
+    group = data.get('class') if fee_type == 'School' else data.get('room')
+    return {
+        'fee_type': fee_type, 'class_room': str(group).strip() if group else None, 'due_date': due_date,
+        'amount': amount, 'late_fee': late_fee, 'tone': tone, 'remarks': data.get('remarks'),
+        'sent_by': data.get('sent_by', 'admin'),
+    }
+
+def campaign_recipient(fee_type, row):
+    """Map an admission/booking row onto the fields generate_reminder_message expects"""
+    if fee_type == 'School':
+        return {'student_name': row['student_name'], 'father_name': row['father_name'] or 'Parent/Guardian',
+                'class_room': row['admission_class'], 'email': row['email'], 'phone': row['contact_no'],
+                'admission_no': f"NGS-REG-{str(row['id']).zfill(3)}"}
+    return {'student_name': row['student_name'], 'father_name': row['father_name'] or 'Parent/Guardian',
+            'class_room': f"Room {row['room_number']}" if row['room_number'] else None, 'email': row['email'],
+            'phone': row['contact'], 'admission_no': row['bed_id']}
+
+def queue_campaign(conn, campaign_id):
+    """
+    Put the campaign's pending reminders on the email outbox, inside the caller's transaction.
+    The outbox worker pool (EMAIL_WORKERS threads over pooled SMTP sessions) delivers them
+    and marks each reminder sent or failed. Returns how many were queued.
+    """
+    reminders = conn.execute('''
+        SELECT id, email, message_subject, message_body, fee_type FROM fee_reminders
+        WHERE campaign_id = ? AND status = 'pending' AND deleted = 0
+    ''', (campaign_id,)).fetchall()
+    queued = enqueue_emails('fee_reminder', [
+        {**dict(r), 'institution': get_institution_name(r['fee_type'])} for r in reminders
+    ], conn)
+    conn.executemany("UPDATE fee_reminders SET status = 'queued' WHERE id = ?", [(r['id'],) for r in reminders])
+    conn.execute('''
+        UPDATE fee_campaigns SET status = 'sending', started_at = COALESCE(started_at, datetime('now'))
+        WHERE id = ?
+    ''', (campaign_id,))
+    return queued
+
+def campaign_progress(conn, campaign):
+    """Campaign row plus reminder counts per delivery status"""
+    counts = {row['status']: row['n'] for row in conn.execute(
+        "SELECT status, COUNT(*) AS n FROM fee_reminders WHERE campaign_id = ? GROUP BY status", (campaign['id'],))}
+    progress = {status: counts.get(status, 0) for status in ('pending', 'queued', 'sent', 'failed')}
+    done = progress['sent'] + progress['failed']
+    progress['percent'] = round(100 * done / campaign['total'], 1) if campaign['total'] else 100.0
+    finished = campaign['status'] == 'sending' and done >= campaign['total']
+    return {**dict(campaign), 'status': 'done' if finished else campaign['status'], 'progress': progress}
+
+@ai_fee_bp.route('/campaigns', methods=['POST', 'OPTIONS'])
+def create_campaign():
+    """
+    Generate a reminder for every matching admission (School) or booking (Hostel).
+    Body: {fee_type, due_date, amount, class | room, tone, late_fee, remarks, send}
+    send (default true) queues the emails right away; otherwise POST /campaigns/<id>/send later.
+    """
+    if request.method == 'OPTIONS':
+        return '', 200
+        
+    conn = get_db()
+    try:
+        data = request.get_json(silent=True)
+        campaign = parse_campaign(data)
+        send = data.get('send', True)
+        if send and not email_configured():
+            return jsonify({'error': 'Email not configured'}), 500
+        source = CAMPAIGN_SOURCES[campaign['fee_type'].lower()]
+        sql, params = source['sql'], []
+        if campaign['class_room']:
+            sql += f" AND {source['filter']} = ?"
+            params.append(campaign['class_room'])
+        
+        conn.execute("BEGIN IMMEDIATE")
+        recipients = [campaign_recipient(campaign['fee_type'], row) for row in conn.execute(sql, params)]
+        skipped = sum(1 for r in recipients if not r['email'])
+        recipients = [r for r in recipients if r['email']]
+        
+        campaign_id = conn.execute('''
+            INSERT INTO fee_campaigns (fee_type, class_room, due_date, amount, late_fee, tone, remarks,
+                                       total, skipped, sent_by)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (campaign['fee_type'], campaign['class_room'], campaign['due_date'], campaign['amount'],
+              campaign['late_fee'], campaign['tone'], campaign['remarks'], len(recipients), skipped,
+              campaign['sent_by'])).lastrowid
+        
+        # One generated message per student, all saved with a single executemany
+        rows = []
+        for recipient in recipients:
+            reminder = {**campaign, **recipient}
+            message = generate_reminder_message(reminder)
+            rows.append((
+                reminder['student_name'], reminder['father_name'], reminder['class_room'], reminder['amount'],
+                reminder['due_date'], reminder['fee_type'], reminder['tone'], reminder['email'], reminder['phone'],
+                reminder['admission_no'], reminder['late_fee'], reminder['remarks'],
+                message['subject'], message['body'], 'pending', reminder['sent_by'], campaign_id
+            ))
+        conn.executemany('''
+            INSERT INTO fee_reminders (
+                student_name, father_name, class_room, amount, due_date,
+                fee_type, tone, email, phone, admission_no, late_fee,
+                remarks, message_subject, message_body, status, sent_by, campaign_id
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', rows)
+        
+        queued = queue_campaign(conn, campaign_id) if send else 0
+        conn.commit()
+        
+        return jsonify({
+            'success': True,
+            'campaign_id': campaign_id,
+            'total': len(rows),
+            'skipped': skipped,
+            'queued': queued
+        }), 201
+        
+    except QueryParamError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        conn.rollback()
+        print(f"Error in create_campaign: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+    finally:
+        conn.close()
+
+@ai_fee_bp.route('/campaigns/<int:campaign_id>/send', methods=['POST', 'OPTIONS'])
+def send_campaign(campaign_id):
+    """Queue the campaign's reminders that have not been queued yet"""
+    if request.method == 'OPTIONS':
+        return '', 200
+        
+    if not email_configured():
+        return jsonify({'error': 'Email not configured'}), 500
+    conn = get_db()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        if not conn.execute("SELECT 1 FROM fee_campaigns WHERE id = ?", (campaign_id,)).fetchone():
+            conn.rollback()
+            return jsonify({'error': 'Campaign not found'}), 404
+        queued = queue_campaign(conn, campaign_id)
+        conn.commit()
+        return jsonify({'success': True, 'queued': queued}), 202
+    except Exception as e:
+        conn.rollback()
+        print(f"Error in send_campaign: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+    finally:
+        conn.close()
+
+@ai_fee_bp.route('/campaigns/<int:campaign_id>', methods=['GET', 'OPTIONS'])
+def get_campaign(campaign_id):
+    """Campaign settings and delivery progress"""
+    if request.method == 'OPTIONS':
+        return '', 200
+        
+    conn = get_db()
+    try:
+        campaign = conn.execute("SELECT * FROM fee_campaigns WHERE id = ?", (campaign_id,)).fetchone()
+        if not campaign:
+            return jsonify({'error': 'Campaign not found'}), 404
+        return jsonify({'success': True, 'campaign': campaign_progress(conn, campaign)}), 200
+    except Exception as e:
+        print(f"Error in get_campaign: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+    finally:
+        conn.close()
+
+@ai_fee_bp.route('/campaigns', methods=['GET'])
+def list_campaigns():
+    """Most recent campaigns with their progress"""
+    conn = get_db()
+    try:
+        campaigns = conn.execute("SELECT * FROM fee_campaigns ORDER BY id DESC LIMIT 20").fetchall()
+        return jsonify({'success': True, 'campaigns': [campaign_progress(conn, c) for c in campaigns]}), 200
+    except Exception as e:
+        print(f"Error in list_campaigns: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+    finally:
+        conn.close()
+
 @ai_fee_bp.route('/get-reminders', methods=['GET', 'OPTIONS'])
 def get_reminders():
     """Get all reminders (not deleted)"""
@@ -375,19 +491,20 @@ def get_reminders():
         return '', 200
         
     try:
+        sql, params, limit = keyset_query('fee_reminders', 'deleted = 0', request.args,
+                                          REMINDER_FILTERS, default_limit=REMINDER_PAGE_SIZE)
         conn = get_db()
-        reminders = conn.execute('''
-            SELECT * FROM fee_reminders 
-            WHERE deleted = 0 
-            ORDER BY created_at DESC 
-            LIMIT 50
-        ''').fetchall()
+        reminders, next_cursor = split_page(conn.execute(sql, params).fetchall(), limit)
         conn.close()
         
         return jsonify({
             'success': True,
-            'reminders': [dict(r) for r in reminders]
+            'reminders': [dict(r) for r in reminders],
+            'next_cursor': next_cursor
         }), 200
+    
+    except QueryParamError as e:
+        return jsonify({'error': str(e)}), 400
         
     except Exception as e:
         print(f"Error in get_reminders: {str(e)}")
@@ -1,25 +1,37 @@
-from flask import Flask, send_from_directory, jsonify
+from flask import Flask, abort, jsonify, redirect, url_for
 from flask_cors import CORS
 import os
-import sqlite3
 
 # Import both blueprints
 from Booking_Backend import booking_bp
 from AdminBookings_Backend import admin_bp
 from Admission_Backend import admission_bp
 from AdminAdmissions_Backend import admin_admission_bp
+from AdminSearch_Backend import admin_search_bp
 from auth import auth_bp  # NEW: Import auth blueprint
 from ai_fee_reminder import ai_fee_bp
+from db_utils import get_connection, pool_stats
+from migrations import run_migrations
+from bed_holds import start_hold_scheduler
+from email_queue import outbox_stats, start_outbox_workers
+from smtp_utils import transport_stats
+from auth_cache_utils import auth_cache_stats
+from password_utils import hasher_stats
+from last_login import last_login_buffer, start_last_login_flusher
+from upload_utils import MAX_REQUEST_SIZE
+from upload_store import OBJECT_FOLDER, VARIANT_FOLDER, is_object_name
+from image_variants import VARIANTS, ensure_variant, start_variant_workers, variant_stats
+from upload_serving import serve_upload, serving_stats
 
 app = Flask(__name__)
-CORS(app)
+# Let the browser read the paging cursor header on cross-origin list responses
+CORS(app, expose_headers=['X-Next-Cursor'])
 
 # Configuration
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 UPLOAD_FOLDER = os.path.join(BASE_DIR, 'uploads')
 # --- ADDED: Path for Admission Documents ---
 ADMISSION_UPLOAD_FOLDER = os.path.join(UPLOAD_FOLDER, 'admissions')
-DB_PATH = os.path.join(BASE_DIR, "smartcity.db")
 
 # Ensure upload directories exist
 if not os.path.exists(UPLOAD_FOLDER):
@@ -29,6 +41,8 @@ if not os.path.exists(ADMISSION_UPLOAD_FOLDER):
     os.makedirs(ADMISSION_UPLOAD_FOLDER)
 
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
+# Refuse bodies over the cap before reading them; per-document limits are in upload_utils specs
+app.config['MAX_CONTENT_LENGTH'] = MAX_REQUEST_SIZE
 app.config['ADMISSION_UPLOAD_FOLDER'] = ADMISSION_UPLOAD_FOLDER
 
 # Register Blueprints - EACH BLUEPRINT ONLY ONCE
@@ -37,43 +51,142 @@ app.register_blueprint(admission_bp)  # Admission blueprint
 app.register_blueprint(booking_bp)  # Booking blueprint
 app.register_blueprint(admin_bp)  # Admin bookings blueprint
 app.register_blueprint(admin_admission_bp)  # Admin admission blueprint - REGISTERED ONLY ONCE
+app.register_blueprint(admin_search_bp)  # Full-text search over bookings + admissions
 app.register_blueprint(ai_fee_bp, url_prefix='/ai')
 
-def get_connection():
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    return conn
+def start_background_services():
+    """Migrate the database and start the background workers, once per serving process"""
+    # Bring the schema (tables, triggers, indexes) up to date before serving
+    conn = get_connection()
+    run_migrations(conn)
+    conn.close()
+
+    # Release bed holds whose applications were abandoned (see bed_holds.py)
+    start_hold_scheduler()
+    # Deliver queued emails in the background (see email_queue.py)
+    start_outbox_workers()
+    # Write buffered last_login times every few seconds (see last_login.py)
+    start_last_login_flusher()
+    # Render thumbnail/preview variants of uploaded images (see image_variants.py)
+    start_variant_workers()
+
+# `python app.py` runs with the debug reloader: the first process only watches files and
+# restarts a child (WERKZEUG_RUN_MAIN=true) that serves, so only the child starts anything.
+# Imported by a WSGI server or `flask run`, the module is the serving process.
+if __name__ != "__main__" or os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+    start_background_services()
 
 @app.route("/", methods=["GET"])
 def home():
     return "Smart City Backend is Running!"
 
-# Serves standard booking images
+# Connection pool counters (how many connects the reuse is saving)
+@app.route("/admin/db_stats", methods=["GET"])
+def db_stats():
+    return jsonify(pool_stats())
+
+# SMTP session reuse and per-send latency
+@app.route("/admin/smtp_stats", methods=["GET"])
+def smtp_stats():
+    return jsonify(transport_stats())
+
+# Decoded-token and user-record cache behind token_required
+@app.route("/admin/auth_cache_stats", methods=["GET"])
+def auth_cache_stats_view():
+    return jsonify(auth_cache_stats())
+
+# Password-hashing pool: hashes done, rehashes, requests turned away while saturated
+@app.route("/admin/hasher_stats", methods=["GET"])
+def hasher_stats_view():
+    return jsonify(hasher_stats())
+
+# last_login write-behind: logins recorded, written, and still waiting for the flusher
+@app.route("/admin/last_login_stats", methods=["GET"])
+def last_login_stats():
+    return jsonify(last_login_buffer.stats())
+
+# Image previews: rendered in the background vs on first request, failures, backlog
+@app.route("/admin/image_variant_stats", methods=["GET"])
+def image_variant_stats():
+    return jsonify(variant_stats())
+
+# /uploads in-memory cache (hits, bytes held against its budget) and proxy offload mode
+@app.route("/admin/upload_cache_stats", methods=["GET"])
+def upload_cache_stats():
+    return jsonify(serving_stats())
+
+# Email outbox: counts per status, or one message's delivery status
+@app.route("/admin/email_outbox", methods=["GET"])
+def email_outbox():
+    conn = get_connection()
+    try:
+        return jsonify(outbox_stats(conn))
+    finally:
+        conn.close()
+
+@app.route("/admin/email_outbox/<int:message_id>", methods=["GET"])
+def email_outbox_message(message_id):
+    conn = get_connection()
+    try:
+        message = conn.execute(
+            "SELECT id, kind, ref_id, recipient, subject, status, attempts, next_attempt_at, last_error, created_at, sent_at "
+            "FROM email_outbox WHERE id = ?", (message_id,)
+        ).fetchone()
+        if not message:
+            return jsonify({"error": "Message not found"}), 404
+        return jsonify(dict(message))
+    finally:
+        conn.close()
+
+# Serves standard booking images (content-addressed objects, or older uuid-named files);
+# every /uploads response is cacheable forever, see upload_serving.py
 @app.route('/uploads/<filename>')
 def uploaded_file(filename):
-    return send_from_directory(app.config['UPLOAD_FOLDER'], filename)
+    if is_object_name(filename):
+        return serve_upload(OBJECT_FOLDER, filename)
+    return serve_upload(app.config['UPLOAD_FOLDER'], filename)
 
 # --- ADDED: Serves admission documents (CNIC, B-Form, etc.) ---
 @app.route('/uploads/admissions/<filename>')
 def serve_admission_files(filename):
-    return send_from_directory(app.config['ADMISSION_UPLOAD_FOLDER'], filename)
+    if is_object_name(filename):
+        return serve_upload(OBJECT_FOLDER, filename)
+    return serve_upload(app.config['ADMISSION_UPLOAD_FOLDER'], filename)
+
+# Downscaled preview of a stored image (/uploads/thumb/<name>, /uploads/medium/<name>).
+# Documents without a preview redirect to the original; the redirect is not cached, so a
+# render that failed once is retried rather than pinned for the year previews are cached.
+@app.route(f"/uploads/<any({', '.join(VARIANTS)}):variant>/<filename>")
+def serve_upload_variant(variant, filename):
+    path = ensure_variant(filename, variant)
+    if path is None:
+        if not is_object_name(filename):
+            abort(404)
+        response = redirect(url_for('uploaded_file', filename=filename))
+        response.cache_control.no_cache = True
+        return response
+    return serve_upload(VARIANT_FOLDER, os.path.basename(path))
 
 # Room/Bed fetching for the Frontend Grid (Your existing code)
 @app.route("/rooms", methods=["GET"])
 def get_rooms():
     conn = get_connection()
     try:
-        rooms = conn.execute("SELECT * FROM rooms").fetchall()
+        # free_beds is kept current by triggers on beds, so this is a single read
+        rooms = conn.execute(
+            "SELECT id, room_number, total_beds, free_beds, reserved_beds, occupied_beds FROM rooms ORDER BY id"
+        ).fetchall()
         result = []
         for room in rooms:
-            beds = conn.execute("SELECT status FROM beds WHERE room_id=?", (room["id"],)).fetchall()
-            free = sum(1 for b in beds if b["status"] == "free")
+            free = room["free_beds"]
             status = "full" if free == 0 else "free" if free == room["total_beds"] else "partial"
             result.append({
                 "room_id": room["id"], 
                 "room_number": room["room_number"], 
                 "total_beds": room["total_beds"], 
                 "free_beds": free, 
+                "reserved_beds": room["reserved_beds"],
+                "occupied_beds": room["occupied_beds"],
                 "status": status
             })
         return jsonify(result)
@@ -1,24 +1,23 @@
 from flask import Blueprint, request, jsonify, current_app
-from werkzeug.security import generate_password_hash, check_password_hash
 import sqlite3
 import jwt
 import datetime
+import math
 from functools import wraps
-import os
-from otp_utils import save_otp, send_email_otp, verify_otp
+from otp_utils import check_rate_limit, otp_delivery_status, queue_email_otp, save_otp, verify_otp
+from db_utils import get_connection as get_db
+from auth_cache_utils import AUTH_TRUST_CLAIMS, cache_claims, cached_claims, invalidate_user, user_cache
+from password_utils import HashQueueFull, hash_password, password_hasher, verify_password
+from last_login import last_login_buffer, record_login
 
 auth_bp = Blueprint('auth', __name__)
 
-DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "smartcity.db")
-
 # Secret key for JWT
 JWT_SECRET = "your-secret-key-change-this-in-production"
 JWT_ALGORITHM = "HS256"
 
-def get_db():
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    return conn
+# login: every account registered with an email (one per category), through idx_users_email_category
+LOGIN_ACCOUNTS_SQL = "SELECT id, full_name, email, mobile, password, role, category FROM users WHERE email = ? ORDER BY id"
 
 # Token required decorator
 def token_required(f):
@@ -37,8 +36,10 @@ def token_required(f):
             return jsonify({'error': 'Token is missing!'}), 401
         
         try:
-            data = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
-            current_user = get_user_by_id(data['user_id'])
+            data = decode_token(token)
+            current_user = user_from_claims(data) if AUTH_TRUST_CLAIMS else None
+            if current_user is None:
+                current_user = get_cached_user(data['user_id'])
             
             if not current_user:
                 return jsonify({'error': 'User not found!'}), 401
@@ -52,6 +53,20 @@ def token_required(f):
     
     return decorated
 
+def rate_limited(retry_after):
+    """429 response for an exhausted OTP limit"""
+    seconds = math.ceil(retry_after)
+    return jsonify({'error': 'Too many OTP requests. Please try again later.', 'retry_after': seconds}), 429, \
+        {'Retry-After': str(seconds)}
+
+def hashing_busy():
+    """503 when the password-hashing pool is saturated (see password_utils)"""
+    return jsonify({'error': 'Server is busy. Please try again in a moment.'}), 503, {'Retry-After': '1'}
+
+def otp_queued(message, email, delivery_id):
+    """202 with the outbox id to poll at /auth/otp-status/<id>; 200 in development mode (code printed)"""
+    return jsonify({'message': message, 'email': email, 'delivery_id': delivery_id}), 202 if delivery_id else 200
+
 def get_user_by_id(user_id):
     conn = get_db()
     user = conn.execute(
@@ -61,6 +76,38 @@ def get_user_by_id(user_id):
     conn.close()
     return dict(user) if user else None
 
+def save_rehashed_password(user_id, old_hash, new_hash):
+    """Store a hash upgraded to the current parameters, unless the password changed meanwhile"""
+    conn = get_db()
+    conn.execute('UPDATE users SET password = ? WHERE id = ? AND password = ?', (new_hash, user_id, old_hash))
+    conn.commit()
+    conn.close()
+
+def decode_token(token):
+    """Verified claims of a JWT; a token seen before is not decoded again until it expires"""
+    data = cached_claims(token)
+    if data is None:
+        data = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
+        cache_claims(token, data)
+    return data
+
+def get_cached_user(user_id):
+    """get_user_by_id through the TTL+LRU user cache; callers get their own copy"""
+    user = user_cache.get(user_id)
+    if user is None:
+        user = get_user_by_id(user_id)
+        if not user:
+            return None
+        user_cache.set(user_id, user)
+    return dict(user)
+
+def user_from_claims(data):
+    """current_user from the token alone (AUTH_TRUST_CLAIMS); None if the token lacks the claims"""
+    if not all(key in data for key in ('user_id', 'email', 'role', 'category')):
+        return None
+    return {'id': data['user_id'], 'email': data['email'], 'role': data['role'],
+            'category': data['category'], 'categories': data.get('categories', [data['category']])}
+
 # ==================== REGISTRATION WITH OTP ====================
 
 @auth_bp.route('/send-registration-otp', methods=['POST'])
@@ -88,21 +135,34 @@ def send_registration_otp():
         if existing:
             return jsonify({'error': f'This email is already registered for {category}'}), 409
         
+        retry_after = check_rate_limit(email, 'registration', request.remote_addr)
+        if retry_after:
+            return rate_limited(retry_after)
+        
         # Generate and save OTP
         otp_code = save_otp(email, None, 'registration')
         
-        # Send OTP via email
-        otp_sent = send_email_otp(email, otp_code, 'registration')
-        
-        if otp_sent:
-            return jsonify({'message': 'OTP sent successfully', 'email': email}), 200
-        else:
-            return jsonify({'error': 'Failed to send OTP. Please try again.'}), 500
+        # Send OTP via email (delivered in the background)
+        delivery_id = queue_email_otp(email, otp_code, 'registration')
+        return otp_queued('OTP sent successfully', email, delivery_id)
             
     except Exception as e:
         print(f"Error in send_registration_otp: {e}")
         return jsonify({'error': str(e)}), 500
 
+# ==================== OTP DELIVERY STATUS ====================
+
+@auth_bp.route('/otp-status/<int:delivery_id>', methods=['GET'])
+def otp_status(delivery_id):
+    """Poll an OTP email queued by the send-OTP endpoints: pending, sending, sent or failed"""
+    try:
+        status = otp_delivery_status(delivery_id)
+        if not status:
+            return jsonify({'error': 'Delivery not found'}), 404
+        return jsonify({'delivery_id': delivery_id, **status}), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 # ==================== VERIFY REGISTRATION OTP AND COMPLETE REGISTRATION ====================
 
 @auth_bp.route('/verify-registration-otp', methods=['POST'])
@@ -123,7 +183,7 @@ def verify_registration_otp():
             return jsonify({'error': otp_verification['message']}), 400
         
         # Hash password
-        hashed_password = generate_password_hash(data['password'])
+        hashed_password = hash_password(data['password'])
         
         conn = get_db()
         try:
@@ -189,6 +249,8 @@ def verify_registration_otp():
         finally:
             conn.close()
             
+    except (HashQueueFull, TimeoutError):
+        return hashing_busy()
     except Exception as e:
         print(f"Registration error: {e}")
         return jsonify({'error': str(e)}), 500
@@ -205,6 +267,10 @@ def forgot_password():
         if not email:
             return jsonify({'error': 'Email is required'}), 400
         
+        retry_after = check_rate_limit(email, 'password_reset', request.remote_addr)
+        if retry_after:
+            return rate_limited(retry_after)
+        
         conn = get_db()
         
         # Find user
@@ -217,15 +283,12 @@ def forgot_password():
         # Generate and save OTP
         otp_code = save_otp(email, None, 'password_reset', user['id'])
         
-        # Send OTP via email
-        otp_sent = send_email_otp(email, otp_code, 'password_reset')
+        # Send OTP via email (delivered in the background)
+        delivery_id = queue_email_otp(email, otp_code, 'password_reset')
         
         conn.close()
         
-        if otp_sent:
-            return jsonify({'message': 'Password reset OTP sent successfully', 'email': email}), 200
-        else:
-            return jsonify({'error': 'Failed to send OTP. Please try again.'}), 500
+        return otp_queued('Password reset OTP sent successfully', email, delivery_id)
             
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -291,14 +354,17 @@ def reset_password():
             return jsonify({'error': 'Invalid reset token'}), 401
         
         # Update password
-        hashed_password = generate_password_hash(new_password)
+        hashed_password = hash_password(new_password)
         conn = get_db()
         conn.execute('UPDATE users SET password = ? WHERE id = ?', (hashed_password, user_id))
         conn.commit()
         conn.close()
+        invalidate_user(user_id)
         
         return jsonify({'message': 'Password reset successfully'}), 200
         
+    except (HashQueueFull, TimeoutError):
+        return hashing_busy()
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -312,16 +378,16 @@ def send_profile_update_otp(current_user):
         data = request.get_json()
         email = data.get('email', current_user['email'])
         
+        retry_after = check_rate_limit(email, 'update_profile', request.remote_addr)
+        if retry_after:
+            return rate_limited(retry_after)
+        
         # Generate and save OTP
         otp_code = save_otp(email, None, 'update_profile', current_user['id'])
         
-        # Send OTP via email
-        otp_sent = send_email_otp(email, otp_code, 'update_profile')
-        
-        if otp_sent:
-            return jsonify({'message': 'Profile update OTP sent successfully'}), 200
-        else:
-            return jsonify({'error': 'Failed to send OTP. Please try again.'}), 500
+        # Send OTP via email (delivered in the background)
+        delivery_id = queue_email_otp(email, otp_code, 'update_profile')
+        return otp_queued('Profile update OTP sent successfully', email, delivery_id)
             
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -381,11 +447,16 @@ def update_profile(current_user):
             
             # Verify current password
             user = conn.execute('SELECT password FROM users WHERE id = ?', (current_user['id'],)).fetchone()
-            if not check_password_hash(user['password'], data['current_password']):
+            try:
+                password_ok = verify_password(user['password'], data['current_password'])
+                hashed_password = hash_password(data['new_password']) if password_ok else None
+            except (HashQueueFull, TimeoutError):
+                conn.close()
+                raise
+            if not password_ok:
                 conn.close()
                 return jsonify({'error': 'Current password is incorrect'}), 401
             
-            hashed_password = generate_password_hash(data['new_password'])
             updates.append('password = ?')
             params.append(hashed_password)
         
@@ -393,6 +464,7 @@ def update_profile(current_user):
             params.append(current_user['id'])
             conn.execute(f'UPDATE users SET {", ".join(updates)} WHERE id = ?', params)
             conn.commit()
+            invalidate_user(current_user['id'])
         
         # Get updated user info
         updated_user = conn.execute(
@@ -416,6 +488,8 @@ def update_profile(current_user):
             'user': dict(updated_user)
         }), 200
         
+    except (HashQueueFull, TimeoutError):
+        return hashing_busy()
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -436,39 +510,29 @@ def login():
         if not selected_category:
             return jsonify({'error': 'Please select a category'}), 400
         
+        # Every account for this email in one query: the SPECIFIC user for the selected
+        # category plus all categories (for UI purposes)
         conn = get_db()
-        
-        # Get the SPECIFIC user for this email AND category
-        user = conn.execute(
-            "SELECT * FROM users WHERE email = ? AND category = ?", 
-            (data['email'], selected_category)
-        ).fetchone()
+        accounts = conn.execute(LOGIN_ACCOUNTS_SQL, (data['email'],)).fetchall()
+        conn.close()
+        user = next((u for u in accounts if u['category'] == selected_category), None)
         
         if not user:
-            conn.close()
             # Check if email exists for other category
-            other_user = conn.execute(
-                "SELECT category FROM users WHERE email = ?", 
-                (data['email'],)
-            ).fetchone()
-            
-            if other_user:
-                return jsonify({'error': f'This email is registered for {other_user["category"]}. Please select the correct category.'}), 401
+            if accounts:
+                return jsonify({'error': f'This email is registered for {accounts[0]["category"]}. Please select the correct category.'}), 401
             else:
                 return jsonify({'error': 'Invalid credentials'}), 401
         
-        # Check password for this specific user
-        if check_password_hash(user['password'], data['password']):
-            # Update last login
-            conn.execute('UPDATE users SET last_login = CURRENT_TIMESTAMP WHERE id = ?', (user['id'],))
-            conn.commit()
+        # Check password for this specific user; no connection is held while hashing
+        if verify_password(user['password'], data['password']):
+            if password_hasher.needs_rehash(user['password']):
+                password_hasher.rehash_in_background(data['password'], lambda new_hash: save_rehashed_password(
+                    user['id'], user['password'], new_hash))
             
-            # Get all categories for this email (for UI purposes)
-            all_users = conn.execute(
-                "SELECT category FROM users WHERE email = ?", 
-                (data['email'],)
-            ).fetchall()
-            categories = [u['category'] for u in all_users]
+            # Update last login (buffered, written in the background by last_login.py)
+            record_login(user['id'])
+            categories = [u['category'] for u in accounts]
             
             token = jwt.encode({
                 'user_id': user['id'],
@@ -479,8 +543,6 @@ def login():
                 'exp': datetime.datetime.utcnow() + datetime.timedelta(days=1)
             }, JWT_SECRET, algorithm=JWT_ALGORITHM)
             
-            conn.close()
-            
             return jsonify({
                 'message': 'Login successful',
                 'token': token,
@@ -495,9 +557,10 @@ def login():
                 }
             }), 200
         
-        conn.close()
         return jsonify({'error': 'Invalid password'}), 401
         
+    except (HashQueueFull, TimeoutError):
+        return hashing_busy()
     except Exception as e:
         print(f"Login error: {e}")
         return jsonify({'error': str(e)}), 500
@@ -515,7 +578,10 @@ def get_current_user(current_user):
         (current_user['id'],)
     ).fetchone()
     conn.close()
-    return jsonify(dict(user)), 200
+    user = dict(user)
+    # A login the flusher has not written yet
+    user['last_login'] = last_login_buffer.pending(user['id']) or user['last_login']
+    return jsonify(user), 200
 
 # ==================== CREATE ADMIN (ADMIN ONLY) ====================
 
@@ -532,7 +598,7 @@ def create_admin(current_user):
         if not all(field in data for field in required_fields):
             return jsonify({'error': 'Missing required fields'}), 400
         
-        hashed_password = generate_password_hash(data['password'])
+        hashed_password = hash_password(data['password'])
         
         conn = get_db()
         try:
@@ -550,6 +616,7 @@ def create_admin(current_user):
             
             conn.commit()
             user_id = cursor.lastrowid
+            invalidate_user(user_id)
             
             return jsonify({
                 'message': 'Admin created successfully',
@@ -567,5 +634,7 @@ def create_admin(current_user):
         finally:
             conn.close()
             
+    except (HashQueueFull, TimeoutError):
+        return hashing_busy()
     except Exception as e:
         return jsonify({'error': str(e)}), 500
\ No newline at end of file
@@ -0,0 +1,88 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+# Decoded tokens and user records are kept this long (seconds) and up to this many entries each.
+# The cache is per process: a change made through another worker is seen after at most the TTL.
+AUTH_CACHE_TTL = float(os.getenv("AUTH_CACHE_TTL", "60"))
+AUTH_CACHE_SIZE = int(os.getenv("AUTH_CACHE_SIZE", "4096"))
+# AUTH_TRUST_CLAIMS=1: build current_user from the verified token claims only (no users lookup).
+# Role/category changes then apply when the user gets a new token (login, update_profile).
+AUTH_TRUST_CLAIMS = os.getenv("AUTH_TRUST_CLAIMS", "0") == "1"
+
+
+class TTLCache:
+    """Thread-safe LRU mapping whose entries also expire after a TTL"""
+
+    def __init__(self, maxsize=AUTH_CACHE_SIZE, ttl=AUTH_CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()  # key -> (expires_at, value), least recently used first
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                if entry[0] > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return entry[1]
+                del self._data[key]
+            self.misses += 1
+            return None
+
+    def set(self, key, value, ttl=None):
+        """Store value; ttl (seconds) may only shorten the cache-wide TTL"""
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if ttl <= 0 or self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        with self._lock:
+            return {'size': len(self._data), 'hits': self.hits, 'misses': self.misses}
+
+
+# token string -> decoded claims, expiring no later than the token's own exp
+token_cache = TTLCache()
+# user id -> users row as returned by auth.get_user_by_id
+user_cache = TTLCache()
+
+
+def cached_claims(token):
+    return token_cache.get(token)
+
+
+def cache_claims(token, claims):
+    exp = claims.get('exp')
+    token_cache.set(token, claims, None if exp is None else exp - time.time())
+
+
+def invalidate_user(user_id):
+    """Drop the cached users row after a write so the next request reloads it"""
+    user_cache.pop(user_id)
+
+
+def auth_cache_stats():
+    return {
+        'trust_claims': AUTH_TRUST_CLAIMS,
+        'ttl_seconds': AUTH_CACHE_TTL,
+        'tokens': token_cache.stats(),
+        'users': user_cache.stats(),
+    }
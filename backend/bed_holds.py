@@ -0,0 +1,95 @@
+import os
+import threading
+from db_utils import get_connection
+from room_snapshot import room_snapshot
+
+# Used when a room's type has no row in room_types (minutes)
+DEFAULT_HOLD_MINUTES = int(os.getenv("BED_HOLD_MINUTES", "2880"))
+# Upper bound on how long the scheduler sleeps between sweeps; 0 disables it
+SWEEP_INTERVAL_SECONDS = float(os.getenv("BED_HOLD_SWEEP_SECONDS", "60"))
+
+# Expiry for a bed being reserved, from its room's type (bind DEFAULT_HOLD_MINUTES)
+HOLD_EXPIRES_SQL = """datetime('now', '+' || COALESCE((
+    SELECT t.hold_minutes FROM rooms r JOIN room_types t ON t.name = r.room_type WHERE r.id = beds.room_id
+), ?) || ' minutes')"""
+
+
+def release_expired_holds(conn):
+    """
+    Free every bed whose hold has run out and mark its pending booking 'Expired'.
+
+    Returns the released bed numbers. Expired holds are found through
+    idx_beds_hold_expiry, so a sweep with nothing due is a single index probe.
+    """
+    # IMMEDIATE so a verify/reject racing with the sweep is either fully before or after it
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        beds = [row['bed_number'] for row in conn.execute(
+            "SELECT bed_number FROM beds WHERE hold_expires_at <= datetime('now')")]
+        if beds:
+            placeholders = ','.join('?' * len(beds))
+            conn.execute(f"""UPDATE bookings SET status = 'Expired'
+                             WHERE bed_id IN ({placeholders}) AND status = 'Pending' AND is_deleted = 0""", beds)
+            # trg_beds_clear_hold drops the expiry and the counter triggers move the bed to free_beds
+            conn.execute(f"UPDATE beds SET status = 'free' WHERE bed_number IN ({placeholders})", beds)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    room_snapshot.refresh_beds(conn, beds)
+    return beds
+
+
+def seconds_until_next_expiry(conn):
+    """Seconds until the earliest active hold expires, or None when nothing is held"""
+    row = conn.execute("""
+        SELECT (julianday(MIN(hold_expires_at)) - julianday('now')) * 86400
+        FROM beds WHERE hold_expires_at IS NOT NULL
+    """).fetchone()
+    return row[0]
+
+
+class HoldExpiryScheduler(threading.Thread):
+    """
+    Background thread that releases expired bed holds.
+
+    It sleeps until the earliest hold is due (never longer than the sweep
+    interval, so holds created in the meantime are picked up) and then sweeps.
+    """
+
+    def __init__(self, interval=SWEEP_INTERVAL_SECONDS):
+        super().__init__(name="bed-hold-expiry", daemon=True)
+        self.interval = interval
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.is_set():
+            wait = self.interval
+            conn = get_connection()
+            try:
+                released = release_expired_holds(conn)
+                if released:
+                    print(f"⏰ Released {len(released)} expired bed hold(s): {', '.join(released)}")
+                due = seconds_until_next_expiry(conn)
+                if due is not None:
+                    wait = min(max(due, 1), self.interval)
+            except Exception as e:
+                print(f"⚠️ Bed hold sweep failed: {e}")
+            finally:
+                conn.close()
+            self._stop_event.wait(wait)
+
+    def stop(self):
+        self._stop_event.set()
+
+
+_scheduler = None
+
+
+def start_hold_scheduler():
+    """Start the expiry thread once per process (no-op when BED_HOLD_SWEEP_SECONDS=0)"""
+    global _scheduler
+    if _scheduler is None and SWEEP_INTERVAL_SECONDS > 0:
+        _scheduler = HoldExpiryScheduler()
+        _scheduler.start()
+    return _scheduler
@@ -0,0 +1,106 @@
+"""
+Cost of the auth check on an admin_required endpoint: the old decode + users query per
+request, the cached token/user path, and AUTH_TRUST_CLAIMS (claims only, no lookup).
+
+Run from the backend folder:  python benchmarks/bench_auth_check.py [--requests 5000]
+"""
+import argparse
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+parser = argparse.ArgumentParser(description=__doc__)
+parser.add_argument('--requests', type=int, default=5000)
+args = parser.parse_args()
+
+TMP_DIR = tempfile.mkdtemp(prefix="smartcity_bench_")
+os.environ.update({"SMARTCITY_DB_PATH": os.path.join(TMP_DIR, "auth.db"), "AUTH_CACHE_TTL": "60"})
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import datetime
+import jwt
+from flask import Flask, jsonify
+import auth
+from auth import JWT_ALGORITHM, JWT_SECRET, invalidate_user, user_cache
+from auth_cache_utils import auth_cache_stats, token_cache
+from db_utils import get_connection
+from decorators import admin_required
+from migrations import run_migrations
+
+
+def seed():
+    conn = get_connection()
+    run_migrations(conn, verbose=False)
+    user_id = conn.execute("INSERT INTO users (full_name, email, password, role, category) "
+                           "VALUES ('Admin', 'admin@example.com', 'x', 'admin', 'hostel')").lastrowid
+    conn.commit()
+    conn.close()
+    return jwt.encode({'user_id': user_id, 'email': 'admin@example.com', 'role': 'admin', 'category': 'hostel',
+                       'exp': datetime.datetime.utcnow() + datetime.timedelta(days=1)},
+                      JWT_SECRET, algorithm=JWT_ALGORITHM), user_id
+
+
+def measure(app, token, n, before_each=None):
+    """Per-request seconds spent in the decorator stack (the view itself returns at once)"""
+    samples = []
+    with app.test_request_context('/admin/ping', headers={'Authorization': f'Bearer {token}'}):
+        view = app.view_functions['ping']
+        for _ in range(n):
+            if before_each:
+                before_each()
+            start = time.perf_counter()
+            response = view()
+            samples.append(time.perf_counter() - start)
+    assert response.json == {'ok': True}, response
+    return samples
+
+
+def us(samples):
+    samples.sort()
+    return f"{statistics.median(samples) * 1e6:9.1f} {samples[int(len(samples) * 0.99) - 1] * 1e6:9.1f}"
+
+
+def main():
+    try:
+        token, user_id = seed()
+        app = Flask(__name__)
+
+        @app.route('/admin/ping')
+        @admin_required
+        def ping(current_user):
+            return jsonify({'ok': True})
+
+        def uncached():
+            token_cache.clear()
+            user_cache.clear()
+
+        cold = measure(app, token, args.requests, uncached)
+        warm = measure(app, token, args.requests)
+        auth.AUTH_TRUST_CLAIMS = True
+        claims = measure(app, token, args.requests)
+        auth.AUTH_TRUST_CLAIMS = False
+
+        print(f"{'auth check':<28} {'p50 (us)':>9} {'p99 (us)':>9}")
+        print(f"{'decode + users query':<28} {us(cold)}")
+        print(f"{'cached token + user':<28} {us(warm)}")
+        print(f"{'AUTH_TRUST_CLAIMS':<28} {us(claims)}")
+        print(f"cache: {auth_cache_stats()}")
+
+        # A write to the user drops the cached row: the next request sees the new role
+        conn = get_connection()
+        conn.execute("UPDATE users SET role = 'user' WHERE id = ?", (user_id,))
+        conn.commit()
+        conn.close()
+        invalidate_user(user_id)
+        with app.test_request_context('/admin/ping', headers={'Authorization': f'Bearer {token}'}):
+            assert app.view_functions['ping']()[1] == 403
+        print("✅ demoted user refused right after invalidate_user")
+    finally:
+        shutil.rmtree(TMP_DIR, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
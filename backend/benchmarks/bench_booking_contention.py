@@ -0,0 +1,100 @@
+"""
+Stress test for POST /booking: many parallel clients racing for a few beds.
+
+Every client posts a booking (with a small photo upload) for one of the beds at
+the same moment. Exactly one request per bed must get 201, all others 409, and
+each bed must end up with exactly one booking row.
+
+Run from the backend folder:  python benchmarks/bench_booking_contention.py [--clients 300] [--beds 5]
+"""
+import argparse
+import io
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+TMP_DIR = tempfile.mkdtemp(prefix="smartcity_bench_")
+os.environ["SMARTCITY_DB_PATH"] = os.path.join(TMP_DIR, "contention.db")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from db_utils import get_connection
+from migrations import run_migrations
+import Booking_Backend
+
+PHOTO = b'\x89PNG\r\n\x1a\n' + b'\0' * 50 * 1024
+
+
+def seed(beds):
+    conn = get_connection()
+    run_migrations(conn, verbose=False)
+    conn.execute("INSERT INTO rooms (room_number, total_beds) VALUES ('1', ?)", (beds,))
+    conn.executemany("INSERT INTO beds (room_id, bed_number, status) VALUES (1, ?, 'free')",
+                     [(f"R1-B{b}",) for b in range(1, beds + 1)])
+    conn.commit()
+    conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--clients', type=int, default=300)
+    parser.add_argument('--beds', type=int, default=5)
+    args = parser.parse_args()
+
+    try:
+        seed(args.beds)
+        Booking_Backend.UPLOAD_FOLDER = os.path.join(TMP_DIR, 'uploads')
+        os.makedirs(Booking_Backend.UPLOAD_FOLDER)
+        app = Flask(__name__)
+        app.register_blueprint(Booking_Backend.booking_bp)
+
+        start_line = threading.Barrier(args.clients)
+
+        def client(i):
+            bed = f"R1-B{i % args.beds + 1}"
+            form = {'student_name': f"Student {i}", 'email': f"s{i}@example.com", 'room_number': '1',
+                    'bed_id': bed, 'photo': (io.BytesIO(PHOTO), 'photo.png')}
+            test_client = app.test_client()
+            start_line.wait()
+            started = time.perf_counter()
+            status = test_client.post('/booking', data=form, content_type='multipart/form-data').status_code
+            return bed, status, time.perf_counter() - started
+
+        print(f"{args.clients} clients racing for {args.beds} beds ...")
+        wall = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.clients) as pool:
+            results = list(pool.map(client, range(args.clients)))
+        wall = time.perf_counter() - wall
+
+        statuses = Counter(status for _, status, _ in results)
+        winners = Counter(bed for bed, status, _ in results if status == 201)
+        latencies = sorted(elapsed for _, _, elapsed in results)
+
+        conn = get_connection()
+        rows = Counter(row['bed_id'] for row in conn.execute("SELECT bed_id FROM bookings"))
+        free = conn.execute("SELECT COALESCE(SUM(free_beds), 0) FROM rooms").fetchone()[0]
+        conn.close()
+
+        print(f"statuses        {dict(statuses)}")
+        print(f"throughput      {args.clients / wall:.0f} req/s ({wall:.2f}s wall)")
+        print(f"latency p50/p99 {latencies[len(latencies) // 2] * 1000:.1f} / "
+              f"{latencies[int(len(latencies) * 0.99) - 1] * 1000:.1f} ms")
+
+        expected = {f"R1-B{b}": 1 for b in range(1, args.beds + 1)}
+        assert dict(winners) == expected, f"winners per bed: {dict(winners)}"
+        assert dict(rows) == expected, f"booking rows per bed: {dict(rows)}"
+        assert statuses[409] == args.clients - args.beds, "every loser should get 409"
+        assert free == 0, "room counters still report free beds"
+        assert len(os.listdir(Booking_Backend.UPLOAD_FOLDER)) == args.beds, "losers must not write files"
+        print("✅ exactly one winner per bed")
+    finally:
+        shutil.rmtree(TMP_DIR, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Verify-request latency with the email outbox vs. sending inline, against a local SMTP stand-in.
+
+The stand-in adds a connect/handshake delay (like a remote provider) and fails the
+first few messages, so the run also checks that retries deliver every message
+exactly once.
+
+Run from the backend folder:  python benchmarks/bench_email_outbox.py [--bookings 40] [--smtp-delay 0.3]
+"""
+import argparse
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from smtp_standin import SMTPStandIn
+
+parser = argparse.ArgumentParser(description=__doc__)
+parser.add_argument('--bookings', type=int, default=40)
+parser.add_argument('--smtp-delay', type=float, default=0.3, help="seconds per SMTP connect")
+parser.add_argument('--fail-first', type=int, default=3)
+args = parser.parse_args()
+
+standin = SMTPStandIn(connect_delay=args.smtp_delay, fail_first=args.fail_first)
+host, port = standin.start()
+
+TMP_DIR = tempfile.mkdtemp(prefix="smartcity_bench_")
+os.environ.update({
+    "SMARTCITY_DB_PATH": os.path.join(TMP_DIR, "outbox.db"),
+    "SMTP_HOST": host, "SMTP_PORT": str(port), "SMTP_STARTTLS": "0",
+    "EMAIL_RETRY_BASE_SECONDS": "0.2", "EMAIL_POLL_SECONDS": "0.2",
+})
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from db_utils import get_connection
+from migrations import run_migrations
+from mailer_utils import send_verification_email
+from email_queue import OutboxWorkerPool, outbox_stats
+from AdminBookings_Backend import admin_bp
+
+
+def seed(n):
+    conn = get_connection()
+    run_migrations(conn, verbose=False)
+    conn.execute("INSERT INTO rooms (room_number, total_beds) VALUES ('1', ?)", (n,))
+    conn.executemany("INSERT INTO beds (room_id, bed_number, status) VALUES (1, ?, 'Reserved')",
+                     [(f"R1-B{i}",) for i in range(1, n + 1)])
+    conn.executemany("""INSERT INTO bookings (student_name, email, room_number, bed_id, check_in_date, status)
+                        VALUES (?, ?, '1', ?, '2026-01-15', 'Pending')""",
+                     [(f"Student {i}", f"student{i}@example.com", f"R1-B{i}") for i in range(1, n + 1)])
+    conn.commit()
+    conn.close()
+
+
+def ms(samples):
+    return f"{statistics.median(samples) * 1000:8.1f} {max(samples) * 1000:8.1f}"
+
+
+def main():
+    try:
+        seed(args.bookings)
+        app = Flask(__name__)
+        app.register_blueprint(admin_bp)
+        client = app.test_client()
+        resident = {'id': 1, 'email': 'inline@example.com', 'student_name': 'Inline', 'room_number': '1',
+                    'bed_id': 'R1-B1', 'check_in_date': '2026-01-15'}
+
+        # What the verify request used to wait for: an SMTP send (the first one also opens the pooled session)
+        standin.failures_left, failures = 0, standin.failures_left
+        inline = []
+        for _ in range(5):
+            start = time.perf_counter()
+            assert send_verification_email(resident)
+            inline.append(time.perf_counter() - start)
+        standin.failures_left = failures
+        standin.messages.clear()
+
+        # Verify through the API; emails are only written to the outbox
+        queued = []
+        for booking_id in range(1, args.bookings + 1):
+            start = time.perf_counter()
+            response = client.patch(f'/admin/verify/{booking_id}')
+            queued.append(time.perf_counter() - start)
+            assert response.status_code == 200 and response.json['email_status'] == 'Queued', response.json
+
+        pool = OutboxWorkerPool(workers=4).start()
+        start = time.perf_counter()
+        conn = get_connection()
+        while outbox_stats(conn).get('sent', 0) < args.bookings and time.perf_counter() - start < 60:
+            time.sleep(0.05)
+        drain = time.perf_counter() - start
+        pool.stop(timeout=5)
+        stats = outbox_stats(conn)
+        attempts = conn.execute("SELECT SUM(attempts) FROM email_outbox").fetchone()[0]
+        conn.close()
+
+        print(f"{'path':<22} {'p50 (ms)':>8} {'max (ms)':>8}")
+        print(f"{'inline SMTP send':<22} {ms(inline)}")
+        print(f"{'verify + outbox':<22} {ms(queued)}")
+        print(f"outbox drained in {drain:.2f}s with 4 workers: {stats}, {attempts} attempts "
+              f"({args.fail_first} injected failures)")
+
+        recipients = sorted(rcpt for _, rcpts, _ in standin.messages for rcpt in rcpts)
+        assert stats == {'sent': args.bookings}, stats
+        assert len(recipients) == len(set(recipients)) == args.bookings, "every email delivered exactly once"
+        assert attempts == args.bookings + args.fail_first
+        print("✅ all emails delivered once after retries")
+    finally:
+        standin.stop()
+        shutil.rmtree(TMP_DIR, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Email rendering cost on its own: compiling the template for every message vs. the
+precompiled registry in template_utils (single renders and render_batch), plus the
+MIME assembly that follows.
+
+Run from the backend folder:  python benchmarks/bench_email_templates.py [--messages 5000]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from jinja2 import Environment, FileSystemLoader, StrictUndefined, select_autoescape
+from mailer_utils import build_mime, build_verification_emails
+from template_utils import EMAIL_TEMPLATES, TEMPLATE_FOLDER, render_batch, render_email
+
+parser = argparse.ArgumentParser(description=__doc__)
+parser.add_argument('--messages', type=int, default=5000)
+args = parser.parse_args()
+
+
+def residents(n):
+    return [{'id': i, 'email': f"student{i}@example.com", 'student_name': f"Student {i}", 'room_number': str(i % 40),
+             'bed_id': f"R{i % 40}-B{i % 4}", 'check_in_date': '2026-01-15'} for i in range(n)]
+
+
+def compile_every_time(name, context):
+    """Render without a template cache: parse and compile the files for each message"""
+    spec = EMAIL_TEMPLATES[name]
+    env = Environment(loader=FileSystemLoader(TEMPLATE_FOLDER), cache_size=0, undefined=StrictUndefined,
+                      autoescape=select_autoescape(['html'], default_for_string=False))
+    values = {**spec.get('defaults', {}), **context}
+    return {'subject': env.from_string(spec['subject']).render(values),
+            'html': env.get_template(f"{spec['template']}.html").render(values),
+            'text': env.get_template(f"{spec['template']}.txt").render(values)}
+
+
+def timed(label, n, fn):
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<34} {elapsed / n * 1e6:9.1f} {n / elapsed:10.0f}")
+
+
+def main():
+    n = args.messages
+    rows = residents(n)
+    otps = [{'otp_code': f"{i:06d}"} for i in range(n)]
+    few = max(1, n // 20)
+
+    print(f"{'path':<34} {'us/msg':>9} {'msgs/s':>10}")
+    timed("booking: compile per message", few, lambda: [compile_every_time('booking_verified', r) for r in rows[:few]])
+    timed("booking: render_email()", n, lambda: [render_email('booking_verified', r) for r in rows])
+    timed("booking: render_batch()", n, lambda: render_batch('booking_verified', rows))
+    timed("otp: compile per message", few, lambda: [compile_every_time('otp_registration', o) for o in otps[:few]])
+    timed("otp: render_batch()", n, lambda: render_batch('otp_registration', otps))
+    messages = build_verification_emails(rows)
+    timed("booking: build_mime()", n, lambda: [build_mime(**m) for m in messages])
+    timed("booking: rows -> MIME end to end", n, lambda: [build_mime(**m) for m in build_verification_emails(rows)])
+
+    single = render_email('booking_verified', rows[0])
+    assert render_batch('booking_verified', rows[:1])[0] == single
+    assert single['html'] == compile_every_time('booking_verified', rows[0])['html']
+    print("✅ precompiled and freshly compiled templates render identically")
+
+
+if __name__ == "__main__":
+    main()
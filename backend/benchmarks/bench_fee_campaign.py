@@ -0,0 +1,107 @@
+"""
+A whole school's monthly fee reminders: one campaign request vs. the per-student
+generate/save/send flow, delivered by the outbox worker pool through a local SMTP stand-in.
+
+Run from the backend folder:  python benchmarks/bench_fee_campaign.py [--students 3000] [--workers 4]
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from smtp_standin import SMTPStandIn
+
+parser = argparse.ArgumentParser(description=__doc__)
+parser.add_argument('--students', type=int, default=3000)
+parser.add_argument('--workers', type=int, default=4)
+parser.add_argument('--smtp-delay', type=float, default=0.3, help="seconds per SMTP connect")
+parser.add_argument('--data-delay', type=float, default=0.002, help="seconds per message")
+args = parser.parse_args()
+
+standin = SMTPStandIn(connect_delay=args.smtp_delay, data_delay=args.data_delay)
+host, port = standin.start()
+
+TMP_DIR = tempfile.mkdtemp(prefix="smartcity_bench_")
+os.environ.update({
+    "SMARTCITY_DB_PATH": os.path.join(TMP_DIR, "campaign.db"),
+    "SMTP_HOST": host, "SMTP_PORT": str(port), "SMTP_STARTTLS": "0", "EMAIL_POLL_SECONDS": "0.2",
+})
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from db_utils import get_connection
+from migrations import run_migrations
+from email_queue import OutboxWorkerPool
+from ai_fee_reminder import ai_fee_bp
+
+CLASSES = [f"Class {n}" for n in range(1, 11)]
+
+
+def seed(n):
+    conn = get_connection()
+    run_migrations(conn, verbose=False)
+    conn.executemany("""INSERT INTO admissions (student_name, father_name, admission_class, email, contact_no, status)
+                        VALUES (?, ?, ?, ?, '03001234567', 'Verified')""",
+                     [(f"Student {i}", f"Father {i}", CLASSES[i % len(CLASSES)], f"parent{i}@example.com")
+                      for i in range(n)])
+    conn.commit()
+    conn.close()
+
+
+def main():
+    try:
+        seed(args.students)
+        app = Flask(__name__)
+        app.register_blueprint(ai_fee_bp, url_prefix='/ai')
+        client = app.test_client()
+        pool = OutboxWorkerPool(workers=args.workers).start()
+        due = {'fee_type': 'School', 'amount': 5000, 'due_date': '2026-12-10', 'tone': 'formal'}
+
+        # Before: three requests per student, typed in by the admin
+        sample = 20
+        start = time.perf_counter()
+        for i in range(sample):
+            student = {**due, 'student_name': f"Manual {i}", 'father_name': 'Father', 'email': f"manual{i}@example.com"}
+            preview = client.post('/ai/generate-reminder', json=student).json
+            saved = client.post('/ai/save-reminder', json={**student, 'message_subject': preview['subject'],
+                                                           'message_body': preview['body']}).json
+            assert client.post('/ai/send-email', json={**student, 'reminder_id': saved['reminder_id'],
+                                                       'subject': preview['subject'],
+                                                       'body': preview['body']}).status_code == 202
+        per_student = (time.perf_counter() - start) / sample
+
+        # After: one campaign request for the whole school
+        start = time.perf_counter()
+        response = client.post('/ai/campaigns', json=due)
+        generate = time.perf_counter() - start
+        assert response.status_code == 201, response.json
+        campaign_id = response.json['campaign_id']
+
+        while True:
+            campaign = client.get(f'/ai/campaigns/{campaign_id}').json['campaign']
+            if campaign['status'] == 'done' or time.perf_counter() - start > 600:
+                break
+            time.sleep(0.25)
+        total = time.perf_counter() - start
+        pool.stop(timeout=5)
+
+        print(f"per-student flow (generate + save + send): {per_student * 1000:.1f} ms of API time per student "
+              f"-> {per_student * args.students:.1f}s of requests for {args.students}, plus the typing")
+        print(f"campaign: {response.json['total']} reminders generated and queued in {generate:.2f}s")
+        print(f"delivered in {total:.2f}s with {args.workers} workers ({response.json['total'] / total:.0f} emails/s), "
+              f"{standin.sessions} SMTP sessions: {campaign['progress']}")
+
+        recipients = sorted(rcpt for _, rcpts, _ in standin.messages for rcpt in rcpts)
+        assert campaign['progress']['sent'] == args.students, campaign
+        assert len(recipients) == len(set(recipients)) == args.students + sample, "every email delivered exactly once"
+        print("✅ every reminder delivered once and marked sent")
+    finally:
+        standin.stop()
+        shutil.rmtree(TMP_DIR, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
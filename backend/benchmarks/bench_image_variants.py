@@ -0,0 +1,111 @@
+"""
+Preview variants: bytes the admin document viewer downloads, and what rendering costs.
+
+Renders thumb/medium variants for a synthetic 12 MP phone photo, a phone screenshot and
+the real images in uploads/, then compares opening a six-document booking in the viewer
+with originals against the medium variant, and the render time against a naive full
+decode + resize.
+
+Run from the backend folder:  python benchmarks/bench_image_variants.py
+"""
+import io
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TMP_DIR = tempfile.mkdtemp(prefix="smartcity_bench_")
+sys.path.insert(0, BACKEND)
+
+from PIL import Image
+import image_variants
+import upload_store
+
+upload_store.OBJECT_FOLDER = os.path.join(TMP_DIR, 'objects')
+upload_store.VARIANT_FOLDER = os.path.join(TMP_DIR, 'variants')
+
+
+def phone_photo():
+    """4032x3024 JPEG with enough detail to compress like a camera shot (~3-4 MB)"""
+    noise = Image.effect_noise((4032, 3024), 40).convert('RGB')
+    gradient = Image.linear_gradient('L').resize((4032, 3024)).convert('RGB')
+    out = io.BytesIO()
+    Image.blend(noise, gradient, 0.5).save(out, 'JPEG', quality=92)
+    return out.getvalue(), 'jpeg'
+
+
+def screenshot():
+    """1080x2400 PNG screen capture"""
+    image = Image.linear_gradient('L').resize((1080, 2400)).convert('RGB')
+    image.paste(Image.effect_noise((1080, 1200), 20).convert('RGB'), (0, 600))
+    out = io.BytesIO()
+    image.save(out, 'PNG')
+    return out.getvalue(), 'png'
+
+
+def naive_render(path):
+    """What a preview costs without draft mode or a shared decode"""
+    for size in image_variants.VARIANTS.values():
+        with Image.open(path) as image:
+            image = image.convert('RGB')
+            image.thumbnail((size, size), Image.LANCZOS)
+            image.save(io.BytesIO(), 'WEBP', quality=image_variants.VARIANT_QUALITY)
+
+
+def render(data, kind):
+    """Store and render one document; returns (name, render ms, naive ms, {variant: bytes})"""
+    name = upload_store.put_bytes(data, kind)
+    start = time.perf_counter()
+    image_variants.render_variants(name)
+    render_ms = (time.perf_counter() - start) * 1000
+    start = time.perf_counter()
+    naive_render(upload_store.object_path(name))
+    naive_ms = (time.perf_counter() - start) * 1000
+    sizes = {variant: os.path.getsize(image_variants.variant_path(name, variant)) for variant in image_variants.VARIANTS}
+    return name, render_ms, naive_ms, sizes
+
+
+def row(label, original, sizes, render_ms, naive_ms):
+    print(f"{label:<30}{original / 1024:>10.0f}KB{sizes['thumb'] / 1024:>8.1f}KB"
+          f"{sizes['medium'] / 1024:>8.0f}KB{render_ms:>8.0f}ms{naive_ms:>8.0f}ms")
+
+
+def main():
+    try:
+        print(f"{'document':<30}{'original':>12}{'thumb':>10}{'medium':>10}{'render':>10}{'naive':>10}")
+        synthetic = {}
+        for label, (data, kind) in (('12 MP phone photo', phone_photo()), ('phone screenshot', screenshot())):
+            name, render_ms, naive_ms, sizes = render(data, kind)
+            synthetic[label] = (len(data), sizes)
+            row(label, len(data), sizes, render_ms, naive_ms)
+
+        # Every distinct image currently in uploads/ (or the store, once m012 has run)
+        folder = os.path.join(BACKEND, 'uploads', 'objects')
+        if not os.path.isdir(folder):
+            folder = os.path.join(BACKEND, 'uploads')
+        contents = {}
+        for entry in os.scandir(folder):
+            if entry.is_file() and entry.name.lower().endswith(('.jpg', '.jpeg', '.png')):
+                data = open(entry.path, 'rb').read()
+                contents[data] = 'png' if data.startswith(b'\x89PNG') else 'jpeg'
+        if contents:
+            results = [render(data, kind) for data, kind in contents.items()]
+            original = sum(len(data) for data in contents)
+            sizes = {variant: sum(r[3][variant] for r in results) for variant in image_variants.VARIANTS}
+            row(f"uploads/ ({len(contents)} distinct images)", original, sizes,
+                sum(r[1] for r in results), sum(r[2] for r in results))
+
+        # One booking in the viewer: a phone photo and four screenshots/scans
+        photo, shot = synthetic['12 MP phone photo'], synthetic['phone screenshot']
+        original = photo[0] + 4 * shot[0]
+        medium = photo[1]['medium'] + 4 * shot[1]['medium']
+        print(f"opening one booking: {original / 1024:.0f} KB of originals -> {medium / 1024:.0f} KB of previews "
+              f"({original / medium:.0f}x less)")
+    finally:
+        shutil.rmtree(TMP_DIR, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
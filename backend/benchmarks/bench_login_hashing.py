@@ -0,0 +1,131 @@
+"""
+Login latency under a burst of concurrent logins, hashing inline vs. on the bounded pool.
+
+Inline, every request thread runs its own scrypt at once, so all of them share the
+CPU and each login takes as long as the whole burst. The pool runs HASH_WORKERS hashes
+at a time, lets HASH_QUEUE_LIMIT wait, and answers the rest with 503 + Retry-After
+straight away. The run also seeds users with old pbkdf2 hashes and checks that a
+login upgrades them to the configured parameters.
+
+Run from the backend folder:  python benchmarks/bench_login_hashing.py [--clients 32] [--users 8]
+"""
+import argparse
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+parser = argparse.ArgumentParser(description=__doc__)
+parser.add_argument('--clients', type=int, default=32, help="concurrent logins per burst")
+parser.add_argument('--users', type=int, default=8, help="accounts seeded with old pbkdf2 hashes")
+parser.add_argument('--queue-limit', type=int, default=4)
+args = parser.parse_args()
+
+TMP_DIR = tempfile.mkdtemp(prefix="smartcity_bench_")
+os.environ.update({
+    "SMARTCITY_DB_PATH": os.path.join(TMP_DIR, "login.db"),
+    "HASH_QUEUE_LIMIT": str(args.queue_limit),
+    "PASSWORD_HASH_METHOD": "scrypt:32768:8:1",
+})
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from werkzeug.security import check_password_hash, generate_password_hash
+import auth
+from auth import auth_bp
+from db_utils import get_connection
+from migrations import run_migrations
+from password_utils import HASH_WORKERS, hasher_stats, password_hasher
+
+PASSWORD = "correct horse"
+
+
+def seed():
+    conn = get_connection()
+    run_migrations(conn, verbose=False)
+    current = generate_password_hash(PASSWORD, password_hasher.method, password_hasher.salt_length)
+    old = generate_password_hash(PASSWORD, "pbkdf2:sha256:260000")
+    conn.executemany("INSERT INTO users (full_name, email, password, category) VALUES (?, ?, ?, 'hostel')",
+                     [(f"User {i}", f"user{i}@example.com", current) for i in range(args.clients)])
+    conn.executemany("INSERT INTO users (full_name, email, password, category) VALUES (?, ?, ?, 'hostel')",
+                     [(f"Old {i}", f"old{i}@example.com", old) for i in range(args.users)])
+    conn.commit()
+    conn.close()
+
+
+def burst(client, emails):
+    """All logins released together; returns (seconds, status) per login"""
+    results = [None] * len(emails)
+    barrier = threading.Barrier(len(emails))
+
+    def login(i):
+        barrier.wait()
+        start = time.perf_counter()
+        response = client.post('/auth/login', json={'email': emails[i], 'password': PASSWORD, 'category': 'hostel'})
+        results[i] = (time.perf_counter() - start, response.status_code)
+
+    threads = [threading.Thread(target=login, args=(i,)) for i in range(len(emails))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def report(label, results, elapsed):
+    ok = sorted(seconds for seconds, status in results if status == 200)
+    busy = [seconds for seconds, status in results if status == 503]
+    assert len(ok) + len(busy) == len(results), results
+    p99 = ok[max(0, int(len(ok) * 0.99) - 1)]
+    busy_ms = f"{max(busy) * 1000:8.0f}" if busy else f"{'-':>8}"
+    print(f"{label:<16} {len(ok):>4} {statistics.median(ok) * 1000:8.0f} {p99 * 1000:8.0f} {len(busy):>4} {busy_ms} "
+          f"{len(ok) / elapsed:7.1f}")
+
+
+def main():
+    try:
+        seed()
+        app = Flask(__name__)
+        app.register_blueprint(auth_bp, url_prefix='/auth')
+        client = app.test_client()
+        emails = [f"user{i}@example.com" for i in range(args.clients)]
+        print(f"{args.clients} concurrent logins, {HASH_WORKERS} hash worker(s), queue limit {args.queue_limit}")
+        print(f"{'path':<16} {'ok':>4} {'p50 (ms)':>8} {'p99 (ms)':>8} {'503':>4} {'503 max':>8} {'logins/s':>7}")
+
+        # What login did before: check_password_hash on the request thread
+        auth.verify_password = check_password_hash
+        start = time.perf_counter()
+        results = burst(client, emails)
+        report("inline", results, time.perf_counter() - start)
+        auth.verify_password = password_hasher.verify
+
+        start = time.perf_counter()
+        results = burst(client, emails)
+        report("bounded pool", results, time.perf_counter() - start)
+
+        # Old hashes are upgraded in the background after a successful login
+        for i in range(args.users):
+            response = client.post('/auth/login', json={'email': f"old{i}@example.com", 'password': PASSWORD,
+                                                        'category': 'hostel'})
+            assert response.status_code == 200, response.json
+        deadline = time.time() + 30
+        conn = get_connection()
+        while time.time() < deadline:
+            hashes = [row['password'] for row in conn.execute("SELECT password FROM users WHERE email LIKE 'old%'")]
+            if not any(password_hasher.needs_rehash(h) for h in hashes):
+                break
+            time.sleep(0.05)
+        conn.close()
+        assert not any(password_hasher.needs_rehash(h) for h in hashes), hashes
+        assert all(check_password_hash(h, PASSWORD) for h in hashes)
+        print(f"pool: {hasher_stats()}")
+        print(f"✅ {args.users} pbkdf2 hashes upgraded to {password_hasher.prefix} on login")
+    finally:
+        shutil.rmtree(TMP_DIR, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
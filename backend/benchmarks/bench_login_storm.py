@@ -0,0 +1,120 @@
+"""
+Login storm with last_login written through per login vs. buffered and flushed in batches.
+
+Hashing is set cheap here (PASSWORD_HASH_METHOD) so the database work is what is
+measured. Write-through, each login takes the write lock for its UPDATE + commit; with the
+write-behind buffer a login is a single read and the flusher writes all of them with
+one executemany per interval. Checks that every user's last_login is written.
+
+Run from the backend folder:  python benchmarks/bench_login_storm.py [--clients 16] [--logins 100]
+"""
+import argparse
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+parser = argparse.ArgumentParser(description=__doc__)
+parser.add_argument('--clients', type=int, default=16, help="concurrent login threads")
+parser.add_argument('--logins', type=int, default=100, help="logins per thread")
+parser.add_argument('--users', type=int, default=200)
+args = parser.parse_args()
+
+TMP_DIR = tempfile.mkdtemp(prefix="smartcity_bench_")
+os.environ.update({
+    "SMARTCITY_DB_PATH": os.path.join(TMP_DIR, "storm.db"),
+    "PASSWORD_HASH_METHOD": "pbkdf2:sha256:1000",
+    "HASH_QUEUE_LIMIT": "100000",
+    "LAST_LOGIN_FLUSH_SECONDS": "1",
+})
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from werkzeug.security import generate_password_hash
+from auth import auth_bp
+from db_utils import get_connection
+from last_login import last_login_buffer, start_last_login_flusher
+from migrations import run_migrations
+
+PASSWORD = "secret"
+
+
+def seed():
+    conn = get_connection()
+    run_migrations(conn, verbose=False)
+    password = generate_password_hash(PASSWORD, "pbkdf2:sha256:1000")
+    conn.executemany("INSERT INTO users (full_name, email, password, category) VALUES (?, ?, ?, ?)",
+                     [(f"User {i}", f"user{i}@example.com", password, category)
+                      for i in range(args.users) for category in ('hostel', 'school')])
+    conn.commit()
+    conn.close()
+
+
+def storm(client):
+    samples = []
+    lock = threading.Lock()
+
+    def run(worker):
+        mine = []
+        for n in range(args.logins):
+            email = f"user{(worker * args.logins + n) % args.users}@example.com"
+            start = time.perf_counter()
+            response = client.post('/auth/login', json={'email': email, 'password': PASSWORD, 'category': 'hostel'})
+            mine.append(time.perf_counter() - start)
+            assert response.status_code == 200 and response.json['user']['categories'] == ['hostel', 'school']
+        with lock:
+            samples.extend(mine)
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(args.clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return samples, time.perf_counter() - start
+
+
+def report(label, samples, elapsed, flushes):
+    samples.sort()
+    p99 = samples[int(len(samples) * 0.99) - 1]
+    print(f"{label:<16} {statistics.median(samples) * 1000:8.2f} {p99 * 1000:8.2f} "
+          f"{len(samples) / elapsed:9.0f} {flushes:>8}")
+
+
+def main():
+    try:
+        seed()
+        app = Flask(__name__)
+        app.register_blueprint(auth_bp, url_prefix='/auth')
+        client = app.test_client()
+        print(f"{args.clients} threads x {args.logins} logins")
+        print(f"{'last_login':<16} {'p50 (ms)':>8} {'p99 (ms)':>8} {'logins/s':>9} {'writes':>8}")
+
+        # No flusher running: record_login writes every login straight through
+        samples, elapsed = storm(client)
+        report("write-through", samples, elapsed, last_login_buffer.stats()['flushes'])
+
+        conn = get_connection()
+        conn.execute("UPDATE users SET last_login = NULL")
+        conn.commit()
+        before = last_login_buffer.stats()['flushes']
+        flusher = start_last_login_flusher()
+        samples, elapsed = storm(client)
+        flusher.stop(timeout=5)
+        report("write-behind", samples, elapsed, last_login_buffer.stats()['flushes'] - before)
+
+        missing = conn.execute("SELECT COUNT(*) FROM users WHERE category = 'hostel' AND last_login IS NULL"
+                               ).fetchone()[0]
+        conn.close()
+        assert missing == 0 and last_login_buffer.stats()['pending'] == 0, missing
+        print(f"buffer: {last_login_buffer.stats()}")
+        print(f"✅ last_login written for all {args.users} users")
+    finally:
+        shutil.rmtree(TMP_DIR, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+OTP request latency with background delivery, against a slow and flaky local SMTP stand-in.
+
+The stand-in takes --smtp-delay seconds per connect and fails the first messages with a 451;
+a backlog of bulk mail is already waiting in the outbox. The request must return without
+waiting for SMTP, and the OTP must still be delivered (after retries) ahead of the backlog.
+
+Run from the backend folder:  python benchmarks/bench_otp_delivery.py [--requests 20] [--smtp-delay 2]
+"""
+import argparse
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from smtp_standin import SMTPStandIn
+
+parser = argparse.ArgumentParser(description=__doc__)
+parser.add_argument('--requests', type=int, default=20)
+parser.add_argument('--smtp-delay', type=float, default=2.0, help="seconds per SMTP connect")
+parser.add_argument('--fail-first', type=int, default=2)
+parser.add_argument('--backlog', type=int, default=500, help="bulk messages queued before the OTPs")
+args = parser.parse_args()
+
+standin = SMTPStandIn(connect_delay=args.smtp_delay, data_delay=0.002, fail_first=args.fail_first)
+host, port = standin.start()
+
+TMP_DIR = tempfile.mkdtemp(prefix="smartcity_bench_")
+os.environ.update({
+    "SMARTCITY_DB_PATH": os.path.join(TMP_DIR, "otp.db"),
+    "SMTP_HOST": host, "SMTP_PORT": str(port), "SMTP_STARTTLS": "0", "EMAIL_USER": "portal@example.com",
+    "EMAIL_POLL_SECONDS": "0.2", "OTP_RETRY_BASE_SECONDS": "0.2", "OTP_LIMIT_PER_IP": "1000/60",
+})
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from db_utils import get_connection
+from migrations import run_migrations
+from email_queue import OutboxWorkerPool, enqueue_message
+from auth import auth_bp
+
+
+def main():
+    try:
+        conn = get_connection()
+        run_migrations(conn, verbose=False)
+        conn.close()
+        app = Flask(__name__)
+        app.register_blueprint(auth_bp, url_prefix='/auth')
+        client = app.test_client()
+
+        for i in range(args.backlog):
+            enqueue_message(f"bulk{i}@example.com", "Bulk", "<p>bulk</p>", "Bench", kind='bulk')
+
+        latencies, deliveries = [], []
+        for i in range(args.requests):
+            start = time.perf_counter()
+            response = client.post('/auth/send-registration-otp', json={'email': f"otp{i}@example.com", 'category': 'hostel'})
+            latencies.append(time.perf_counter() - start)
+            assert response.status_code == 202, response.json
+            deliveries.append(response.json['delivery_id'])
+
+        start = time.perf_counter()
+        pool = OutboxWorkerPool(workers=2).start()
+        pending = set(deliveries)
+        statuses = {}
+        while pending and time.perf_counter() - start < 120:
+            for delivery_id in list(pending):
+                status = client.get(f'/auth/otp-status/{delivery_id}').json
+                if status['status'] in ('sent', 'failed'):
+                    statuses[delivery_id] = status
+                    pending.discard(delivery_id)
+            time.sleep(0.05)
+        otp_done = time.perf_counter() - start
+        with standin.lock:
+            bulk_sent_by_then = sum(1 for _, rcpts, _ in standin.messages if rcpts[0].startswith('<bulk'))
+        pool.stop(timeout=5)
+
+        print(f"send-registration-otp: p50 {statistics.median(latencies) * 1000:.1f} ms, "
+              f"max {max(latencies) * 1000:.1f} ms (SMTP connect takes {args.smtp_delay:.1f}s; the old inline "
+              f"send plus sleep-retries held the request at least that long)")
+        print(f"all {args.requests} OTPs delivered {otp_done:.2f}s after the workers started, "
+              f"{sum(s['attempts'] for s in statuses.values())} attempts ({args.fail_first} injected failures), "
+              f"{bulk_sent_by_then} of {args.backlog} backlog messages sent by then")
+
+        assert all(s['status'] == 'sent' for s in statuses.values()) and len(statuses) == args.requests
+        assert max(latencies) < args.smtp_delay / 2
+        print("✅ OTP requests return before SMTP and every OTP is delivered ahead of the backlog")
+    finally:
+        standin.stop()
+        shutil.rmtree(TMP_DIR, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
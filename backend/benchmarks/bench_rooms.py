@@ -0,0 +1,78 @@
+"""
+Benchmark for GET /rooms: old N+1 bed scan vs. trigger-maintained room counters.
+
+Run from the backend folder:  python benchmarks/bench_rooms.py [--repeat 20]
+"""
+import argparse
+import os
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from migrations import run_migrations
+
+ROOM_COUNTS = [30, 300, 1000, 3000, 10000]
+BEDS_PER_ROOM = 3
+
+
+def build_db(path, rooms):
+    conn = sqlite3.connect(path)
+    conn.row_factory = sqlite3.Row
+    run_migrations(conn, verbose=False)
+    conn.executemany("INSERT INTO rooms (room_number, total_beds) VALUES (?, ?)",
+                     [(str(i), BEDS_PER_ROOM) for i in range(1, rooms + 1)])
+    statuses = ['free', 'Reserved', 'occupied']
+    conn.executemany("INSERT INTO beds (room_id, bed_number, status) VALUES (?, ?, ?)",
+                     [(r, f"R{r}-B{b}", statuses[(r + b) % 3])
+                      for r in range(1, rooms + 1) for b in range(1, BEDS_PER_ROOM + 1)])
+    conn.commit()
+    return conn
+
+
+def rooms_n_plus_one(conn):
+    """The previous /rooms implementation: one beds query per room"""
+    result = []
+    for room in conn.execute("SELECT * FROM rooms").fetchall():
+        beds = conn.execute("SELECT status FROM beds WHERE room_id=?", (room["id"],)).fetchall()
+        free = sum(1 for b in beds if b["status"] == "free")
+        result.append((room["id"], free))
+    return result
+
+
+def rooms_counters(conn):
+    """Current /rooms implementation: a single read of rooms"""
+    rows = conn.execute("SELECT id, room_number, total_beds, free_beds FROM rooms ORDER BY id").fetchall()
+    return [(room["id"], room["free_beds"]) for room in rows]
+
+
+def timed(fn, conn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(conn)
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{'rooms':>7} {'n+1 (ms)':>10} {'counters (ms)':>14} {'speedup':>8}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for rooms in ROOM_COUNTS:
+            conn = build_db(os.path.join(tmp, f"rooms_{rooms}.db"), rooms)
+            assert rooms_n_plus_one(conn) == rooms_counters(conn), "counters out of sync with beds"
+            old = timed(rooms_n_plus_one, conn, args.repeat)
+            new = timed(rooms_counters, conn, args.repeat)
+            print(f"{rooms:>7} {old:>10.2f} {new:>14.2f} {old / new:>7.1f}x")
+            conn.close()
+
+
+if __name__ == "__main__":
+    main()
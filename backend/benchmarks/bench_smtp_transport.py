@@ -0,0 +1,109 @@
+"""
+Per-message SMTP cost: a new connection per email vs. the shared session pool in smtp_utils.
+
+The stand-in adds a connect/handshake delay (TCP + STARTTLS + AUTH on a real provider)
+and drops each session after --max-per-session messages, so the pooled run also has to
+reconnect transparently without losing or duplicating a message.
+
+Run from the backend folder:  python benchmarks/bench_smtp_transport.py [--messages 60] [--smtp-delay 0.3]
+"""
+import argparse
+import os
+import smtplib
+import statistics
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from smtp_standin import SMTPStandIn
+
+parser = argparse.ArgumentParser(description=__doc__)
+parser.add_argument('--messages', type=int, default=60)
+parser.add_argument('--smtp-delay', type=float, default=0.3, help="seconds per SMTP connect")
+parser.add_argument('--data-delay', type=float, default=0.005, help="seconds per message")
+parser.add_argument('--max-per-session', type=int, default=25)
+parser.add_argument('--threads', type=int, default=4)
+args = parser.parse_args()
+
+standin = SMTPStandIn(connect_delay=args.smtp_delay, data_delay=args.data_delay,
+                      max_per_session=args.max_per_session)
+host, port = standin.start()
+os.environ.update({"SMTP_HOST": host, "SMTP_PORT": str(port), "SMTP_STARTTLS": "0"})
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mailer_utils import build_mime
+from smtp_utils import SMTPTransport
+
+
+def messages(label, n):
+    return [build_mime(f"{label}{i}@example.com", f"Message {i}", f"<p>{i}</p>", "Bench", f"{i}")
+            for i in range(n)]
+
+
+def connect_per_message(msg):
+    """What every sender used to do"""
+    start = time.perf_counter()
+    with smtplib.SMTP(host, port, timeout=30) as server:
+        server.send_message(msg)
+    return time.perf_counter() - start
+
+
+def run(label, send, msgs):
+    """Send msgs and return (latencies, wall seconds, sessions opened on the server)"""
+    sessions_before = standin.sessions
+    start = time.perf_counter()
+    latencies = send(msgs)
+    wall = time.perf_counter() - start
+    return latencies, wall, standin.sessions - sessions_before
+
+
+def threaded(transport, msgs):
+    latencies, lock = [], threading.Lock()
+    chunks = [msgs[i::args.threads] for i in range(args.threads)]
+
+    def worker(chunk):
+        for msg in chunk:
+            elapsed = transport.send(msg)
+            with lock:
+                latencies.append(elapsed)
+    threads = [threading.Thread(target=worker, args=(chunk,)) for chunk in chunks]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies
+
+
+def main():
+    try:
+        n = args.messages
+        transport = SMTPTransport(max_messages=1000)
+        rows = [
+            ("connect per message", *run("a", lambda msgs: [connect_per_message(m) for m in msgs], messages("a", n))),
+            ("pooled send()", *run("b", lambda msgs: [transport.send(m) for m in msgs], messages("b", n))),
+            (f"pooled, {args.threads} threads", *run("c", lambda msgs: threaded(transport, msgs), messages("c", n))),
+            ("send_many() pipeline", *run("d", lambda msgs: [lat for lat, _ in transport.send_many(msgs)], messages("d", n))),
+        ]
+        transport.close_all()
+
+        print(f"{'path':<24} {'p50 (ms)':>8} {'p95 (ms)':>8} {'msg/s':>7} {'sessions':>8}")
+        for label, latencies, wall, sessions in rows:
+            latencies = sorted(latencies)
+            p95 = latencies[max(0, int(len(latencies) * 0.95) - 1)]
+            print(f"{label:<24} {statistics.median(latencies) * 1000:8.1f} {p95 * 1000:8.1f} "
+                  f"{len(latencies) / wall:7.1f} {sessions:8d}")
+        stats = transport.stats()
+        print(f"transport: {stats}")
+
+        recipients = [rcpt for _, rcpts, _ in standin.messages for rcpt in rcpts]
+        assert len(recipients) == len(set(recipients)) == 4 * n, "every message delivered exactly once"
+        assert stats['failed'] == 0 and stats['sent'] == 3 * n
+        assert stats['reconnects'] > 0, "server-side session drops were recovered"
+        print(f"✅ {len(recipients)} messages delivered once, {stats['reconnects']} dropped sessions replaced")
+    finally:
+        standin.stop()
+
+
+if __name__ == "__main__":
+    main()
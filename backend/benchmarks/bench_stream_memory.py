@@ -0,0 +1,97 @@
+"""
+Peak Python memory for a large list response: fetchall() + jsonify vs. streamed JSON.
+
+Run from the backend folder:  python benchmarks/bench_stream_memory.py [--rows 100000]
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+TMP_DIR = tempfile.mkdtemp(prefix="smartcity_bench_")
+os.environ["SMARTCITY_DB_PATH"] = os.path.join(TMP_DIR, "stream.db")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask, jsonify
+from db_utils import get_connection
+from migrations import run_migrations
+from query_utils import stream_json_array
+
+SQL = "SELECT * FROM bookings WHERE is_deleted = 0 ORDER BY id DESC"
+
+
+def seed(rows):
+    conn = get_connection()
+    run_migrations(conn, verbose=False)
+    conn.executemany("""
+        INSERT INTO bookings (student_name, father_name, cnic, contact, email, profession, institute_name,
+                              emergency_contact_name, emergency_contact, address, check_in_date, room_number,
+                              bed_id, status, photo_path, cnic_front_path, cnic_back_path, proof_path,
+                              voucher_path, signature_path, is_deleted)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 'Pending', ?, ?, ?, ?, ?, ?, 0)
+    """, (
+        (f"Student {i}", f"Father {i}", f"35202-{i:07d}-1", f"0300{i:07d}", f"student{i}@example.com",
+         "Student", "Government College Jauharabad", f"Guardian {i}", f"0301{i:07d}",
+         f"House {i}, Street {i % 50}, Jauharabad", "2026-01-15", str(i % 30 + 1), f"R{i % 30 + 1}-B{i % 3 + 1}",
+         *(f"{i:032x}_document.jpeg" for _ in range(6)))
+        for i in range(rows)
+    ))
+    conn.commit()
+    conn.close()
+
+
+def buffered():
+    conn = get_connection()
+    try:
+        rows = conn.execute(SQL).fetchall()
+        response = jsonify([dict(row) for row in rows])
+        return len(response.get_data())
+    finally:
+        conn.close()
+
+
+def streamed():
+    response = stream_json_array(SQL)
+    size = 0
+    try:
+        for chunk in response.response:
+            size += len(chunk)  # a real server would write the chunk to the socket here
+    finally:
+        response.close()
+    return size
+
+
+def measure(fn, app):
+    with app.app_context():
+        tracemalloc.start()
+        start = time.perf_counter()
+        size = fn()
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return size, peak, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=100000)
+    args = parser.parse_args()
+
+    try:
+        print(f"Seeding {args.rows} bookings ...")
+        seed(args.rows)
+        app = Flask(__name__)
+
+        print(f"{'path':<10} {'body (MB)':>10} {'peak (MB)':>10} {'time (s)':>9}")
+        for name, fn in (("buffered", buffered), ("streamed", streamed)):
+            size, peak, elapsed = measure(fn, app)
+            print(f"{name:<10} {size / 1e6:>10.1f} {peak / 1e6:>10.1f} {elapsed:>9.2f}")
+    finally:
+        shutil.rmtree(TMP_DIR, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+One oversized upload: how much of it is read and written before the request is refused.
+
+The client streams a multipart body with a single huge "photo" part (never held in
+memory). Werkzeug's default form parsing (what add_booking used) reads the whole body
+and spools the part to a temporary file before the view can look at it; the shared
+upload pipeline stops at the per-document cap. A valid upload is also timed so the
+streaming path is not slower for normal documents.
+
+Run from the backend folder:  python benchmarks/bench_upload_limits.py [--mb 500]
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+parser = argparse.ArgumentParser(description=__doc__)
+parser.add_argument('--mb', type=int, default=500, help="size of the hostile upload")
+args = parser.parse_args()
+
+TMP_DIR = tempfile.mkdtemp(prefix="smartcity_bench_")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask, jsonify, request
+from upload_utils import UploadError, parse_upload_form
+from Booking_Backend import BOOKING_UPLOADS
+
+BOUNDARY = "benchboundary"
+PNG = b'\x89PNG\r\n\x1a\n' + b'\0' * 16
+
+
+class HostileBody:
+    """File-like multipart body of `size` bytes, generated on the fly; counts what the server reads"""
+
+    def __init__(self, size, payload=PNG):
+        self.head = (f"--{BOUNDARY}\r\nContent-Disposition: form-data; name=\"bed_id\"\r\n\r\nR1-B1\r\n"
+                     f"--{BOUNDARY}\r\nContent-Disposition: form-data; name=\"photo\"; filename=\"big.png\"\r\n"
+                     f"Content-Type: image/png\r\n\r\n").encode() + payload
+        self.tail = f"\r\n--{BOUNDARY}--\r\n".encode()
+        self.length = size
+        self.filler = size - len(self.head) - len(self.tail)
+        self.position = 0
+
+    def read(self, n=-1):
+        if n is None or n < 0:
+            n = self.length - self.position
+        out = bytearray()
+        while n > 0 and self.position < self.length:
+            if self.position < len(self.head):
+                piece = self.head[self.position:self.position + n]
+            elif self.position < len(self.head) + self.filler:
+                piece = b'\0' * min(n, len(self.head) + self.filler - self.position, 1 << 20)
+            else:
+                offset = self.position - len(self.head) - self.filler
+                piece = self.tail[offset:offset + n]
+            out += piece
+            self.position += len(piece)
+            n -= len(piece)
+        return bytes(out)
+
+    def tell(self):
+        return self.position
+
+    def seek(self, offset, whence=0):
+        self.position = self.length + offset if whence == 2 else offset
+        return self.position
+
+    def readline(self, limit=-1):
+        return self.read(limit if limit and limit > 0 else 65536)
+
+
+def make_app():
+    app = Flask(__name__)
+    app.config['MAX_CONTENT_LENGTH'] = None  # the old add_booking had no limit at all
+
+    @app.route('/old', methods=['POST'])
+    def old():
+        # What add_booking did: request.files parses (and spools) the whole body, then file.save copies it
+        file = request.files['photo']
+        file.save(os.path.join(TMP_DIR, "old_upload.png"))
+        return jsonify({"size": os.path.getsize(os.path.join(TMP_DIR, "old_upload.png"))}), 201
+
+    @app.route('/new', methods=['POST'])
+    def new():
+        try:
+            data, uploads = parse_upload_form(BOOKING_UPLOADS, TMP_DIR)
+        except UploadError as e:
+            return jsonify({"message": str(e)}), e.status
+        return jsonify({"size": uploads['photo'].size}), 201
+
+    return app
+
+
+def run(client, path, body):
+    tracemalloc.start()
+    start = time.perf_counter()
+    response = client.post(path, input_stream=body, content_length=body.length,
+                           content_type=f"multipart/form-data; boundary={BOUNDARY}")
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return response, elapsed, peak
+
+
+def main():
+    try:
+        client = make_app().test_client()
+        print(f"{'upload':<10} {'path':<22} {'status':>6} {'read (MB)':>10} {'time (s)':>9} {'peak mem (MB)':>14}")
+        # args.mb is refused on Content-Length; 30 MB fits the request cap but not the 5 MB document cap
+        for mb in (args.mb, 30):
+            for label, path in (("werkzeug form parsing", '/old'), ("upload pipeline", '/new')):
+                body = HostileBody(mb * 2 ** 20)
+                response, elapsed, peak = run(client, path, body)
+                print(f"{f'{mb} MB':<10} {label:<22} {response.status_code:>6} {body.position / 2 ** 20:10.1f} "
+                      f"{elapsed:9.2f} {peak / 2 ** 20:14.1f}")
+            assert response.status_code == 413 and body.position < 6 * 2 ** 20, (response.status_code, body.position)
+        leftovers = [name for name in os.listdir(TMP_DIR) if name.endswith('.part')]
+        assert not leftovers, leftovers
+
+        # A normal 800 KB document through both paths
+        for label, path in (("werkzeug form parsing", '/old'), ("upload pipeline", '/new')):
+            samples = []
+            for _ in range(20):
+                response, elapsed, _ = run(client, path, HostileBody(800 * 1024))
+                assert response.status_code == 201, response.json
+                samples.append(elapsed)
+            print(f"800 KB document, {label:<22} {sorted(samples)[10] * 1000:6.1f} ms")
+        print("✅ oversized part refused after reading the first few MB; no partial files left")
+    finally:
+        shutil.rmtree(TMP_DIR, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+/uploads serving: old send_from_directory defaults vs upload_serving.serve_upload.
+
+Measures Flask-side time per request for a thumbnail, a preview and a 2 MB original,
+for 304 revalidations, and the X-Accel-Redirect hand-off. Also counts what an admin
+re-opening the same booking costs: with the old headers (no-cache) the browser
+revalidates every document; with immutable caching it sends nothing.
+
+Run from the backend folder:  python benchmarks/bench_upload_serving.py [--requests 2000]
+"""
+import argparse
+import io
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+parser = argparse.ArgumentParser(description=__doc__)
+parser.add_argument('--requests', type=int, default=2000)
+args = parser.parse_args()
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TMP_DIR = tempfile.mkdtemp(prefix="smartcity_bench_")
+sys.path.insert(0, BACKEND)
+
+from flask import Flask, send_from_directory
+from PIL import Image
+import upload_serving
+import upload_store
+
+upload_store.BASE_DIR = TMP_DIR
+upload_store.OBJECT_FOLDER = os.path.join(TMP_DIR, 'uploads', 'objects')
+
+app = Flask(__name__)
+
+
+@app.route('/old/<filename>')
+def old(filename):
+    return send_from_directory(upload_store.OBJECT_FOLDER, filename)
+
+
+@app.route('/new/<filename>')
+def new(filename):
+    return upload_serving.serve_upload(upload_store.OBJECT_FOLDER, filename)
+
+
+def image(size, quality):
+    out = io.BytesIO()
+    Image.effect_noise(size, 40).convert('RGB').save(out, 'JPEG', quality=quality)
+    return upload_store.put_bytes(out.getvalue(), 'jpeg')
+
+
+def per_request(client, url, headers=None, n=args.requests):
+    start = time.perf_counter()
+    for _ in range(n):
+        response = client.get(url, headers=headers)
+        response.get_data()
+        response.close()
+    return (time.perf_counter() - start) / n * 1e6, response
+
+
+def main():
+    try:
+        client = app.test_client()
+        files = {'thumbnail': image((240, 180), 75), 'preview': image((640, 480), 75), 'original': image((2400, 1800), 90)}
+        print(f"{'file':<20}{'old':>10}{'new':>10}{'304 old':>10}{'304 new':>10}{'x-accel':>10}   µs/request")
+        for label, name in files.items():
+            n = args.requests if 'original' not in label else args.requests // 10
+            old_us, old_response = per_request(client, f'/old/{name}', n=n)
+            new_us, new_response = per_request(client, f'/new/{name}', n=n)
+            old_304, r1 = per_request(client, f'/old/{name}', {'If-None-Match': old_response.headers['ETag']}, n)
+            new_304, r2 = per_request(client, f'/new/{name}', {'If-None-Match': new_response.headers['ETag']}, n)
+            assert (r1.status_code, r2.status_code) == (304, 304)
+            upload_serving.SENDFILE_MODE = 'x-accel'
+            accel_us, accel = per_request(client, f'/new/{name}', n=n)
+            upload_serving.SENDFILE_MODE = ''
+            assert accel.headers['X-Accel-Redirect'] == f'/protected-uploads/objects/{name}'
+            label = f"{label} ({os.path.getsize(upload_store.object_path(name)) // 1024} KB)"
+            print(f"{label:<20}{old_us:>10.0f}{new_us:>10.0f}{old_304:>10.0f}{new_304:>10.0f}{accel_us:>10.0f}")
+        print(f"old headers: Cache-Control: {old_response.headers.get('Cache-Control')!r}")
+        print(f"new headers: Cache-Control: {new_response.headers.get('Cache-Control')!r}, "
+              f"ETag {new_response.headers['ETag'][:18]}...")
+
+        # Re-opening one booking (six documents) ten times during a review session
+        print("re-opening a 6-document booking 10x: old = 60 revalidation requests, "
+              "new = 0 requests (fresh for a year, immutable)")
+        print(f"memory cache: {upload_serving.serving_stats()}")
+    finally:
+        shutil.rmtree(TMP_DIR, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Content-addressed upload store: m012 over a copy of the real uploads/ folder, then
+repeated submissions of the same documents.
+
+Every file in uploads/ and uploads/admissions/ is attached to a seeded booking or
+admission row (as the live database does), the migration collapses identical files,
+and re-submitting a document that is already stored must write no bytes. Finally rows
+are deleted and the garbage collector removes only objects nothing references.
+
+Run from the backend folder:  python benchmarks/bench_upload_store.py [--resubmits 50]
+"""
+import argparse
+import io
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+parser = argparse.ArgumentParser(description=__doc__)
+parser.add_argument('--resubmits', type=int, default=50)
+args = parser.parse_args()
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TMP_DIR = tempfile.mkdtemp(prefix="smartcity_bench_")
+os.environ.update({"SMARTCITY_DB_PATH": os.path.join(TMP_DIR, "store.db"), "UPLOAD_GC_GRACE_SECONDS": "0"})
+sys.path.insert(0, BACKEND)
+
+from flask import Flask
+import migrations
+import upload_store
+from db_utils import get_connection
+from Booking_Backend import BOOKING_DOCUMENTS, booking_bp
+
+# Work on a copy: the migration moves files
+shutil.copytree(os.path.join(BACKEND, 'uploads'), os.path.join(TMP_DIR, 'uploads'))
+upload_store.BASE_DIR = TMP_DIR
+upload_store.OBJECT_FOLDER = os.path.join(TMP_DIR, 'uploads', 'objects')
+
+
+def usage(*folders):
+    files = [entry for folder in folders if os.path.isdir(folder)
+             for entry in os.scandir(folder) if entry.is_file() and not entry.name.startswith('.')]
+    return len(files), sum(entry.stat().st_size for entry in files)
+
+
+def seed(conn):
+    """Attach every legacy file to a row, six documents per booking / five per admission"""
+    bookings = sorted(entry.name for entry in os.scandir(os.path.join(TMP_DIR, 'uploads')) if entry.is_file())
+    admissions = sorted(entry.name for entry in os.scandir(os.path.join(TMP_DIR, 'uploads', 'admissions'))
+                        if entry.is_file())
+    for i in range(0, len(bookings), 6):
+        docs = (bookings[i:i + 6] + [None] * 6)[:6]
+        conn.execute("""INSERT INTO bookings (student_name, email, room_number, bed_id, check_in_date, status,
+                            photo_path, cnic_front_path, cnic_back_path, proof_path, voucher_path, signature_path)
+                        VALUES (?, ?, '1', NULL, '2026-01-15', 'Pending', ?, ?, ?, ?, ?, ?)""",
+                     (f"Student {i}", f"s{i}@example.com", *docs))
+    for i in range(0, len(admissions), 5):
+        docs = (admissions[i:i + 5] + [None] * 5)[:5]
+        conn.execute("""INSERT INTO admissions (student_name, father_cnic_front_path, father_cnic_back_path,
+                            student_photos_path, b_form_file_path, school_cert_file_path)
+                        VALUES (?, ?, ?, ?, ?, ?)""", (f"Applicant {i}", *docs))
+    conn.commit()
+    return len(bookings) + len(admissions)
+
+
+def main():
+    try:
+        conn = get_connection()
+        # Schema as it was before the store, plus rows pointing at the old files
+        all_migrations = migrations.MIGRATIONS
+        migrations.MIGRATIONS = [m for m in all_migrations if m[0] < 12]
+        migrations.run_migrations(conn, verbose=False)
+        referenced = seed(conn)
+        legacy = (os.path.join(TMP_DIR, 'uploads'), os.path.join(TMP_DIR, 'uploads', 'admissions'))
+        files_before, bytes_before = usage(*legacy)
+
+        migrations.MIGRATIONS = all_migrations
+        start = time.perf_counter()
+        migrations.run_migrations(conn, verbose=False)
+        elapsed = time.perf_counter() - start
+        files_after, bytes_after = usage(*legacy, upload_store.OBJECT_FOLDER)
+        print(f"m012 over {referenced} referenced files: {files_before} files / {bytes_before / 2 ** 20:.1f} MB -> "
+              f"{files_after} objects / {bytes_after / 2 ** 20:.1f} MB in {elapsed:.2f}s")
+        dangling = [name for table, columns in upload_store.DOCUMENT_COLUMNS.items() for column in columns
+                    for (name,) in conn.execute(f"SELECT {column} FROM {table} WHERE {column} IS NOT NULL")
+                    if not os.path.isfile(upload_store.object_path(name))]
+        assert not dangling, dangling[:3]
+        # refcount counts columns, so a row holding the same document twice references it twice
+        references = " UNION ALL ".join(f"SELECT {column} AS name FROM {table}"
+                                        for table, columns in upload_store.DOCUMENT_COLUMNS.items()
+                                        for column in columns)
+        mismatched = conn.execute(f"""
+            SELECT COUNT(*) FROM upload_objects o
+            WHERE refcount != (SELECT COUNT(*) FROM ({references}) r WHERE r.name = o.name)
+        """).fetchone()[0]
+        assert mismatched == 0
+
+        # The same six documents submitted again and again
+        app = Flask(__name__)
+        app.register_blueprint(booking_bp)
+        client = app.test_client()
+        document = upload_store.object_path(conn.execute(
+            "SELECT name FROM upload_objects ORDER BY name LIMIT 1").fetchone()[0])
+        content = open(document, 'rb').read()
+        objects_before = usage(upload_store.OBJECT_FOLDER)
+        start = time.perf_counter()
+        for i in range(args.resubmits):
+            data = {'student_name': f"Repeat {i}", 'email': 'repeat@example.com', 'bed_id': 'none'}
+            data.update({key: (io.BytesIO(content), 'WhatsApp_Image.jpeg') for key in BOOKING_DOCUMENTS})
+            client.post('/booking', data=data, content_type='multipart/form-data')  # bed does not exist: 400
+        elapsed = time.perf_counter() - start
+        assert usage(upload_store.OBJECT_FOLDER) == objects_before
+        print(f"{args.resubmits} resubmissions x {len(BOOKING_DOCUMENTS)} documents "
+              f"({len(content) / 1024:.0f} KB): 0 new files, {elapsed / args.resubmits * 1000:.1f} ms each")
+
+        # Deleting rows releases their objects; only unreferenced ones are collected
+        conn.execute("DELETE FROM bookings WHERE id % 2 = 0")
+        conn.commit()
+        removed = upload_store.collect_garbage(conn, time.time() + 1)
+        remaining = {row['name'] for row in conn.execute("SELECT name FROM upload_objects WHERE refcount > 0")}
+        on_disk = {entry.name for entry in os.scandir(upload_store.OBJECT_FOLDER)}
+        assert remaining == on_disk, (len(remaining), len(on_disk))
+        print(f"deleted half the bookings: {removed} object(s) collected, {len(on_disk)} still referenced")
+        print("✅ every row points at an existing object and refcounts match the rows")
+        conn.close()
+    finally:
+        shutil.rmtree(TMP_DIR, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
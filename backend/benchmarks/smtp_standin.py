@@ -0,0 +1,91 @@
+"""
+Minimal local SMTP server for exercising the mail code without a real provider.
+
+No TLS or AUTH: run the backend with SMTP_HOST=127.0.0.1, SMTP_PORT=<port> and
+SMTP_STARTTLS=0. connect_delay / data_delay simulate a remote server's handshake
+and per-message latency; fail_first makes the first N messages fail with a 451;
+max_per_session drops the connection after that many messages, like providers that
+cap messages per session.
+"""
+import socketserver
+import threading
+import time
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def reply(self, line):
+        self.wfile.write(line.encode() + b"\r\n")
+
+    def handle(self):
+        standin = self.server.standin
+        with standin.lock:
+            standin.sessions += 1
+        time.sleep(standin.connect_delay)
+        self.reply("220 standin ESMTP")
+        mail_from, rcpt_to, accepted = None, [], 0
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                break
+            command = line.decode(errors='replace').strip()
+            verb = command[:4].upper()
+            if verb in ('EHLO', 'HELO'):
+                self.reply("250 standin")
+            elif verb == 'MAIL':
+                mail_from, rcpt_to = command[10:], []
+                self.reply("250 OK")
+            elif verb == 'RCPT':
+                rcpt_to.append(command[8:])
+                self.reply("250 OK")
+            elif verb == 'DATA':
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                data = []
+                for data_line in iter(self.rfile.readline, b''):
+                    if data_line == b".\r\n":
+                        break
+                    data.append(data_line)
+                time.sleep(standin.data_delay)
+                with standin.lock:
+                    failing = standin.failures_left > 0
+                    if failing:
+                        standin.failures_left -= 1
+                    else:
+                        standin.messages.append((mail_from, rcpt_to, b''.join(data)))
+                self.reply("451 Temporary failure, try again" if failing else "250 OK queued")
+                accepted += 1
+                if standin.max_per_session and accepted >= standin.max_per_session:
+                    break
+            elif verb in ('RSET', 'NOOP'):
+                self.reply("250 OK")
+            elif verb == 'QUIT':
+                self.reply("221 Bye")
+                break
+            else:
+                self.reply("502 Command not implemented")
+
+
+class _Server(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class SMTPStandIn:
+    def __init__(self, connect_delay=0.0, data_delay=0.0, fail_first=0, max_per_session=0):
+        self.connect_delay = connect_delay
+        self.data_delay = data_delay
+        self.failures_left = fail_first
+        self.max_per_session = max_per_session
+        self.messages = []
+        self.sessions = 0
+        self.lock = threading.Lock()
+        self._server = None
+
+    def start(self, host='127.0.0.1', port=0):
+        self._server = _Server((host, port), _Handler)
+        self._server.standin = self
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self._server.server_address
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
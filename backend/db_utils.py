@@ -0,0 +1,138 @@
+import sqlite3
+import os
+import threading
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DB_PATH = os.getenv("SMARTCITY_DB_PATH", os.path.join(BASE_DIR, "smartcity.db"))
+
+# Connection tuning (override through environment variables if needed)
+BUSY_TIMEOUT_MS = int(os.getenv("SMARTCITY_DB_BUSY_TIMEOUT_MS", 5000))
+CACHE_SIZE_KB = int(os.getenv("SMARTCITY_DB_CACHE_KB", 20000))           # page cache per connection
+MMAP_SIZE = int(os.getenv("SMARTCITY_DB_MMAP_BYTES", 128 * 1024 * 1024))  # memory-mapped I/O window
+STATEMENT_CACHE_SIZE = int(os.getenv("SMARTCITY_DB_STATEMENT_CACHE", 256))  # sqlite3 default is 128
+MAX_IDLE_CONNECTIONS = int(os.getenv("SMARTCITY_DB_POOL_SIZE", 16))
+
+
+class PooledConnection(sqlite3.Connection):
+    """sqlite3 connection whose close() hands it back to the pool instead of closing it."""
+
+    pool = None
+    checked_out = False
+
+    def close(self):
+        # Closing twice must not put the same connection into the pool twice
+        if self.checked_out:
+            self.checked_out = False
+            self.pool.release(self)
+
+    def really_close(self):
+        super().close()
+
+
+class ConnectionPool:
+    """
+    Keeps configured connections alive between requests.
+
+    Idle connections are handed out LIFO, so under steady load a worker thread gets
+    back the warm connection it released last. This also works with the threaded
+    dev server, where every request runs on a brand-new thread.
+    """
+
+    def __init__(self, db_path, max_idle=MAX_IDLE_CONNECTIONS):
+        self.db_path = db_path
+        self.max_idle = max_idle
+        self._idle = []
+        self._lock = threading.Lock()
+        self._stats = {
+            'opened': 0,
+            'reused': 0,
+            'released': 0,
+            'rolled_back': 0,
+            'discarded': 0,
+            'in_use': 0,
+        }
+
+    def _open(self):
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=BUSY_TIMEOUT_MS / 1000,
+            cached_statements=STATEMENT_CACHE_SIZE,
+            check_same_thread=False,
+            factory=PooledConnection,
+        )
+        conn.pool = self
+        conn.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}")
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = NORMAL")
+        conn.execute(f"PRAGMA cache_size = -{CACHE_SIZE_KB}")
+        conn.execute(f"PRAGMA mmap_size = {MMAP_SIZE}")
+        conn.execute("PRAGMA temp_store = MEMORY")
+        return conn
+
+    def acquire(self):
+        with self._lock:
+            conn = self._idle.pop() if self._idle else None
+            self._stats['reused' if conn is not None else 'opened'] += 1
+            self._stats['in_use'] += 1
+        if conn is None:
+            try:
+                conn = self._open()
+            except sqlite3.Error:
+                with self._lock:
+                    self._stats['opened'] -= 1
+                    self._stats['in_use'] -= 1
+                raise
+        conn.row_factory = sqlite3.Row
+        conn.checked_out = True
+        return conn
+
+    def release(self, conn):
+        # Never hand out a connection with a half-finished transaction
+        rolled_back = False
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+                rolled_back = True
+            keep = True
+        except sqlite3.Error:
+            keep = False
+
+        with self._lock:
+            self._stats['in_use'] -= 1
+            self._stats['released'] += 1
+            if rolled_back:
+                self._stats['rolled_back'] += 1
+            if keep and len(self._idle) < self.max_idle:
+                self._idle.append(conn)
+                return
+            self._stats['discarded'] += 1
+        conn.really_close()
+
+    def close_all(self):
+        """Close every idle connection"""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.really_close()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['idle'] = len(self._idle)
+        acquired = stats['opened'] + stats['reused']
+        stats['acquired'] = acquired
+        stats['reuse_ratio'] = round(stats['reused'] / acquired, 4) if acquired else 0.0
+        return stats
+
+
+_pool = ConnectionPool(DB_PATH)
+
+
+def get_connection():
+    """Get a pooled connection (rows as sqlite3.Row). Call close() to return it."""
+    return _pool.acquire()
+
+
+def pool_stats():
+    """Connection reuse counters for the shared pool"""
+    return _pool.stats()
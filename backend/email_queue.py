@@ -0,0 +1,208 @@
+import os
+import random
+import threading
+from db_utils import get_connection
+from mailer_utils import (build_admission_verification_emails, build_fee_reminder_emails,
+                          build_verification_emails, deliver_message)
+
+# Worker pool and retry policy
+OUTBOX_WORKERS = int(os.getenv("EMAIL_WORKERS", "4"))
+MAX_ATTEMPTS = int(os.getenv("EMAIL_MAX_ATTEMPTS", "5"))
+RETRY_BASE_SECONDS = float(os.getenv("EMAIL_RETRY_BASE_SECONDS", "30"))
+RETRY_MAX_SECONDS = float(os.getenv("EMAIL_RETRY_MAX_SECONDS", "3600"))
+# Kinds that cannot wait that long between attempts (an OTP expires after 10 minutes)
+RETRY_BASE_SECONDS_BY_KIND = {
+    'otp': float(os.getenv("OTP_RETRY_BASE_SECONDS", "2")),
+}
+# A claimed message is retried by another worker if its sender has not reported back by then
+LEASE_SECONDS = 300
+# Idle workers re-check the outbox this often (enqueue wakes them immediately)
+POLL_SECONDS = float(os.getenv("EMAIL_POLL_SECONDS", "5"))
+
+# Notification kinds -> function that renders the message fields for a list of rows
+EMAIL_BUILDERS = {
+    'booking_verified': build_verification_emails,
+    'admission_verified': build_admission_verification_emails,
+    'fee_reminder': build_fee_reminder_emails,
+}
+
+# Run after a message of this kind is delivered (bound to its ref_id)
+ON_SENT = {
+    'fee_reminder': "UPDATE fee_reminders SET email_sent = 1, email_sent_at = CURRENT_TIMESTAMP, status = 'sent' WHERE id = ?",
+}
+
+# Run when a message of this kind gives up after MAX_ATTEMPTS
+ON_FAILED = {
+    'fee_reminder': "UPDATE fee_reminders SET status = 'failed' WHERE id = ?",
+}
+
+_wakeup = threading.Event()
+
+
+def enqueue_message(recipient, subject, html, from_name, text=None, kind='custom', ref_id=None, conn=None,
+                    priority=0):
+    """
+    Add a message to email_outbox and return its id.
+
+    Pass the request's connection to write it in the same transaction as the change
+    that triggered it (the caller commits); without one it is committed right away.
+    Messages with a higher priority are claimed first.
+    """
+    own_conn = conn is None
+    if own_conn:
+        conn = get_connection()
+    try:
+        message_id = conn.execute("""
+            INSERT INTO email_outbox (kind, ref_id, recipient, subject, html, body_text, from_name, priority)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """, (kind, ref_id, recipient, subject, html, text, from_name, priority)).lastrowid
+        if own_conn:
+            conn.commit()
+    finally:
+        if own_conn:
+            conn.close()
+    _wakeup.set()
+    return message_id
+
+
+def enqueue_email(kind, payload, conn=None):
+    """Render a notification for a booking/admission row and queue it"""
+    payload = dict(payload)
+    message = EMAIL_BUILDERS[kind]([payload])[0]
+    return enqueue_message(kind=kind, ref_id=payload.get('id'), conn=conn, **message)
+
+
+def enqueue_emails(kind, payloads, conn=None):
+    """Render one notification per row in a single batch and queue them with one executemany"""
+    payloads = [dict(p) for p in payloads]
+    if not payloads:
+        return 0
+    messages = EMAIL_BUILDERS[kind](payloads)
+    own_conn = conn is None
+    if own_conn:
+        conn = get_connection()
+    try:
+        conn.executemany("""
+            INSERT INTO email_outbox (kind, ref_id, recipient, subject, html, body_text, from_name)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, [(kind, p.get('id'), m['recipient'], m['subject'], m['html'], m['text'], m['from_name'])
+              for p, m in zip(payloads, messages)])
+        if own_conn:
+            conn.commit()
+    finally:
+        if own_conn:
+            conn.close()
+    _wakeup.set()
+    return len(messages)
+
+
+def claim_next(conn):
+    """Take the most urgent due message (status -> 'sending'); None when nothing is due"""
+    message = conn.execute(f"""
+        UPDATE email_outbox
+        SET status = 'sending', attempts = attempts + 1, next_attempt_at = datetime('now', '+{LEASE_SECONDS} seconds')
+        WHERE id = (
+            SELECT id FROM email_outbox
+            WHERE status IN ('pending', 'sending') AND next_attempt_at <= datetime('now')
+            ORDER BY priority DESC, next_attempt_at LIMIT 1
+        )
+        RETURNING *
+    """).fetchone()
+    conn.commit()
+    return message
+
+
+def retry_delay(attempts, kind=None):
+    """Exponential backoff with +/-20% jitter so failed messages do not retry in lockstep"""
+    base = RETRY_BASE_SECONDS_BY_KIND.get(kind, RETRY_BASE_SECONDS)
+    delay = min(RETRY_MAX_SECONDS, base * 2 ** (attempts - 1))
+    return delay * random.uniform(0.8, 1.2)
+
+
+def record_result(conn, message, error=None):
+    if error is None:
+        conn.execute("UPDATE email_outbox SET status = 'sent', sent_at = datetime('now'), last_error = NULL WHERE id = ?",
+                     (message['id'],))
+        if message['kind'] in ON_SENT and message['ref_id']:
+            conn.execute(ON_SENT[message['kind']], (message['ref_id'],))
+    elif message['attempts'] >= MAX_ATTEMPTS:
+        conn.execute("UPDATE email_outbox SET status = 'failed', last_error = ? WHERE id = ?", (error, message['id']))
+        if message['kind'] in ON_FAILED and message['ref_id']:
+            conn.execute(ON_FAILED[message['kind']], (message['ref_id'],))
+    else:
+        conn.execute("""
+            UPDATE email_outbox SET status = 'pending', last_error = ?,
+                next_attempt_at = datetime('now', '+' || ? || ' seconds')
+            WHERE id = ?
+        """, (error, round(retry_delay(message['attempts'], message['kind']), 3), message['id']))
+    conn.commit()
+
+
+def deliver_next(send=deliver_message):
+    """Claim and send one message. Returns False when the outbox had nothing due."""
+    conn = get_connection()
+    try:
+        message = claim_next(conn)
+        if message is None:
+            return False
+        # No transaction is open while talking to the SMTP server
+        try:
+            send(message['recipient'], message['subject'], message['html'], message['from_name'], message['body_text'])
+            error = None
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        record_result(conn, message, error)
+        if error:
+            print(f"⚠️ Email #{message['id']} to {message['recipient']} failed (attempt {message['attempts']}): {error}")
+        return True
+    finally:
+        conn.close()
+
+
+class OutboxWorkerPool:
+    """Threads that drain email_outbox until stopped"""
+
+    def __init__(self, workers=OUTBOX_WORKERS, send=deliver_message):
+        self.workers = workers
+        self.send = send
+        self._stop_event = threading.Event()
+        self._threads = []
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            try:
+                if deliver_next(self.send):
+                    continue
+            except Exception as e:
+                print(f"⚠️ Email outbox worker error: {e}")
+            _wakeup.wait(POLL_SECONDS)
+            _wakeup.clear()
+
+    def start(self):
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f"email-outbox-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def stop(self, timeout=None):
+        self._stop_event.set()
+        _wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout)
+
+
+_pool = None
+
+
+def start_outbox_workers():
+    """Start the delivery pool once per process (EMAIL_WORKERS=0 disables it)"""
+    global _pool
+    if _pool is None and OUTBOX_WORKERS > 0:
+        _pool = OutboxWorkerPool().start()
+    return _pool
+
+
+def outbox_stats(conn):
+    return {row['status']: row['n'] for row in
+            conn.execute("SELECT status, COUNT(*) AS n FROM email_outbox GROUP BY status")}
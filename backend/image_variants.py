@@ -0,0 +1,210 @@
+import os
+import queue
+import threading
+from PIL import Image, ImageOps
+import upload_store
+
+# Downscaled copies of image uploads for the admin document viewer: variant -> longest
+# side in pixels. Served by /uploads/<variant>/<name>; /uploads/<name> stays the original.
+VARIANTS = {'thumb': 320, 'medium': 1280}
+VARIANT_FORMAT = os.getenv("IMAGE_VARIANT_FORMAT", "webp")  # or "jpeg"
+VARIANT_QUALITY = int(os.getenv("IMAGE_VARIANT_QUALITY", "80"))
+# Background renderers (IMAGE_VARIANT_WORKERS=0 renders on first request instead) and how
+# many uploads may wait for them; beyond that they are rendered on first request too
+VARIANT_WORKERS = int(os.getenv("IMAGE_VARIANT_WORKERS", "1"))
+VARIANT_QUEUE_LIMIT = int(os.getenv("IMAGE_VARIANT_QUEUE_LIMIT", "1000"))
+# Refuse to decode anything larger; a 5 MB upload can still claim gigabytes once decoded
+MAX_SOURCE_PIXELS = 50_000_000
+# A request for a preview that is being rendered waits this long for it before falling back
+RENDER_WAIT_SECONDS = 10
+
+_EXTENSIONS = {'webp': 'webp', 'jpeg': 'jpg'}
+_SAVE_OPTIONS = {
+    'webp': {'quality': VARIANT_QUALITY, 'method': 4},
+    'jpeg': {'quality': VARIANT_QUALITY, 'optimize': True, 'progressive': True},
+}
+_IMAGE_KINDS = ('png', 'jpeg', 'webp')
+
+_stats = {'rendered': 0, 'on_demand': 0, 'joined': 0, 'failed': 0, 'dropped': 0}
+_stats_lock = threading.Lock()
+# Object name -> Event set when its render finishes; concurrent requests wait on it
+_rendering = {}
+_rendering_lock = threading.Lock()
+
+
+def _count(key):
+    with _stats_lock:
+        _stats[key] += 1
+
+
+def has_variants(name):
+    """Only image objects in the upload store get variants"""
+    return upload_store.is_object_name(name) and name.rsplit('.', 1)[1] in _IMAGE_KINDS
+
+
+def variant_name(name, variant):
+    sha256 = name.split('.', 1)[0]
+    return f"{sha256}.{variant}.{_EXTENSIONS[VARIANT_FORMAT]}"
+
+
+def variant_path(name, variant):
+    return os.path.join(upload_store.VARIANT_FOLDER, variant_name(name, variant))
+
+
+def render_variants(name):
+    """
+    Write every missing variant of the stored image `name`, largest first, each one
+    shrunk from the previous so the original is decoded once. Returns how many were written.
+    """
+    missing = [variant for variant in VARIANTS if not os.path.exists(variant_path(name, variant))]
+    if not missing:
+        return 0
+    with Image.open(upload_store.object_path(name)) as original:
+        if original.width * original.height > MAX_SOURCE_PIXELS:
+            raise ValueError(f"{original.width}x{original.height} image is too large to preview")
+        # JPEG decodes at 1/2..1/8 scale directly; most phone photos never need full resolution
+        largest = max(VARIANTS[variant] for variant in missing)
+        original.draft('RGB', (largest, largest))
+        image = ImageOps.exif_transpose(original)
+        keep_alpha = VARIANT_FORMAT == 'webp' and (image.mode in ('RGBA', 'LA', 'PA') or 'transparency' in image.info)
+        image = image.convert('RGBA' if keep_alpha else 'RGB')
+    for variant in sorted(missing, key=VARIANTS.get, reverse=True):
+        image.thumbnail((VARIANTS[variant], VARIANTS[variant]), Image.LANCZOS, reducing_gap=3.0)
+        temp = upload_store.temp_path(upload_store.VARIANT_FOLDER)
+        try:
+            image.save(temp, VARIANT_FORMAT.upper(), **_SAVE_OPTIONS[VARIANT_FORMAT])
+            os.replace(temp, variant_path(name, variant))
+        except Exception:
+            if os.path.exists(temp):
+                os.remove(temp)
+            raise
+    _count('rendered')
+    return len(missing)
+
+
+def render_once(name):
+    """
+    render_variants, unless another thread is already rendering `name`: then wait for
+    it instead of decoding the same image again. Returns True if this call rendered.
+    """
+    with _rendering_lock:
+        done = _rendering.get(name)
+        if done is None:
+            done = _rendering[name] = threading.Event()
+            owner = True
+        else:
+            owner = False
+    if not owner:
+        _count('joined')
+        done.wait(RENDER_WAIT_SECONDS)
+        return False
+    try:
+        render_variants(name)
+    finally:
+        with _rendering_lock:
+            del _rendering[name]
+        done.set()
+    return True
+
+
+def ensure_variant(name, variant):
+    """
+    Path of the variant, rendering it now if the background worker has not yet.
+    None when the object is not a stored image or cannot be decoded (serve the original).
+    """
+    if not has_variants(name) or not os.path.exists(upload_store.object_path(name)):
+        return None
+    path = variant_path(name, variant)
+    if os.path.exists(path):
+        return path
+    try:
+        if render_once(name):
+            _count('on_demand')
+    except Exception as e:
+        _count('failed')
+        print(f"⚠️ Could not render {variant} preview of {name}: {e}")
+        return None
+    return path if os.path.exists(path) else None
+
+
+class VariantWorkerPool:
+    """Threads that render variants for queued uploads until stopped"""
+
+    def __init__(self, workers=VARIANT_WORKERS, queue_limit=VARIANT_QUEUE_LIMIT):
+        self.workers = workers
+        self._queue = queue.Queue(queue_limit)
+        self._queued = set()
+        self._lock = threading.Lock()
+        self._threads = []
+
+    def submit(self, name):
+        """Queue `name`; False if it is already waiting or the queue is full"""
+        with self._lock:
+            if name in self._queued:
+                return False
+            try:
+                self._queue.put_nowait(name)
+            except queue.Full:
+                _count('dropped')
+                return False
+            self._queued.add(name)
+        return True
+
+    def _run(self):
+        while True:
+            name = self._queue.get()
+            if name is None:
+                return
+            with self._lock:
+                self._queued.discard(name)
+            try:
+                render_once(name)
+            except Exception as e:
+                _count('failed')
+                print(f"⚠️ Image variant worker error for {name}: {e}")
+
+    def start(self):
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f"image-variants-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def stop(self, timeout=None):
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def pending(self):
+        return self._queue.qsize()
+
+
+_pool = None
+
+
+def schedule_variants(name):
+    """Render the variants of a new upload in the background (they are rendered on first request otherwise)"""
+    if _pool is not None and has_variants(name):
+        _pool.submit(name)
+
+
+def start_variant_workers():
+    """
+    Start the render pool once per process (IMAGE_VARIANT_WORKERS=0 disables it) and
+    queue stored images that have no variants yet, e.g. uploads from before this existed.
+    """
+    global _pool
+    if _pool is None and VARIANT_WORKERS > 0:
+        _pool = VariantWorkerPool().start()
+        if os.path.isdir(upload_store.OBJECT_FOLDER):
+            for entry in os.scandir(upload_store.OBJECT_FOLDER):
+                if has_variants(entry.name) and not all(
+                        os.path.exists(variant_path(entry.name, variant)) for variant in VARIANTS):
+                    _pool.submit(entry.name)
+    return _pool
+
+
+def variant_stats():
+    with _stats_lock:
+        return {**_stats, 'queued': _pool.pending() if _pool else 0, 'format': VARIANT_FORMAT}
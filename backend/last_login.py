@@ -0,0 +1,117 @@
+import atexit
+import datetime
+import os
+import threading
+from db_utils import get_connection
+
+# How often buffered last_login times are written; 0 writes each login straight through
+FLUSH_INTERVAL_SECONDS = float(os.getenv("LAST_LOGIN_FLUSH_SECONDS", "5"))
+
+# A late flush never moves last_login backwards (e.g. past a write from another process)
+_FLUSH_SQL = "UPDATE users SET last_login = ? WHERE id = ? AND (last_login IS NULL OR last_login < ?)"
+
+
+def _now():
+    # Same format and clock (UTC) as CURRENT_TIMESTAMP
+    return datetime.datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')
+
+
+class LastLoginBuffer:
+    """
+    Write-behind buffer for users.last_login.
+
+    Login only records the time in memory; flush() writes everything collected
+    since the last flush in one executemany, so a login storm costs one short write
+    transaction every few seconds instead of one per login.
+    """
+
+    def __init__(self):
+        self._pending = {}  # user id -> last login time
+        self._lock = threading.Lock()
+        self._stats = {'recorded': 0, 'flushed': 0, 'flushes': 0}
+
+    def record(self, user_id):
+        with self._lock:
+            self._pending[user_id] = _now()
+            self._stats['recorded'] += 1
+
+    def pending(self, user_id):
+        """Login time not yet written for this user, or None"""
+        with self._lock:
+            return self._pending.get(user_id)
+
+    def flush(self):
+        """Write the buffered times; returns how many users were updated"""
+        with self._lock:
+            batch, self._pending = self._pending, {}
+        if not batch:
+            return 0
+        conn = get_connection()
+        try:
+            conn.executemany(_FLUSH_SQL, [(at, user_id, at) for user_id, at in batch.items()])
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            # Keep the times for the next flush unless a newer login replaced them meanwhile
+            with self._lock:
+                for user_id, at in batch.items():
+                    if self._pending.get(user_id, '') < at:
+                        self._pending[user_id] = at
+            raise
+        finally:
+            conn.close()
+        with self._lock:
+            self._stats['flushed'] += len(batch)
+            self._stats['flushes'] += 1
+        return len(batch)
+
+    def stats(self):
+        with self._lock:
+            return {**self._stats, 'pending': len(self._pending)}
+
+
+class LastLoginFlusher(threading.Thread):
+    """Background thread that flushes the buffer every interval (and once more on stop)"""
+
+    def __init__(self, buffer, interval=FLUSH_INTERVAL_SECONDS):
+        super().__init__(name="last-login-flush", daemon=True)
+        self.buffer = buffer
+        self.interval = interval
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            self._flush()
+        self._flush()
+
+    def _flush(self):
+        try:
+            self.buffer.flush()
+        except Exception as e:
+            print(f"⚠️ last_login flush failed: {e}")
+
+    def stop(self, timeout=None):
+        self._stop_event.set()
+        self.join(timeout)
+
+
+last_login_buffer = LastLoginBuffer()
+_flusher = None
+
+
+def record_login(user_id):
+    """Note a successful login; written by the flusher, or right away when it is disabled"""
+    last_login_buffer.record(user_id)
+    if _flusher is None:
+        last_login_buffer.flush()
+
+
+def start_last_login_flusher():
+    """Start the flush thread once per process (no-op when LAST_LOGIN_FLUSH_SECONDS=0)"""
+    global _flusher
+    if _flusher is None and FLUSH_INTERVAL_SECONDS > 0:
+        _flusher = LastLoginFlusher(last_login_buffer)
+        _flusher.start()
+        # Don't lose the last few seconds of logins on a clean shutdown
+        atexit.register(_flusher.stop, 5)
+    return _flusher
@@ -0,0 +1,715 @@
+"""
+Numbered schema migrations for smartcity.db.
+
+Each migration runs once, inside its own transaction, and is recorded in
+schema_migrations. Every step is written to be safe on databases that were
+created by the older ad-hoc scripts (tables/columns may already exist).
+
+    python migrations.py            # apply pending migrations
+    python migrations.py --check    # EXPLAIN QUERY PLAN check of the registered hot queries
+"""
+import os
+import re
+import shutil
+import sys
+
+from signature_utils import is_data_url, save_signature
+import upload_store
+
+BED_COUNTER_COLUMNS = {
+    'free': 'free_beds',
+    'reserved': 'reserved_beds',
+    'occupied': 'occupied_beds',
+}
+
+
+def _columns(cursor, table):
+    return [col[1] for col in cursor.execute(f"PRAGMA table_info({table})").fetchall()]
+
+
+def _add_column_if_missing(cursor, table, column, decl):
+    if column not in _columns(cursor, table):
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {decl}")
+        return True
+    return False
+
+
+# ==================== MIGRATIONS ====================
+
+def m001_baseline_schema(cursor):
+    """Tables previously created by database.py, otp_utils and ai_fee_reminder"""
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS admissions (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        admission_class TEXT,
+        admission_date TEXT,
+        student_name TEXT NOT NULL,
+        gender TEXT,
+        dob TEXT,
+        religion TEXT,
+        b_form_no TEXT,
+        father_name TEXT,
+        father_cnic TEXT,
+        father_occupation TEXT,
+        mother_name TEXT,
+        mother_education TEXT,
+        monthly_income TEXT,
+        contact_no TEXT,
+        home_address TEXT,
+        postal_address TEXT,
+        has_disability TEXT,
+        major_disability TEXT,
+        additional_disability TEXT,
+        disability_cert_no TEXT,
+        emergency_contact TEXT,
+        prev_school_details TEXT,
+        leaving_reason TEXT,
+        email TEXT,
+        father_signature TEXT,
+        father_cnic_front_path TEXT,
+        father_cnic_back_path TEXT,
+        student_photos_path TEXT,
+        b_form_file_path TEXT,
+        school_cert_file_path TEXT,
+        status TEXT DEFAULT 'Pending',
+        deleted_at TEXT
+    )""")
+    _add_column_if_missing(cursor, 'admissions', 'deleted_at', 'TEXT')
+
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS bookings (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        student_name TEXT NOT NULL,
+        father_name TEXT,
+        cnic TEXT,
+        contact TEXT,
+        email TEXT,
+        profession TEXT,
+        institute_name TEXT,
+        emergency_contact_name TEXT,
+        emergency_contact TEXT,
+        address TEXT,
+        check_in_date TEXT,
+        security_deposit REAL DEFAULT 0,
+        room_number TEXT,
+        bed_id TEXT,
+        has_vehicle TEXT,
+        vehicle_type TEXT,
+        vehicle_number TEXT,
+        status TEXT DEFAULT 'Pending',
+        photo_path TEXT,
+        cnic_front_path TEXT,
+        cnic_back_path TEXT,
+        proof_path TEXT,
+        voucher_path TEXT,
+        signature_path TEXT,
+        is_deleted INTEGER DEFAULT 0,
+        updated_at TEXT
+    )""")
+    _add_column_if_missing(cursor, 'bookings', 'is_deleted', 'INTEGER DEFAULT 0')
+    _add_column_if_missing(cursor, 'bookings', 'updated_at', 'TEXT')
+
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS rooms (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        room_number TEXT UNIQUE NOT NULL,
+        total_beds INTEGER NOT NULL
+    )""")
+
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS beds (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        room_id INTEGER,
+        bed_number TEXT UNIQUE NOT NULL,
+        status TEXT DEFAULT 'free',
+        FOREIGN KEY(room_id) REFERENCES rooms(id) ON DELETE CASCADE
+    )""")
+
+    # The same email may register once per category (hostel / school)
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS users (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        full_name TEXT NOT NULL,
+        email TEXT NOT NULL,
+        password TEXT NOT NULL,
+        role TEXT DEFAULT 'user',
+        category TEXT NOT NULL,
+        mobile TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        last_login TIMESTAMP,
+        UNIQUE(email, category)
+    )""")
+    _add_column_if_missing(cursor, 'users', 'mobile', 'TEXT')
+    _add_column_if_missing(cursor, 'users', 'last_login', 'TIMESTAMP')
+    # ALTER TABLE cannot add a CURRENT_TIMESTAMP default, so old rows are backfilled instead
+    if _add_column_if_missing(cursor, 'users', 'created_at', 'TIMESTAMP'):
+        cursor.execute("UPDATE users SET created_at = CURRENT_TIMESTAMP WHERE created_at IS NULL")
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS otp_verifications (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            email TEXT,
+            mobile TEXT,
+            otp_code TEXT NOT NULL,
+            purpose TEXT NOT NULL,
+            user_id INTEGER,
+            expires_at TIMESTAMP NOT NULL,
+            used BOOLEAN DEFAULT 0,
+            attempts INTEGER DEFAULT 0,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users (id)
+        )
+    ''')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS fee_reminders (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            student_name TEXT NOT NULL,
+            father_name TEXT NOT NULL,
+            class_room TEXT,
+            amount REAL NOT NULL,
+            due_date TEXT NOT NULL,
+            fee_type TEXT NOT NULL,
+            tone TEXT NOT NULL,
+            email TEXT NOT NULL,
+            phone TEXT,
+            admission_no TEXT,
+            late_fee REAL DEFAULT 0,
+            remarks TEXT,
+            message_subject TEXT,
+            message_body TEXT,
+            status TEXT DEFAULT 'pending',
+            email_sent BOOLEAN DEFAULT 0,
+            email_sent_at TIMESTAMP,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            sent_by TEXT,
+            deleted BOOLEAN DEFAULT 0,
+            deleted_at TIMESTAMP
+        )
+    ''')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS fee_recycle_bin (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            original_id INTEGER,
+            student_name TEXT,
+            father_name TEXT,
+            amount REAL,
+            due_date TEXT,
+            fee_type TEXT,
+            email TEXT,
+            phone TEXT,
+            status TEXT,
+            deleted_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            scheduled_delete TIMESTAMP,
+            restored BOOLEAN DEFAULT 0,
+            restored_at TIMESTAMP,
+            FOREIGN KEY (original_id) REFERENCES fee_reminders (id)
+        )
+    ''')
+
+
+def m002_room_bed_counters(cursor):
+    """free/reserved/occupied counters on rooms, kept current by triggers on beds"""
+    added = [
+        col for col in BED_COUNTER_COLUMNS.values()
+        if _add_column_if_missing(cursor, 'rooms', col, 'INTEGER NOT NULL DEFAULT 0')
+    ]
+
+    # Bed statuses are stored as 'free', 'Reserved' and 'occupied', so compare case-insensitively
+    def delta(row, sign):
+        return ", ".join(
+            f"{col} = {col} {sign} (lower({row}.status) = '{status}')"
+            for status, col in BED_COUNTER_COLUMNS.items()
+        )
+
+    cursor.execute(f"""
+    CREATE TRIGGER IF NOT EXISTS trg_beds_counters_insert AFTER INSERT ON beds
+    BEGIN
+        UPDATE rooms SET {delta('NEW', '+')} WHERE id = NEW.room_id;
+    END""")
+    cursor.execute(f"""
+    CREATE TRIGGER IF NOT EXISTS trg_beds_counters_delete AFTER DELETE ON beds
+    BEGIN
+        UPDATE rooms SET {delta('OLD', '-')} WHERE id = OLD.room_id;
+    END""")
+    cursor.execute(f"""
+    CREATE TRIGGER IF NOT EXISTS trg_beds_counters_update AFTER UPDATE OF status, room_id ON beds
+    BEGIN
+        UPDATE rooms SET {delta('OLD', '-')} WHERE id = OLD.room_id;
+        UPDATE rooms SET {delta('NEW', '+')} WHERE id = NEW.room_id;
+    END""")
+
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_beds_room_status ON beds(room_id, status)")
+
+    # Existing beds are counted once; the triggers take over from here
+    if added:
+        counts = ", ".join(
+            f"{col} = (SELECT COUNT(*) FROM beds WHERE beds.room_id = rooms.id AND lower(beds.status) = '{status}')"
+            for status, col in BED_COUNTER_COLUMNS.items()
+        )
+        cursor.execute(f"UPDATE rooms SET {counts}")
+
+
+def m003_hot_query_indexes(cursor):
+    """Secondary indexes for the queries in HOT_QUERIES"""
+    # Bookings: per-student list (active only), admin list / recycle bin, 30-day purge
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_bookings_email_active ON bookings(email, id) WHERE is_deleted = 0")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_bookings_deleted_id ON bookings(is_deleted, id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_bookings_trash_purge ON bookings(updated_at) WHERE is_deleted = 1")
+    # Covering index for bed status checks by bed label
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_beds_number_room_status ON beds(bed_number, room_id, status)")
+    # Admissions: active list (deleted_at IS NULL) and recycle bin (range on deleted_at)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_admissions_deleted_id ON admissions(deleted_at, id)")
+    # OTP lookups and expiry cleanup
+    cursor.execute("""CREATE INDEX IF NOT EXISTS idx_otp_lookup
+                      ON otp_verifications(email, purpose, used, expires_at)""")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_otp_expires ON otp_verifications(expires_at)")
+    # Fee reminders list and recycle bin
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_fee_reminders_deleted_created ON fee_reminders(deleted, created_at)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_fee_recycle_restored_deleted ON fee_recycle_bin(restored, deleted_at)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_fee_recycle_deleted ON fee_recycle_bin(deleted_at)")
+    # Login / registration lookups
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_users_email_category ON users(email, category)")
+
+
+def m004_list_filter_indexes(cursor):
+    """Indexes behind the keyset-paged, filterable admin lists"""
+    # With the is_deleted-led indexes below the planner preferred those over the
+    # single-column partial indexes from 003, so give it two-column matches instead
+    cursor.execute("DROP INDEX IF EXISTS idx_bookings_email_active")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_bookings_email ON bookings(email, is_deleted, id)")
+    cursor.execute("DROP INDEX IF EXISTS idx_bookings_trash_purge")
+    cursor.execute("""CREATE INDEX IF NOT EXISTS idx_bookings_trash_updated
+                      ON bookings(is_deleted, updated_at) WHERE is_deleted = 1""")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_bookings_status ON bookings(is_deleted, status, id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_bookings_room ON bookings(is_deleted, room_number, id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_bookings_check_in ON bookings(is_deleted, check_in_date)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_admissions_status ON admissions(deleted_at, status, id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_admissions_class ON admissions(deleted_at, admission_class, id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_admissions_date ON admissions(deleted_at, admission_date)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_admissions_email ON admissions(email, id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_fee_reminders_deleted_id ON fee_reminders(deleted, id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_fee_reminders_fee_type ON fee_reminders(deleted, fee_type, id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_fee_reminders_status ON fee_reminders(deleted, status, id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_fee_reminders_due ON fee_reminders(deleted, due_date)")
+
+
+def m005_signature_files(cursor):
+    """Move Base64 father_signature data URLs out of admissions into PNG files"""
+    # Ids first, then one row at a time, so only a single signature is in memory
+    ids = [row[0] for row in cursor.execute(
+        "SELECT id FROM admissions WHERE father_signature LIKE 'data:%'").fetchall()]
+    moved = 0
+    for admission_id in ids:
+        value = cursor.execute("SELECT father_signature FROM admissions WHERE id = ?", (admission_id,)).fetchone()[0]
+        if not is_data_url(value):
+            continue
+        try:
+            filename = save_signature(value)
+        except ValueError as e:
+            print(f"⚠️ Admission {admission_id}: signature left in place ({e})")
+            continue
+        cursor.execute("UPDATE admissions SET father_signature = ? WHERE id = ?", (filename, admission_id))
+        moved += 1
+    if moved:
+        print(f"🖊️ Moved {moved} signature(s) to the upload store (run VACUUM to reclaim the space)")
+
+
+def m006_bed_holds(cursor):
+    """Expiring holds on Reserved beds, with the hold length configured per room type"""
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS room_types (
+        name TEXT PRIMARY KEY,
+        hold_minutes INTEGER NOT NULL
+    )""")
+    cursor.execute("INSERT OR IGNORE INTO room_types (name, hold_minutes) VALUES ('standard', 2880)")
+    _add_column_if_missing(cursor, 'rooms', 'room_type', "TEXT NOT NULL DEFAULT 'standard'")
+    added = _add_column_if_missing(cursor, 'beds', 'hold_expires_at', 'TEXT')
+
+    # Only held beds carry an expiry, so the sweeper's range scan stays tiny
+    cursor.execute("""CREATE INDEX IF NOT EXISTS idx_beds_hold_expiry
+                      ON beds(hold_expires_at) WHERE hold_expires_at IS NOT NULL""")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_bookings_bed_status ON bookings(bed_id, status)")
+
+    # Any status change away from Reserved (verify, reject, delete, expiry) ends the hold
+    cursor.execute("""
+    CREATE TRIGGER IF NOT EXISTS trg_beds_clear_hold AFTER UPDATE OF status ON beds
+    WHEN lower(NEW.status) != 'reserved' AND NEW.hold_expires_at IS NOT NULL
+    BEGIN
+        UPDATE beds SET hold_expires_at = NULL WHERE id = NEW.id;
+    END""")
+
+    # Beds that were already Reserved get a full hold from now rather than expiring at once
+    if added:
+        cursor.execute("""
+        UPDATE beds SET hold_expires_at = datetime('now', '+' || (
+            SELECT COALESCE(MAX(t.hold_minutes), 2880) FROM rooms r
+            LEFT JOIN room_types t ON t.name = r.room_type WHERE r.id = beds.room_id
+        ) || ' minutes')
+        WHERE lower(status) = 'reserved'""")
+
+
+# FTS5 columns per searchable table (external content: the text lives only in the base table)
+SEARCH_COLUMNS = {
+    'bookings': ('student_name', 'father_name', 'cnic', 'contact', 'email', 'institute_name'),
+    'admissions': ('student_name', 'father_name', 'father_cnic', 'b_form_no', 'contact_no', 'email'),
+}
+
+
+def m007_search_index(cursor):
+    """FTS5 indexes over bookings and admissions, kept in sync by triggers"""
+    for table, columns in SEARCH_COLUMNS.items():
+        fts = f"{table}_fts"
+        cols = ', '.join(columns)
+        new_vals = ', '.join(f"NEW.{c}" for c in columns)
+        old_vals = ', '.join(f"OLD.{c}" for c in columns)
+        cursor.execute(f"""
+        CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5(
+            {cols}, content='{table}', content_rowid='id', prefix='2 3'
+        )""")
+        cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_{fts}_insert AFTER INSERT ON {table}
+        BEGIN
+            INSERT INTO {fts} (rowid, {cols}) VALUES (NEW.id, {new_vals});
+        END""")
+        cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_{fts}_delete AFTER DELETE ON {table}
+        BEGIN
+            INSERT INTO {fts} ({fts}, rowid, {cols}) VALUES ('delete', OLD.id, {old_vals});
+        END""")
+        # Status / soft-delete updates do not touch the indexed text, so only re-index on these columns
+        cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_{fts}_update AFTER UPDATE OF {cols} ON {table}
+        BEGIN
+            INSERT INTO {fts} ({fts}, rowid, {cols}) VALUES ('delete', OLD.id, {old_vals});
+            INSERT INTO {fts} (rowid, {cols}) VALUES (NEW.id, {new_vals});
+        END""")
+        # Index the rows that already exist
+        cursor.execute(f"INSERT INTO {fts} ({fts}) VALUES ('rebuild')")
+
+
+def m008_email_outbox(cursor):
+    """Durable queue of outgoing emails, delivered by the email_queue worker pool"""
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS email_outbox (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        kind TEXT NOT NULL,
+        ref_id INTEGER,
+        recipient TEXT NOT NULL,
+        subject TEXT NOT NULL,
+        html TEXT NOT NULL,
+        body_text TEXT,
+        from_name TEXT NOT NULL,
+        status TEXT NOT NULL DEFAULT 'pending',
+        attempts INTEGER NOT NULL DEFAULT 0,
+        next_attempt_at TEXT NOT NULL DEFAULT (datetime('now')),
+        last_error TEXT,
+        created_at TEXT NOT NULL DEFAULT (datetime('now')),
+        sent_at TEXT
+    )""")
+    # Workers only look at messages still to be (re)tried; sent/failed rows drop out of the index
+    cursor.execute("""CREATE INDEX IF NOT EXISTS idx_email_outbox_due ON email_outbox(next_attempt_at)
+                      WHERE status IN ('pending', 'sending')""")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_email_outbox_status ON email_outbox(status, id)")
+
+
+def m009_fee_campaigns(cursor):
+    """Bulk fee-reminder campaigns; each generated reminder points back at its campaign"""
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS fee_campaigns (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        fee_type TEXT NOT NULL,
+        class_room TEXT,
+        due_date TEXT NOT NULL,
+        amount REAL NOT NULL,
+        late_fee REAL DEFAULT 0,
+        tone TEXT NOT NULL DEFAULT 'formal',
+        remarks TEXT,
+        total INTEGER NOT NULL DEFAULT 0,
+        skipped INTEGER NOT NULL DEFAULT 0,
+        status TEXT NOT NULL DEFAULT 'draft',
+        sent_by TEXT,
+        created_at TEXT NOT NULL DEFAULT (datetime('now')),
+        started_at TEXT
+    )""")
+    _add_column_if_missing(cursor, 'fee_reminders', 'campaign_id', 'INTEGER REFERENCES fee_campaigns(id)')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_fee_reminders_campaign ON fee_reminders(campaign_id, status)")
+
+
+def m010_rate_limits(cursor):
+    """Token buckets shared by every worker process (see rate_limit_utils)"""
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS rate_limits (
+        key TEXT PRIMARY KEY,
+        tokens REAL NOT NULL,
+        updated_at REAL NOT NULL,
+        expires_at REAL NOT NULL
+    ) WITHOUT ROWID""")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_rate_limits_expires ON rate_limits(expires_at)")
+
+
+def m011_outbox_priority(cursor):
+    """Urgent mail (OTPs) is claimed before queued bulk mail"""
+    _add_column_if_missing(cursor, 'email_outbox', 'priority', 'INTEGER NOT NULL DEFAULT 0')
+    cursor.execute("DROP INDEX IF EXISTS idx_email_outbox_due")
+    cursor.execute("""CREATE INDEX IF NOT EXISTS idx_email_outbox_due ON email_outbox(priority DESC, next_attempt_at)
+                      WHERE status IN ('pending', 'sending')""")
+
+
+def _refcount_sql(value, delta, when="1"):
+    """Trigger statements adding delta to the upload_objects row named by value (a NEW./OLD. column)"""
+    if delta > 0:
+        return f"""
+            INSERT OR IGNORE INTO upload_objects (name, refcount) SELECT {value}, 0 WHERE {value} <> '' AND {when};
+            UPDATE upload_objects SET refcount = refcount + 1, released_at = NULL WHERE name = {value} AND {when};"""
+    return f"""
+            UPDATE upload_objects SET refcount = refcount - 1,
+                released_at = CASE WHEN refcount <= 1 THEN datetime('now') END
+            WHERE name = {value} AND {when};"""
+
+
+def _store_legacy_upload(path):
+    """Object name for an old uuid-named file, linking (or copying) it into the store if new"""
+    kind = path.rsplit('.', 1)[-1].lower() if '.' in os.path.basename(path) else 'bin'
+    name = upload_store.object_name(upload_store.hash_file(path), {'jpg': 'jpeg'}.get(kind, kind))
+    if os.path.exists(upload_store.object_path(name)):
+        return name, False
+    temp = upload_store.temp_path()
+    try:
+        os.link(path, temp)
+    except OSError:
+        shutil.copyfile(path, temp)
+    upload_store.publish(name, source=temp)
+    return name, True
+
+
+def m012_upload_store(cursor):
+    """Content-addressed document store: referenced uploads move to uploads/objects, one file per content"""
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS upload_objects (
+        name TEXT PRIMARY KEY,
+        refcount INTEGER NOT NULL DEFAULT 0,
+        released_at TEXT
+    ) WITHOUT ROWID""")
+
+    # New objects are hard links (or copies), so a rolled-back migration leaves the old
+    # files and rows intact; the originals are only removed after the commit (see below).
+    legacy_folders = {'bookings': os.path.join(upload_store.BASE_DIR, 'uploads'),
+                      'admissions': os.path.join(upload_store.BASE_DIR, 'uploads', 'admissions')}
+    renamed, missing, written = {}, 0, 0
+    for table, columns in upload_store.DOCUMENT_COLUMNS.items():
+        for column in columns:
+            names = [row[0] for row in cursor.execute(
+                f"SELECT DISTINCT {column} FROM {table} WHERE {column} <> '' AND {column} NOT LIKE 'data:%'")]
+            for name in names:
+                if upload_store.is_object_name(name):
+                    continue
+                legacy = os.path.join(legacy_folders[table], os.path.basename(name))
+                if legacy not in renamed:
+                    if not os.path.isfile(legacy):
+                        missing += 1
+                        continue
+                    renamed[legacy], new = _store_legacy_upload(legacy)
+                    written += new
+                cursor.execute(f"UPDATE {table} SET {column} = ? WHERE {column} = ?", (renamed[legacy], name))
+
+    # Reference counts from scratch; the triggers below keep them current
+    selects = ' UNION ALL '.join(f"SELECT {column} AS name FROM {table}"
+                                 for table, columns in upload_store.DOCUMENT_COLUMNS.items() for column in columns)
+    cursor.execute(f"""
+        INSERT OR REPLACE INTO upload_objects (name, refcount)
+        SELECT name, COUNT(*) FROM ({selects}) WHERE name <> '' AND name NOT LIKE 'data:%' GROUP BY name""")
+    for table, columns in upload_store.DOCUMENT_COLUMNS.items():
+        cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_{table}_uploads_insert AFTER INSERT ON {table}
+        BEGIN{''.join(_refcount_sql(f'NEW.{c}', 1) for c in columns)}
+        END""")
+        cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_{table}_uploads_delete AFTER DELETE ON {table}
+        BEGIN{''.join(_refcount_sql(f'OLD.{c}', -1) for c in columns)}
+        END""")
+        # Only a column that changed moves its reference from the old object to the new one
+        changes = ''.join(_refcount_sql(f'NEW.{c}', 1, f'OLD.{c} IS NOT NEW.{c}')
+                          + _refcount_sql(f'OLD.{c}', -1, f'OLD.{c} IS NOT NEW.{c}') for c in columns)
+        cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_{table}_uploads_update AFTER UPDATE OF {', '.join(columns)} ON {table}
+        BEGIN{changes}
+        END""")
+
+    if renamed or missing:
+        print(f"🗂️ Stored {len(renamed)} upload(s) as {written} object(s) in uploads/objects"
+              + (f"; {missing} referenced file(s) not found, left as they are" if missing else ""))
+
+    def remove_originals():
+        # Only once the rows pointing at the objects are committed; if this never runs
+        # the old files are merely left behind
+        for legacy in renamed:
+            if os.path.exists(legacy):
+                os.remove(legacy)
+    return remove_originals
+
+
+MIGRATIONS = [
+    (1, 'baseline_schema', m001_baseline_schema),
+    (2, 'room_bed_counters', m002_room_bed_counters),
+    (3, 'hot_query_indexes', m003_hot_query_indexes),
+    (4, 'list_filter_indexes', m004_list_filter_indexes),
+    (5, 'signature_files', m005_signature_files),
+    (6, 'bed_holds', m006_bed_holds),
+    (7, 'search_index', m007_search_index),
+    (8, 'email_outbox', m008_email_outbox),
+    (9, 'fee_campaigns', m009_fee_campaigns),
+    (10, 'rate_limits', m010_rate_limits),
+    (11, 'outbox_priority', m011_outbox_priority),
+    (12, 'upload_store', m012_upload_store),
+]
+
+
+# ==================== RUNNER ====================
+
+def applied_versions(conn):
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS schema_migrations (
+        version INTEGER PRIMARY KEY,
+        name TEXT NOT NULL,
+        applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )""")
+    return {row[0] for row in conn.execute("SELECT version FROM schema_migrations")}
+
+
+def run_migrations(conn, verbose=True):
+    """Apply every pending migration in order. Returns the versions applied by this call."""
+    applied_now = []
+    done = applied_versions(conn)
+    for version, name, migrate in MIGRATIONS:
+        if version in done:
+            continue
+        # IMMEDIATE takes the write lock up front, so two workers starting together
+        # cannot both apply the same step
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if conn.execute("SELECT 1 FROM schema_migrations WHERE version = ?", (version,)).fetchone():
+                conn.rollback()
+                continue
+            # A migration may return a callable for file work that must wait for the commit
+            after_commit = migrate(conn.cursor())
+            conn.execute("INSERT INTO schema_migrations (version, name) VALUES (?, ?)", (version, name))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        if after_commit is not None:
+            after_commit()
+        applied_now.append(version)
+        if verbose:
+            print(f"✅ Applied migration {version:03d}_{name}")
+    return applied_now
+
+
+# ==================== QUERY PLAN CHECK ====================
+
+# (name, sql, sample params) for the queries the API runs on every request.
+# Register new list/lookup queries here so --check covers them.
+HOT_QUERIES = [
+    ('user_bookings', "SELECT * FROM bookings WHERE email = ? AND is_deleted = 0 ORDER BY id DESC", ('a@b.c',)),
+    ('admin_bookings', "SELECT * FROM bookings WHERE is_deleted = 0 AND id < ? ORDER BY id DESC LIMIT ?", (100, 51)),
+    ('admin_bookings_status',
+     "SELECT * FROM bookings WHERE is_deleted = 0 AND status = ? ORDER BY id DESC LIMIT ?", ('Pending', 51)),
+    ('admin_bookings_room',
+     "SELECT * FROM bookings WHERE is_deleted = 0 AND room_number = ? ORDER BY id DESC LIMIT ?", ('1', 51)),
+    ('admin_bookings_check_in',
+     "SELECT * FROM bookings WHERE is_deleted = 0 AND check_in_date >= ? AND check_in_date <= ? "
+     "ORDER BY id DESC LIMIT ?", ('2024-01-01', '2024-12-31', 51)),
+    ('recycle_bin', "SELECT * FROM bookings WHERE is_deleted = 1 ORDER BY id DESC LIMIT ?", (51,)),
+    ('recycle_bin_purge', "DELETE FROM bookings WHERE is_deleted=1 AND updated_at < ?", ('2024-01-01 00:00:00',)),
+    ('bed_status', "SELECT status FROM beds WHERE bed_number=?", ('R1-B1',)),
+    ('room_beds', "SELECT id, bed_number, status FROM beds WHERE room_id=?", (1,)),
+    ('hold_expired', "SELECT bed_number FROM beds WHERE hold_expires_at <= datetime('now')", ()),
+    ('hold_next_expiry', "SELECT MIN(hold_expires_at) FROM beds WHERE hold_expires_at IS NOT NULL", ()),
+    ('hold_expire_bookings',
+     "UPDATE bookings SET status = 'Expired' WHERE bed_id IN (?) AND status = 'Pending' AND is_deleted = 0",
+     ('R1-B1',)),
+    ('admissions_active', "SELECT * FROM admissions WHERE deleted_at IS NULL AND id < ? ORDER BY id DESC LIMIT ?",
+     (100, 51)),
+    ('admissions_status',
+     "SELECT * FROM admissions WHERE deleted_at IS NULL AND status = ? ORDER BY id DESC LIMIT ?", ('Pending', 51)),
+    ('admissions_class',
+     "SELECT * FROM admissions WHERE deleted_at IS NULL AND admission_class = ? ORDER BY id DESC LIMIT ?", ('5', 51)),
+    ('admissions_date',
+     "SELECT * FROM admissions WHERE deleted_at IS NULL AND admission_date >= ? ORDER BY id DESC LIMIT ?",
+     ('2024-01-01', 51)),
+    ('admissions_email',
+     "SELECT * FROM admissions WHERE deleted_at IS NULL AND email = ? ORDER BY id DESC LIMIT ?", ('a@b.c', 51)),
+    ('admissions_trash',
+     "SELECT * FROM admissions WHERE deleted_at IS NOT NULL AND deleted_at >= ? ORDER BY deleted_at DESC",
+     ('2024-01-01 00:00:00',)),
+    ('otp_verify',
+     "SELECT * FROM otp_verifications WHERE email = ? AND purpose = ? AND used = 0 "
+     "AND expires_at > CURRENT_TIMESTAMP ORDER BY id DESC LIMIT 1",
+     ('a@b.c', 'registration')),
+    ('otp_invalidate', "UPDATE otp_verifications SET used = 1 WHERE email = ? AND purpose = ? AND used = 0",
+     ('a@b.c', 'registration')),
+    ('otp_cleanup', "DELETE FROM otp_verifications WHERE expires_at < CURRENT_TIMESTAMP", ()),
+    ('fee_reminders', "SELECT * FROM fee_reminders WHERE deleted = 0 AND id < ? ORDER BY id DESC LIMIT ?", (100, 51)),
+    ('fee_reminders_fee_type',
+     "SELECT * FROM fee_reminders WHERE deleted = 0 AND fee_type = ? ORDER BY id DESC LIMIT ?", ('School', 51)),
+    ('fee_reminders_status',
+     "SELECT * FROM fee_reminders WHERE deleted = 0 AND status = ? ORDER BY id DESC LIMIT ?", ('sent', 51)),
+    ('fee_campaign_progress',
+     "SELECT status, COUNT(*) AS n FROM fee_reminders WHERE campaign_id = ? GROUP BY status", (1,)),
+    ('fee_campaign_pending',
+     "SELECT * FROM fee_reminders WHERE campaign_id = ? AND status = 'pending' AND deleted = 0", (1,)),
+    ('campaign_admissions_class',
+     "SELECT * FROM admissions WHERE deleted_at IS NULL AND admission_class = ? AND status = 'Verified'", ('5',)),
+    ('campaign_bookings_room',
+     "SELECT * FROM bookings WHERE is_deleted = 0 AND room_number = ? AND status = 'Verified'", ('1',)),
+    ('fee_recycle_bin', "SELECT * FROM fee_recycle_bin WHERE restored = 0 ORDER BY deleted_at DESC LIMIT 50", ()),
+    ('fee_recycle_cleanup', "DELETE FROM fee_recycle_bin WHERE deleted_at < datetime('now', '-30 days')", ()),
+    ('rate_limit_sweep', "DELETE FROM rate_limits WHERE expires_at < ?", (0,)),
+    ('login',
+     "SELECT id, full_name, email, mobile, password, role, category FROM users WHERE email = ? ORDER BY id", ('a@b.c',)),
+    ('outbox_claim',
+     "SELECT id FROM email_outbox WHERE status IN ('pending', 'sending') AND next_attempt_at <= datetime('now') "
+     "ORDER BY priority DESC, next_attempt_at LIMIT 1", ()),
+    ('outbox_by_status', "SELECT * FROM email_outbox WHERE status = ? ORDER BY id DESC LIMIT ?", ('failed', 51)),
+    ('search_bookings',
+     "SELECT t.id, bm25(bookings_fts) AS rank FROM bookings_fts JOIN bookings t ON t.id = bookings_fts.rowid "
+     "WHERE bookings_fts MATCH ? AND t.is_deleted = 0 ORDER BY rank LIMIT ?", ('"ali"*', 21)),
+    ('search_admissions',
+     "SELECT t.id, bm25(admissions_fts) AS rank FROM admissions_fts JOIN admissions t ON t.id = admissions_fts.rowid "
+     "WHERE admissions_fts MATCH ? AND t.deleted_at IS NULL ORDER BY rank LIMIT ?", ('"ali"*', 21)),
+]
+
+# "SCAN bookings" with no index is a full table scan; "SCAN x USING INDEX" walks an index
+_FULL_SCAN = re.compile(r"^SCAN (\w+)(?: AS \w+)?$")
+
+
+def check_query_plans(conn, queries=None):
+    """Return [(name, plan detail)] for every registered query that scans a whole table"""
+    problems = []
+    for name, sql, params in (queries or HOT_QUERIES):
+        for row in conn.execute("EXPLAIN QUERY PLAN " + sql, params).fetchall():
+            detail = row[3]
+            if _FULL_SCAN.match(detail):
+                problems.append((name, detail))
+    return problems
+
+
+if __name__ == "__main__":
+    from db_utils import get_connection
+
+    conn = get_connection()
+    try:
+        applied = run_migrations(conn)
+        if not applied:
+            print("Database schema is up to date.")
+        if '--check' in sys.argv:
+            problems = check_query_plans(conn)
+            for name, detail in problems:
+                print(f"❌ {name}: {detail}")
+            if problems:
+                sys.exit(1)
+            print(f"✅ All {len(HOT_QUERIES)} hot queries use an index.")
+    finally:
+        conn.close()
@@ -0,0 +1,119 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from werkzeug.security import generate_password_hash, check_password_hash
+
+# Hash parameters for new passwords, in werkzeug's method syntax: "scrypt:N:r:p" or
+# "pbkdf2:sha256:iterations". Stored hashes made with other parameters are upgraded on login.
+PASSWORD_HASH_METHOD = os.getenv("PASSWORD_HASH_METHOD", "scrypt:32768:8:1")
+PASSWORD_SALT_LENGTH = int(os.getenv("PASSWORD_SALT_LENGTH", "16"))
+# Hashes computed at once (scrypt/pbkdf2 release the GIL, so one per core) and how many
+# more may wait for a worker before requests are turned away with 503
+HASH_WORKERS = int(os.getenv("HASH_WORKERS", str(os.cpu_count() or 1)))
+HASH_QUEUE_LIMIT = int(os.getenv("HASH_QUEUE_LIMIT", str(HASH_WORKERS * 8)))
+# Seconds a request waits for its hash before giving up
+HASH_TIMEOUT = float(os.getenv("HASH_TIMEOUT", "10"))
+
+
+class HashQueueFull(Exception):
+    """Every hashing worker is busy and the wait queue is at HASH_QUEUE_LIMIT"""
+
+
+class PasswordHasher:
+    """
+    Bounded pool for the deliberately slow password hashes.
+
+    At most `workers` hashes run at once, so a burst of logins cannot oversubscribe
+    the CPU; up to `queue_limit` more wait their turn and anything beyond that fails
+    fast with HashQueueFull instead of piling up behind the others.
+    """
+
+    def __init__(self, workers=HASH_WORKERS, queue_limit=HASH_QUEUE_LIMIT, method=PASSWORD_HASH_METHOD,
+                 salt_length=PASSWORD_SALT_LENGTH):
+        self.method = method
+        self.salt_length = salt_length
+        # werkzeug expands short forms ("scrypt" -> "scrypt:32768:8:1"); compare stored hashes to that
+        self.prefix = generate_password_hash('', method, salt_length).split('$', 1)[0]
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password-hash")
+        self._slots = threading.BoundedSemaphore(workers + queue_limit)
+        self._lock = threading.Lock()
+        self._stats = {'hashed': 0, 'verified': 0, 'rehashed': 0, 'rejected': 0, 'in_flight': 0}
+
+    def _submit(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._stats['rejected'] += 1
+            raise HashQueueFull()
+        with self._lock:
+            self._stats['in_flight'] += 1
+        try:
+            future = self._executor.submit(fn, *args)
+        except Exception:
+            self._done(None)
+            raise
+        future.add_done_callback(self._done)
+        return future
+
+    def _done(self, future):
+        with self._lock:
+            self._stats['in_flight'] -= 1
+        self._slots.release()
+
+    def hash(self, password):
+        """generate_password_hash with the configured parameters, on the pool"""
+        future = self._submit(generate_password_hash, password, self.method, self.salt_length)
+        password_hash = future.result(timeout=HASH_TIMEOUT)
+        with self._lock:
+            self._stats['hashed'] += 1
+        return password_hash
+
+    def verify(self, password_hash, password):
+        """check_password_hash on the pool"""
+        ok = self._submit(check_password_hash, password_hash, password).result(timeout=HASH_TIMEOUT)
+        with self._lock:
+            self._stats['verified'] += 1
+        return ok
+
+    def needs_rehash(self, password_hash):
+        return password_hash.split('$', 1)[0] != self.prefix
+
+    def rehash_in_background(self, password, save):
+        """
+        Hash again with the current parameters and hand the result to save(new_hash),
+        without making the caller wait. Skipped while the pool is saturated; the next
+        login tries again. Returns True if the rehash was scheduled.
+        """
+        def run():
+            save(generate_password_hash(password, self.method, self.salt_length))
+            with self._lock:
+                self._stats['rehashed'] += 1
+        try:
+            future = self._submit(run)
+        except HashQueueFull:
+            return False
+        future.add_done_callback(_log_rehash_error)
+        return True
+
+    def stats(self):
+        with self._lock:
+            return {**self._stats, 'method': self.prefix}
+
+
+def _log_rehash_error(future):
+    if future.exception() is not None:
+        print(f"❌ Password rehash failed: {future.exception()}")
+
+
+password_hasher = PasswordHasher()
+
+
+def hash_password(password):
+    return password_hasher.hash(password)
+
+
+def verify_password(password_hash, password):
+    return password_hasher.verify(password_hash, password)
+
+
+def hasher_stats():
+    return password_hasher.stats()
@@ -0,0 +1,190 @@
+from flask import Response, current_app, jsonify
+from db_utils import get_connection
+
+# Page sizes for list endpoints
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+# Rows pulled from the cursor (and encoded) per streamed chunk
+STREAM_BATCH_SIZE = 500
+# Most ids accepted by one bulk request
+MAX_BULK_IDS = 500
+
+
+class QueryParamError(ValueError):
+    """Bad paging / filter parameter; endpoints turn this into a 400"""
+
+
+def page_params(args, default_limit=DEFAULT_PAGE_SIZE):
+    """Read ?limit= and ?cursor= (the last id of the previous page)"""
+    try:
+        limit = int(args.get('limit', default_limit))
+    except (TypeError, ValueError):
+        raise QueryParamError("limit must be an integer")
+    if limit < 1:
+        raise QueryParamError("limit must be at least 1")
+    limit = min(limit, MAX_PAGE_SIZE)
+
+    cursor = args.get('cursor')
+    if cursor in (None, ''):
+        return limit, None
+    try:
+        return limit, int(cursor)
+    except ValueError:
+        raise QueryParamError("cursor must be an id returned in X-Next-Cursor")
+
+
+def id_list(payload, max_ids=MAX_BULK_IDS):
+    """Read {"ids": [...]} from a bulk request body; duplicates are dropped, order kept"""
+    if not isinstance(payload, dict):
+        raise QueryParamError("Body must be a JSON object")
+    ids = payload.get('ids')
+    if not isinstance(ids, list) or not ids:
+        raise QueryParamError("ids must be a non-empty list")
+    if len(ids) > max_ids:
+        raise QueryParamError(f"at most {max_ids} ids per request")
+    if not all(isinstance(i, int) and not isinstance(i, bool) for i in ids):
+        raise QueryParamError("ids must be integers")
+    return list(dict.fromkeys(ids))
+
+
+def filter_clauses(args, filters):
+    """
+    Build WHERE fragments from request args.
+
+    filters maps a query-string name to an SQL condition with one placeholder,
+    e.g. {'status': 'status = ?', 'date_from': 'check_in_date >= ?'}.
+    """
+    clauses, params = [], []
+    for arg, condition in filters.items():
+        value = args.get(arg)
+        if value not in (None, ''):
+            clauses.append(condition)
+            params.append(value)
+    return clauses, params
+
+
+def select_columns(args, columns, projections):
+    """
+    Resolve ?fields= into the SQL column list for a SELECT.
+
+    fields is either a named projection (e.g. fields=summary) or a comma-separated
+    list of column names checked against columns. id is always included since
+    paging and the per-id detail endpoints key on it. No fields means '*'.
+    """
+    fields = args.get('fields')
+    if fields in (None, ''):
+        return '*'
+    if fields in projections:
+        selected = list(projections[fields])
+    else:
+        selected = [name.strip() for name in fields.split(',') if name.strip()]
+        unknown = [name for name in selected if name not in columns]
+        if unknown:
+            raise QueryParamError(f"unknown field(s): {', '.join(unknown)}")
+    if 'id' not in selected:
+        selected.insert(0, 'id')
+    return ', '.join(dict.fromkeys(selected))
+
+
+def keyset_where(base_where, args, filters, default_limit=DEFAULT_PAGE_SIZE):
+    """Return (where_sql, params, limit) for one page ordered by id DESC"""
+    limit, cursor = page_params(args, default_limit)
+    clauses, params = filter_clauses(args, filters)
+    where = [base_where] + clauses
+    if cursor is not None:
+        where.append("id < ?")
+        params.append(cursor)
+    return ' AND '.join(where), params, limit
+
+
+def keyset_query(table, base_where, args, filters, columns='*', default_limit=DEFAULT_PAGE_SIZE):
+    """
+    Return (sql, params, limit) for one page ordered by id DESC.
+
+    One extra row is fetched so the caller can tell whether another page exists.
+    """
+    where_sql, params, limit = keyset_where(base_where, args, filters, default_limit)
+    sql = f"SELECT {columns} FROM {table} WHERE {where_sql} ORDER BY id DESC LIMIT ?"
+    return sql, params + [limit + 1], limit
+
+
+def split_page(rows, limit):
+    """Trim the look-ahead row; returns (rows, next_cursor or None)"""
+    if len(rows) > limit:
+        rows = rows[:limit]
+        return rows, rows[-1]['id']
+    return rows, None
+
+
+def paged_response(items, next_cursor):
+    """JSON array body (same shape as before paging) with the next cursor in headers"""
+    response = jsonify(items)
+    if next_cursor is not None:
+        response.headers['X-Next-Cursor'] = str(next_cursor)
+    return response
+
+
+def stream_json_array(sql, params=(), headers=None, batch_size=STREAM_BATCH_SIZE, conn=None):
+    """
+    Stream the rows of a query as a JSON array without materializing them.
+
+    The query runs before the response is returned, so SQL errors still become a
+    normal 500. Rows are then pulled with fetchmany() and encoded batch by batch;
+    the pooled connection (a new one, or conn which the stream then owns) goes back
+    when the response is closed.
+    """
+    json_provider = current_app.json
+    conn = conn or get_connection()
+    try:
+        cursor = conn.execute(sql, params)
+    except Exception:
+        conn.close()
+        raise
+
+    def generate():
+        yield '['
+        first = True
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            # Compact separators, like jsonify() outside debug mode
+            chunk = ','.join(json_provider.dumps(dict(row), separators=(',', ':')) for row in rows)
+            yield chunk if first else ',' + chunk
+            first = False
+        yield ']'
+
+    response = Response(generate(), mimetype='application/json', headers=headers)
+    # Reset the statement first so an abandoned stream does not hold a read snapshot,
+    # then end the read transaction stream_keyset_page may have opened
+    response.call_on_close(cursor.close)
+    response.call_on_close(conn.commit)
+    response.call_on_close(conn.close)
+    return response
+
+
+def stream_keyset_page(table, base_where, args, filters, columns='*', default_limit=DEFAULT_PAGE_SIZE):
+    """
+    Streamed version of a keyset page (see keyset_query).
+
+    The rows are not buffered, so the next cursor comes from a small id-only probe
+    (answered from the index) instead of a look-ahead row. The probe and the page run
+    in one read transaction on one connection, so both see the same snapshot and a
+    write in between cannot make the cursor skip or repeat rows.
+    """
+    where_sql, params, limit = keyset_where(base_where, args, filters, default_limit)
+
+    conn = get_connection()
+    try:
+        conn.execute("BEGIN")
+        probe = conn.execute(
+            f"SELECT id FROM {table} WHERE {where_sql} ORDER BY id DESC LIMIT 2 OFFSET ?",
+            params + [limit - 1]
+        ).fetchall()
+    except Exception:
+        conn.close()
+        raise
+    headers = {'X-Next-Cursor': str(probe[0]['id'])} if len(probe) == 2 else None
+
+    sql = f"SELECT {columns} FROM {table} WHERE {where_sql} ORDER BY id DESC LIMIT ?"
+    return stream_json_array(sql, params + [limit], headers, conn=conn)
@@ -0,0 +1,91 @@
+import os
+import time
+from db_utils import get_connection
+
+
+def _limit(env_name, default):
+    """'capacity/window_seconds' from the environment, e.g. OTP_LIMIT_REGISTRATION=3/300"""
+    capacity, window = os.getenv(env_name, default).split('/')
+    return int(capacity), float(window)
+
+
+# Limit name -> (tokens per bucket, seconds to refill a full bucket)
+RATE_LIMITS = {
+    'otp:registration': _limit("OTP_LIMIT_REGISTRATION", "3/300"),
+    'otp:password_reset': _limit("OTP_LIMIT_PASSWORD_RESET", "3/300"),
+    'otp:update_profile': _limit("OTP_LIMIT_UPDATE_PROFILE", "3/300"),
+    'otp:ip': _limit("OTP_LIMIT_PER_IP", "20/3600"),
+}
+# Expired buckets are deleted at most this often (per process)
+SWEEP_INTERVAL_SECONDS = 60
+
+_last_sweep = 0.0
+
+# Refill the bucket for the time since its last update, then take a token if one is left.
+# A brand-new key starts full. When the bucket is empty the WHERE makes the upsert a no-op
+# and RETURNING yields no row. expires_at is when the bucket would be full again, after
+# which the row carries no information and can be dropped.
+_TAKE_TOKEN_SQL = """
+    INSERT INTO rate_limits (key, tokens, updated_at, expires_at)
+    VALUES (:key, :capacity - 1, :now, :now + 1 / :rate)
+    ON CONFLICT(key) DO UPDATE SET
+        tokens = MIN(:capacity, tokens + (:now - updated_at) * :rate) - 1,
+        updated_at = :now,
+        expires_at = :now + (:capacity - MIN(:capacity, tokens + (:now - updated_at) * :rate) + 1) / :rate
+    WHERE MIN(:capacity, tokens + (:now - updated_at) * :rate) >= 1
+    RETURNING tokens
+"""
+
+
+def _retry_after(conn, key, capacity, rate, now):
+    row = conn.execute("SELECT tokens, updated_at FROM rate_limits WHERE key = ?", (key,)).fetchone()
+    tokens = min(capacity, row['tokens'] + (now - row['updated_at']) * rate)
+    return max(0.0, (1 - tokens) / rate)
+
+
+def sweep_expired(conn, now=None):
+    """Drop buckets that have refilled completely and commit; returns how many were removed"""
+    deleted = conn.execute("DELETE FROM rate_limits WHERE expires_at < ?", (now or time.time(),)).rowcount
+    conn.commit()
+    return deleted
+
+
+def take_tokens(checks, conn=None):
+    """
+    Take one token from every (limit name, subject) bucket, all or nothing.
+
+    Buckets live in the rate_limits table, so every worker process enforces the same limits.
+    Returns 0 when allowed, otherwise the seconds until the emptiest bucket has a token again.
+    """
+    global _last_sweep
+    own_conn = conn is None
+    if own_conn:
+        conn = get_connection()
+    try:
+        now = time.time()
+        # sweep_expired commits, so only on our own connection, never inside a caller's transaction
+        if own_conn and now - _last_sweep > SWEEP_INTERVAL_SECONDS:
+            _last_sweep = now
+            sweep_expired(conn, now)
+
+        conn.execute("BEGIN IMMEDIATE")
+        wait = 0.0
+        for name, subject in checks:
+            capacity, window = RATE_LIMITS[name]
+            rate = capacity / window
+            key = f"{name}:{str(subject).lower()}"
+            params = {'key': key, 'capacity': capacity, 'rate': rate, 'now': now}
+            if conn.execute(_TAKE_TOKEN_SQL, params).fetchone() is None:
+                wait = max(wait, _retry_after(conn, key, capacity, rate, now))
+        if wait:
+            # One exhausted bucket means no token is spent from the others either
+            conn.rollback()
+        else:
+            conn.commit()
+        return wait
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        if own_conn:
+            conn.close()
@@ -0,0 +1,98 @@
+import json
+import threading
+import uuid
+from db_utils import get_connection
+
+
+def _serialize(room):
+    return json.dumps(room, sort_keys=True, separators=(',', ':'))
+
+
+class RoomSnapshot:
+    """
+    In-process, pre-serialized copy of the room -> beds tree served by /admin/rooms_detailed.
+
+    Built once on first use. Handlers that change a bed's status call refresh_beds()
+    after committing, which re-reads only those beds, re-serializes only their rooms
+    and bumps the version. Reads just return the cached bytes.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._rooms = None       # room_id -> {"room_id", "room_number", "beds": [...]}
+        self._bed_rooms = {}     # bed id -> room_id
+        self._fragments = {}     # room_id -> serialized room JSON
+        self._payload = None
+        self.epoch = uuid.uuid4().hex[:8]  # distinguishes versions across restarts
+        self.version = 0
+
+    def _build(self, conn):
+        rooms = {}
+        bed_rooms = {}
+        for room in conn.execute("SELECT id, room_number FROM rooms ORDER BY id"):
+            rooms[room['id']] = {"room_id": room['id'], "room_number": room['room_number'], "beds": []}
+        for bed in conn.execute("SELECT * FROM beds ORDER BY id"):
+            if bed['room_id'] in rooms:
+                rooms[bed['room_id']]['beds'].append(dict(bed))
+                bed_rooms[bed['id']] = bed['room_id']
+
+        self._rooms = rooms
+        self._bed_rooms = bed_rooms
+        self._fragments = {room_id: _serialize(room) for room_id, room in rooms.items()}
+        self._join()
+        self.version += 1
+
+    def _join(self):
+        self._payload = ('[' + ','.join(self._fragments.values()) + ']').encode('utf-8')
+
+    def get(self):
+        """Return (version, JSON bytes), building the snapshot on first call"""
+        with self._lock:
+            if self._rooms is None:
+                conn = get_connection()
+                try:
+                    self._build(conn)
+                finally:
+                    conn.close()
+            return self.version, self._payload
+
+    def refresh_beds(self, conn, bed_numbers):
+        """Re-read the given beds (by bed_number) and patch their rooms in the snapshot"""
+        bed_numbers = [b for b in set(bed_numbers) if b]
+        if not bed_numbers:
+            return
+        with self._lock:
+            if self._rooms is None:
+                return  # Not built yet; the first get() will read everything fresh
+            placeholders = ','.join('?' * len(bed_numbers))
+            rows = conn.execute(f"SELECT * FROM beds WHERE bed_number IN ({placeholders})", bed_numbers).fetchall()
+
+            touched = set()
+            for row in rows:
+                bed = dict(row)
+                old_room_id = self._bed_rooms.pop(bed['id'], None)
+                if old_room_id is not None:
+                    old_beds = self._rooms[old_room_id]['beds']
+                    old_beds[:] = [b for b in old_beds if b['id'] != bed['id']]
+                    touched.add(old_room_id)
+                room = self._rooms.get(bed['room_id'])
+                if room is not None:
+                    room['beds'].append(bed)
+                    room['beds'].sort(key=lambda b: b['id'])
+                    self._bed_rooms[bed['id']] = bed['room_id']
+                    touched.add(bed['room_id'])
+
+            if not touched:
+                return
+            for room_id in touched:
+                self._fragments[room_id] = _serialize(self._rooms[room_id])
+            self._join()
+            self.version += 1
+
+    def invalidate(self):
+        """Drop the snapshot; it is rebuilt from the database on next get()"""
+        with self._lock:
+            self._rooms = None
+
+
+room_snapshot = RoomSnapshot()
@@ -0,0 +1,40 @@
+import base64
+import binascii
+from upload_store import put_bytes
+
+# Signatures are stored like the other admission documents (upload_store) and served by /uploads/admissions/<name>
+MAX_SIGNATURE_SIZE = 1 * 1024 * 1024  # 1 MB decoded, same cap as the uploaded documents
+
+PNG_MAGIC = b'\x89PNG\r\n\x1a\n'
+DATA_URL_PREFIX = 'data:image/png;base64,'
+
+
+def is_data_url(value):
+    return bool(value) and value.startswith('data:')
+
+
+def decode_signature(data_url):
+    """Decode the canvas' toDataURL('image/png') string into PNG bytes, or raise ValueError"""
+    if not data_url.startswith(DATA_URL_PREFIX):
+        raise ValueError("Signature must be a PNG image.")
+    # 4 Base64 chars encode 3 bytes; reject oversized input before decoding it
+    if (len(data_url) - len(DATA_URL_PREFIX)) * 3 // 4 > MAX_SIGNATURE_SIZE:
+        raise ValueError("Signature exceeds the 1MB size limit.")
+    try:
+        png = base64.b64decode(data_url[len(DATA_URL_PREFIX):], validate=True)
+    except (binascii.Error, ValueError):
+        raise ValueError("Signature is not valid Base64 data.")
+    if not png.startswith(PNG_MAGIC):
+        raise ValueError("Signature must be a PNG image.")
+    return png
+
+
+def save_signature(data_url):
+    """
+    Store a Base64 signature data URL as a PNG object and return its name.
+
+    Returns None for an empty value so callers can pass form data straight through.
+    """
+    if not data_url:
+        return None
+    return put_bytes(decode_signature(data_url), 'png')
@@ -0,0 +1,238 @@
+import os
+import smtplib
+import statistics
+import threading
+import time
+from collections import deque
+from dotenv import load_dotenv
+
+load_dotenv()
+EMAIL_SENDER = os.getenv("EMAIL_USER")
+EMAIL_PASSWORD = os.getenv("EMAIL_PASS")
+# SMTP server; point SMTP_HOST/SMTP_PORT at a local stand-in (with SMTP_STARTTLS=0) for testing
+SMTP_HOST = os.getenv("SMTP_HOST", "smtp.gmail.com")
+SMTP_PORT = int(os.getenv("SMTP_PORT", "587"))
+SMTP_STARTTLS = os.getenv("SMTP_STARTTLS", "1") != "0"
+SMTP_TIMEOUT = float(os.getenv("SMTP_TIMEOUT", "30"))
+# Session reuse: idle sessions kept, how long one may sit idle, and messages per session
+# (providers cap messages per connection and drop idle ones)
+SMTP_MAX_IDLE_SESSIONS = int(os.getenv("SMTP_MAX_IDLE_SESSIONS", "4"))
+SMTP_IDLE_TIMEOUT = float(os.getenv("SMTP_IDLE_TIMEOUT", "120"))
+SMTP_MAX_MESSAGES_PER_SESSION = int(os.getenv("SMTP_MAX_MESSAGES_PER_SESSION", "90"))
+# Idle longer than this and the session is checked with NOOP before reuse
+SMTP_NOOP_AFTER = 15
+
+
+def session_lost(error):
+    """
+    True when the connection itself is gone (dropped socket, 421 shutting down);
+    such sends are retried once on a fresh session. SMTP replies like 451/550 are
+    also OSErrors but leave the session usable and are raised to the caller.
+    """
+    if isinstance(error, smtplib.SMTPServerDisconnected):
+        return True
+    if isinstance(error, smtplib.SMTPResponseException):
+        return error.smtp_code == 421
+    return isinstance(error, OSError) and not isinstance(error, smtplib.SMTPException)
+
+
+def email_configured():
+    """Credentials are set, or an explicit (local) SMTP_HOST that needs none"""
+    return bool(EMAIL_SENDER and EMAIL_PASSWORD) or "SMTP_HOST" in os.environ
+
+
+class SMTPSession:
+    """One connected, authenticated smtplib.SMTP plus bookkeeping for reuse"""
+
+    def __init__(self, transport):
+        start = time.perf_counter()
+        self.smtp = smtplib.SMTP(transport.host, transport.port, timeout=transport.timeout)
+        try:
+            if transport.starttls:
+                self.smtp.starttls()
+            if EMAIL_SENDER and EMAIL_PASSWORD:
+                self.smtp.login(EMAIL_SENDER, EMAIL_PASSWORD)
+        except Exception:
+            self.close()
+            raise
+        self.connect_seconds = time.perf_counter() - start
+        self.messages = 0
+        self.last_used = time.monotonic()
+
+    def alive(self):
+        if time.monotonic() - self.last_used < SMTP_NOOP_AFTER:
+            return True
+        try:
+            return self.smtp.noop()[0] == 250
+        except Exception:
+            return False
+
+    def close(self):
+        try:
+            self.smtp.quit()
+        except Exception:
+            try:
+                self.smtp.close()
+            except Exception:
+                pass
+
+
+class SMTPTransport:
+    """
+    Shared pool of authenticated SMTP sessions used by every mail sender.
+
+    Sessions are reused LIFO across messages and threads, recycled after
+    max_messages or idle_timeout, checked with NOOP after a quiet spell, and
+    replaced transparently when the server has dropped them.
+    """
+
+    def __init__(self, host=None, port=None, starttls=None, timeout=None,
+                 max_idle=SMTP_MAX_IDLE_SESSIONS, idle_timeout=SMTP_IDLE_TIMEOUT,
+                 max_messages=SMTP_MAX_MESSAGES_PER_SESSION):
+        self.host = host or SMTP_HOST
+        self.port = port or SMTP_PORT
+        self.starttls = SMTP_STARTTLS if starttls is None else starttls
+        self.timeout = timeout or SMTP_TIMEOUT
+        self.max_idle = max_idle
+        self.idle_timeout = idle_timeout
+        self.max_messages = max_messages
+        self._idle = []
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=1000)  # seconds per successful send
+        self._stats = {'sent': 0, 'failed': 0, 'sessions_opened': 0, 'reconnects': 0, 'connect_seconds': 0.0}
+
+    def _acquire(self):
+        with self._lock:
+            while self._idle:
+                session = self._idle.pop()
+                if time.monotonic() - session.last_used < self.idle_timeout:
+                    break
+                session.close()
+            else:
+                session = None
+        if session is not None and session.alive():
+            return session
+        if session is not None:
+            session.close()
+        session = SMTPSession(self)
+        with self._lock:
+            self._stats['sessions_opened'] += 1
+            self._stats['connect_seconds'] += session.connect_seconds
+        return session
+
+    def _release(self, session):
+        session.last_used = time.monotonic()
+        with self._lock:
+            if session.messages < self.max_messages and len(self._idle) < self.max_idle:
+                self._idle.append(session)
+                return
+        session.close()
+
+    def _send_on(self, session, msg):
+        """Send over the given session, replacing it once if the server dropped it"""
+        try:
+            session.smtp.send_message(msg)
+            return session
+        except Exception as e:
+            if not session_lost(e):
+                raise
+            session.close()
+            with self._lock:
+                self._stats['reconnects'] += 1
+            session = SMTPSession(self)
+            with self._lock:
+                self._stats['sessions_opened'] += 1
+                self._stats['connect_seconds'] += session.connect_seconds
+            session.smtp.send_message(msg)
+            return session
+
+    def _record(self, elapsed=None):
+        with self._lock:
+            if elapsed is None:
+                self._stats['failed'] += 1
+            else:
+                self._stats['sent'] += 1
+                self._latencies.append(elapsed)
+
+    def send(self, msg):
+        """Send one email.message.Message; returns the send latency in seconds, raises on failure"""
+        start = time.perf_counter()
+        session = self._acquire()
+        try:
+            session = self._send_on(session, msg)
+        except Exception as e:
+            self._record()
+            if session_lost(e):
+                session.close()
+            else:
+                self._release(session)
+            raise
+        session.messages += 1
+        self._release(session)
+        elapsed = time.perf_counter() - start
+        self._record(elapsed)
+        return elapsed
+
+    def send_many(self, msgs):
+        """
+        Pipeline several messages over one session.
+        Returns one (latency seconds or None, error or None) per message, in order.
+        """
+        results = []
+        session = None
+        try:
+            for msg in msgs:
+                start = time.perf_counter()
+                try:
+                    if session is None:
+                        session = self._acquire()
+                    elif session.messages >= self.max_messages:
+                        session.close()
+                        session = self._acquire()
+                    session = self._send_on(session, msg)
+                    session.messages += 1
+                    elapsed = time.perf_counter() - start
+                    self._record(elapsed)
+                    results.append((elapsed, None))
+                except Exception as e:
+                    self._record()
+                    results.append((None, e))
+                    # A rejected message leaves the session usable; a lost one is replaced next time
+                    if session is not None and session_lost(e):
+                        session.close()
+                        session = None
+        finally:
+            if session is not None:
+                self._release(session)
+        return results
+
+    def close_all(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for session in idle:
+            session.close()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            latencies = list(self._latencies)
+            stats['idle_sessions'] = len(self._idle)
+        stats['connect_seconds'] = round(stats['connect_seconds'], 3)
+        if latencies:
+            stats['send_ms_last'] = round(latencies[-1] * 1000, 2)
+            latencies.sort()
+            stats['send_ms_p50'] = round(statistics.median(latencies) * 1000, 2)
+            stats['send_ms_p95'] = round(latencies[max(0, int(len(latencies) * 0.95) - 1)] * 1000, 2)
+        return stats
+
+
+smtp_transport = SMTPTransport()
+
+
+def send_message(msg):
+    """Send through the shared transport; returns the latency in seconds"""
+    return smtp_transport.send(msg)
+
+
+def transport_stats():
+    return smtp_transport.stats()
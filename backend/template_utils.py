@@ -0,0 +1,108 @@
+import os
+from jinja2 import Environment, FileSystemLoader, StrictUndefined, meta, select_autoescape
+
+TEMPLATE_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'email_templates')
+
+# HTML variants are autoescaped, text variants and subjects are not.
+# auto_reload=False: a compiled template is never re-checked against the file.
+_env = Environment(
+    loader=FileSystemLoader(TEMPLATE_FOLDER),
+    autoescape=select_autoescape(['html'], default_for_string=False),
+    undefined=StrictUndefined,
+    auto_reload=False,
+)
+
+# Email name -> template files (<template>.html / .txt), subject, sender and fixed values
+EMAIL_TEMPLATES = {
+    'booking_verified': {
+        'template': 'booking_verified',
+        'subject': "OFFICIAL: Booking Verified - Smart City Hostel",
+        'from_name': "Smart City Hostel",
+    },
+    'admission_verified': {
+        'template': 'admission_verified',
+        'subject': "OFFICIAL: Admission Verified - Next Gen School",
+        'from_name': "Next Gen School",
+    },
+    # Subject, body and sending institution come from the saved fee_reminders row
+    'fee_reminder': {
+        'template': 'fee_reminder',
+        'subject': "{{ subject }}",
+        'from_name': "Smart City Portal",
+    },
+    'otp_registration': {
+        'template': 'otp',
+        'subject': "Smart City Portal - Email Verification OTP",
+        'from_name': "Smart City Portal",
+        'defaults': {
+            'title': "Registration",
+            'color': "#667eea",
+            'heading': "Welcome! 🏙️",
+            'intro': "Thank you for registering. Please verify your email address using the OTP below:",
+            'not_you': "If you didn't request this, please ignore this email.",
+        },
+    },
+    'otp_password_reset': {
+        'template': 'otp',
+        'subject': "Smart City Portal - Password Reset OTP",
+        'from_name': "Smart City Portal",
+        'defaults': {
+            'title': "Password Reset",
+            'color': "#f093fb",
+            'heading': "Reset Your Password 🔐",
+            'intro': "We received a request to reset your password. Use the OTP below:",
+            'not_you': "If you didn't request this, please secure your account.",
+        },
+    },
+    'otp_update_profile': {
+        'template': 'otp',
+        'subject': "Smart City Portal - Profile Update OTP",
+        'from_name': "Smart City Portal",
+        'defaults': {
+            'title': "Update Profile",
+            'color': "#43e97b",
+            'heading': "Profile Update Verification 👤",
+            'intro': "You requested to update your profile information. Use the OTP below:",
+            'not_you': "If you didn't request this, please contact support.",
+        },
+    },
+}
+
+
+class CompiledEmail:
+    """One registry entry with its subject, HTML and text templates compiled once"""
+
+    def __init__(self, spec):
+        self.subject = _env.from_string(spec['subject'])
+        # Subjects without variables are rendered once here instead of per message
+        self.fixed_subject = None
+        if not meta.find_undeclared_variables(_env.parse(spec['subject'])):
+            self.fixed_subject = self.subject.render(spec.get('defaults', {}))
+        self.html = _env.get_template(f"{spec['template']}.html")
+        self.text = _env.get_template(f"{spec['template']}.txt")
+        self.from_name = spec['from_name']
+        self.defaults = spec.get('defaults', {})
+
+    def render(self, context):
+        values = {**self.defaults, **context}
+        return {
+            "subject": self.fixed_subject if self.fixed_subject is not None else self.subject.render(values),
+            "html": self.html.render(values),
+            "text": self.text.render(values),
+            "from_name": self.from_name,
+        }
+
+
+# Compiled at import so a send only substitutes variables
+_registry = {name: CompiledEmail(spec) for name, spec in EMAIL_TEMPLATES.items()}
+
+
+def render_email(name, context):
+    """Render one email; returns dict(subject, html, text, from_name)"""
+    return _registry[name].render(context)
+
+
+def render_batch(name, contexts):
+    """Render the same email for many recipients, one dict per context, in order"""
+    email = _registry[name]
+    return [email.render(context) for context in contexts]
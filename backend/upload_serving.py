@@ -0,0 +1,142 @@
+import mimetypes
+import os
+import stat
+import threading
+from collections import OrderedDict
+from flask import Response, request, send_file
+from werkzeug.exceptions import NotFound
+from werkzeug.security import safe_join
+import upload_store
+
+# A name under /uploads always has the same bytes (content hash, a variant of one, or an
+# older uuid name), so browsers keep files for a year without revalidating. "private":
+# these are identity documents, not something shared caches should hold.
+CACHE_MAX_AGE = int(os.getenv("UPLOAD_CACHE_MAX_AGE", str(365 * 24 * 3600)))
+# Hand the transfer to the front proxy instead of a Python worker: "x-accel" (nginx
+# X-Accel-Redirect to an `internal` location aliased to uploads/) or "x-sendfile"
+# (Apache mod_xsendfile / lighttpd). Empty serves the bytes from Flask.
+SENDFILE_MODE = os.getenv("UPLOAD_SENDFILE", "").lower()
+ACCEL_PREFIX = os.getenv("UPLOAD_ACCEL_PREFIX", "/protected-uploads/")
+# Small files (thumbnails, signatures, most previews) are served from memory, up to
+# MEMORY_CACHE_BYTES in total; larger files are streamed from disk
+MEMORY_CACHE_BYTES = int(os.getenv("UPLOAD_MEMORY_CACHE_BYTES", str(32 * 1024 * 1024)))
+MEMORY_CACHE_MAX_FILE = int(os.getenv("UPLOAD_MEMORY_CACHE_MAX_FILE", str(256 * 1024)))
+
+
+class ByteLRU:
+    """Thread-safe LRU mapping of file contents, bounded by their total size"""
+
+    def __init__(self, budget=MEMORY_CACHE_BYTES, max_item=MEMORY_CACHE_MAX_FILE):
+        self.budget = budget
+        self.max_item = max_item
+        self._data = OrderedDict()  # key -> bytes, least recently used first
+        self._lock = threading.Lock()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            data = self._data.get(key)
+            if data is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return data
+
+    def set(self, key, data):
+        if len(data) > min(self.max_item, self.budget):
+            return
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self.size -= len(old)
+            self._data[key] = data
+            self.size += len(data)
+            while self.size > self.budget:
+                _, evicted = self._data.popitem(last=False)
+                self.size -= len(evicted)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.size = 0
+
+    def stats(self):
+        with self._lock:
+            return {'files': len(self._data), 'bytes': self.size, 'budget': self.budget, 'hits': self.hits,
+                    'misses': self.misses, 'evictions': self.evictions}
+
+
+memory_cache = ByteLRU()
+
+
+def upload_etag(filename, st):
+    """Strong validator: the SHA-256 in an object's name, otherwise mtime and size of the write-once file"""
+    if upload_store.is_object_name(filename):
+        return filename.split('.', 1)[0]
+    return f"{st.st_mtime_ns:x}-{st.st_size:x}"
+
+
+def _cache_forever(response, etag, st):
+    response.set_etag(etag)
+    response.last_modified = st.st_mtime
+    response.cache_control.no_cache = None
+    response.cache_control.public = None
+    response.cache_control.private = True
+    response.cache_control.max_age = CACHE_MAX_AGE
+    response.cache_control.immutable = True
+    response.headers.pop('Expires', None)
+    return response
+
+
+def serve_upload(folder, filename):
+    """
+    Send folder/filename with immutable caching, a strong ETag (304 on If-None-Match)
+    and Range support; from memory for small files, through the front proxy when
+    UPLOAD_SENDFILE is set, otherwise streamed by send_file. 404 if it does not exist.
+    """
+    path = safe_join(folder, filename)
+    if path is None:
+        raise NotFound()
+    try:
+        st = os.stat(path)
+    except OSError:
+        raise NotFound()
+    if not stat.S_ISREG(st.st_mode):
+        raise NotFound()
+    etag = upload_etag(filename, st)
+    mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+
+    # Revalidation needs no file access in any mode
+    if request.if_none_match.contains_weak(etag):
+        return _cache_forever(Response(status=304), etag, st)
+
+    if SENDFILE_MODE == 'x-accel':
+        response = Response(mimetype=mimetype)
+        uploads_root = os.path.join(upload_store.BASE_DIR, 'uploads')
+        response.headers['X-Accel-Redirect'] = ACCEL_PREFIX + os.path.relpath(path, uploads_root).replace(os.sep, '/')
+        return _cache_forever(response, etag, st)
+    if SENDFILE_MODE == 'x-sendfile':
+        response = Response(mimetype=mimetype)
+        response.headers['X-Sendfile'] = path
+        return _cache_forever(response, etag, st)
+
+    if st.st_size <= memory_cache.max_item:
+        key = (path, etag)
+        data = memory_cache.get(key)
+        if data is None:
+            with open(path, 'rb') as f:
+                data = f.read()
+            memory_cache.set(key, data)
+        response = _cache_forever(Response(data, mimetype=mimetype), etag, st)
+        return response.make_conditional(request, accept_ranges=True, complete_length=len(data))
+    response = send_file(path, mimetype=mimetype, etag=etag, last_modified=st.st_mtime, conditional=True)
+    return _cache_forever(response, etag, st)
+
+
+def serving_stats():
+    return {**memory_cache.stats(), 'sendfile': SENDFILE_MODE or None}
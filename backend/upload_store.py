@@ -0,0 +1,172 @@
+import hashlib
+import os
+import re
+import time
+import uuid
+from db_utils import get_connection
+
+# Booking and admission documents are stored once per distinct content as
+# uploads/objects/<sha256>.<type>; rows hold that name and triggers on bookings/admissions
+# keep upload_objects.refcount equal to the number of columns pointing at it
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+OBJECT_FOLDER = os.path.join(BASE_DIR, 'uploads', 'objects')
+# Files derived from an object (image_variants) are named "<sha256>.<variant>.<ext>" and
+# are removed together with it
+VARIANT_FOLDER = os.path.join(BASE_DIR, 'uploads', 'variants')
+# Unreferenced objects (and files never attached to a row) are deleted after this long
+GC_GRACE_SECONDS = float(os.getenv("UPLOAD_GC_GRACE_SECONDS", "3600"))
+GC_INTERVAL_SECONDS = 3600
+
+# Document columns per table; m012_upload_store installs the refcount triggers from these
+DOCUMENT_COLUMNS = {
+    'bookings': ('photo_path', 'cnic_front_path', 'cnic_back_path', 'proof_path', 'voucher_path', 'signature_path'),
+    'admissions': ('father_signature', 'father_cnic_front_path', 'father_cnic_back_path', 'student_photos_path',
+                   'b_form_file_path', 'school_cert_file_path'),
+}
+
+_OBJECT_NAME = re.compile(r"^[0-9a-f]{64}\.[a-z]+$")
+_last_gc = 0.0
+
+
+def object_name(sha256, kind):
+    return f"{sha256}.{kind}"
+
+
+def is_object_name(filename):
+    return bool(filename) and bool(_OBJECT_NAME.match(filename))
+
+
+def object_path(name):
+    return os.path.join(OBJECT_FOLDER, name)
+
+
+def temp_path(folder=None):
+    """A private file in the store's folder, so publishing it is an atomic rename"""
+    folder = folder or OBJECT_FOLDER
+    os.makedirs(folder, exist_ok=True)
+    return os.path.join(folder, f".{uuid.uuid4().hex}.part")
+
+
+def publish(name, source=None, data=None):
+    """
+    Make the object `name` exist, from a finished temp file (source) or bytes (data).
+
+    If the same content is already stored nothing is written: the temp file is dropped
+    and the existing object is touched so a pending garbage collection keeps it.
+    Returns True when new bytes were written.
+    """
+    path = object_path(name)
+    try:
+        os.utime(path)
+    except FileNotFoundError:
+        pass  # new content, or collect_garbage has just taken it: (re)write it
+    else:
+        if source is not None:
+            os.remove(source)
+        return False
+    if source is None:
+        source = temp_path()
+        with open(source, 'wb') as f:
+            f.write(data)
+    os.replace(source, path)
+    return True
+
+
+def put_bytes(data, kind):
+    """Store in-memory content (e.g. a decoded signature); returns its object name"""
+    name = object_name(hashlib.sha256(data).hexdigest(), kind)
+    publish(name, data=data)
+    return name
+
+
+def hash_file(path):
+    sha256 = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+def _remove_if_stale(path, cutoff):
+    """
+    Delete a file not touched since cutoff. It is first renamed aside, so a concurrent
+    publish() either touched it before (the mtime check below keeps it) or no longer
+    finds it and writes the content again.
+    """
+    doomed = temp_path(os.path.dirname(path))
+    try:
+        os.rename(path, doomed)
+    except FileNotFoundError:
+        return False
+    if os.stat(doomed).st_mtime >= cutoff:
+        try:
+            os.link(doomed, path)
+        except FileExistsError:
+            pass  # publish() already wrote it again
+        os.remove(doomed)
+        return False
+    os.remove(doomed)
+    return True
+
+
+def _stale_entries(folder, keep, cutoff):
+    """Files in folder older than cutoff whose name keep() rejects (skipping ones that vanish meanwhile)"""
+    if not os.path.isdir(folder):
+        return
+    for entry in os.scandir(folder):
+        if keep(entry.name):
+            continue
+        try:
+            if entry.stat().st_mtime < cutoff:
+                yield entry.path
+        except FileNotFoundError:
+            continue  # a temp file published (or removed) since the listing
+
+
+def collect_garbage(conn, now=None):
+    """
+    Delete objects no row has referenced for GC_GRACE_SECONDS, and leftover files from
+    uploads whose request never saved a row. Returns how many files were removed.
+
+    Runs under the database write lock, so no row can take a reference to an object
+    between reading its refcount and deleting it.
+    """
+    now = now or time.time()
+    cutoff = now - GC_GRACE_SECONDS
+    removed = 0
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        referenced = {row['name'] for row in conn.execute("SELECT name FROM upload_objects WHERE refcount > 0")}
+        for path in _stale_entries(OBJECT_FOLDER, referenced.__contains__, cutoff):
+            removed += _remove_if_stale(path, cutoff)
+        # Variants of objects that are gone (or were never kept)
+        sources = {name.split('.', 1)[0] for name in referenced}
+        for path in _stale_entries(VARIANT_FOLDER, lambda name: name.split('.', 1)[0] in sources, cutoff):
+            removed += _remove_if_stale(path, cutoff)
+        conn.execute("DELETE FROM upload_objects WHERE refcount <= 0 AND released_at < datetime(?, 'unixepoch')",
+                     (cutoff,))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return removed
+
+
+def maybe_collect_garbage():
+    """collect_garbage at most once per GC_INTERVAL_SECONDS per process"""
+    global _last_gc
+    now = time.time()
+    if now - _last_gc < GC_INTERVAL_SECONDS:
+        return 0
+    _last_gc = now
+    conn = get_connection()
+    try:
+        removed = collect_garbage(conn, now)
+    except Exception as e:
+        print(f"⚠️ Upload store cleanup failed: {e}")
+        return 0
+    finally:
+        conn.close()
+    if removed:
+        print(f"🧹 Removed {removed} unreferenced upload(s)")
+    return removed
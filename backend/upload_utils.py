@@ -0,0 +1,190 @@
+import hashlib
+import os
+from collections import namedtuple
+from flask import current_app, request
+from werkzeug.datastructures import MultiDict
+from werkzeug.exceptions import RequestEntityTooLarge
+from werkzeug.http import parse_options_header
+from werkzeug.sansio.multipart import Data, Epilogue, Field, File, MultipartDecoder, NeedData
+import upload_store
+from image_variants import schedule_variants
+
+# Whole request body (also set as the app's MAX_CONTENT_LENGTH), one text field, and part count
+MAX_REQUEST_SIZE = int(os.getenv("UPLOAD_MAX_REQUEST_BYTES", str(40 * 1024 * 1024)))
+MAX_FIELD_SIZE = int(os.getenv("UPLOAD_MAX_FIELD_BYTES", str(2 * 1024 * 1024)))  # fits a 1 MB Base64 signature
+MAX_PARTS = 100
+CHUNK_SIZE = 64 * 1024
+# A document up to this size is held in memory until its hash is known, so re-uploading
+# stored content writes nothing; larger ones spill to a temp file in the store
+SPOOL_SIZE = int(os.getenv("UPLOAD_SPOOL_BYTES", str(1024 * 1024)))
+
+# File type -> magic-byte check on the first SNIFF_BYTES bytes; the type is also the extension on disk
+MAGIC = {
+    'png': lambda head: head.startswith(b'\x89PNG\r\n\x1a\n'),
+    'jpeg': lambda head: head.startswith(b'\xff\xd8\xff'),
+    'webp': lambda head: head[:4] == b'RIFF' and head[8:12] == b'WEBP',
+}
+SNIFF_BYTES = 12
+IMAGE_KINDS = ('png', 'jpeg')
+
+# One stored document: object name in upload_store, bytes, hex SHA-256, detected type and
+# whether it was new content (False when an identical document was already stored)
+SavedUpload = namedtuple('SavedUpload', 'filename size sha256 kind written')
+
+
+class UploadError(ValueError):
+    """Rejected upload; status is the HTTP code to answer with (400, 413 or 415)"""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def upload_spec(max_bytes, kinds=IMAGE_KINDS, variants=False):
+    """Rules for one file field: size cap, accepted types, and whether to render preview variants"""
+    return {'max_bytes': max_bytes, 'kinds': kinds, 'variants': variants}
+
+
+def sniff_kind(head, kinds):
+    return next((kind for kind in kinds if MAGIC[kind](head)), None)
+
+
+def _size_label(size):
+    return f"{size // (1024 * 1024)}MB" if size >= 1024 * 1024 else f"{size // 1024}KB"
+
+
+class _FileSink:
+    """Buffers one file part (in memory, then a temp file) while counting, type-checking and hashing it"""
+
+    def __init__(self, field, spec):
+        self.field = field
+        self.spec = spec
+        self.buffer = bytearray()
+        self.path = None
+        self.file = None
+        self.sha256 = hashlib.sha256()
+        self.size = 0
+        self.head = b''
+        self.kind = None
+
+    def write(self, data):
+        self.size += len(data)
+        if self.size > self.spec['max_bytes']:
+            raise UploadError(f"File {self.field} exceeds the {_size_label(self.spec['max_bytes'])} size limit.", 413)
+        if self.kind is None:
+            self.head += data[:SNIFF_BYTES - len(self.head)]
+            if len(self.head) >= SNIFF_BYTES:
+                self._check_type()
+        self.sha256.update(data)
+        if self.file is None and len(self.buffer) + len(data) > SPOOL_SIZE:
+            self.path = upload_store.temp_path()
+            self.file = open(self.path, 'wb')
+            self.file.write(self.buffer)
+            self.buffer = None
+        if self.file is not None:
+            self.file.write(data)
+        else:
+            self.buffer += data
+
+    def _check_type(self):
+        self.kind = sniff_kind(self.head, self.spec['kinds'])
+        if self.kind is None:
+            allowed = ', '.join(kind.upper() for kind in self.spec['kinds'])
+            raise UploadError(f"Invalid file type for {self.field}. Only {allowed} images are allowed.", 415)
+
+    def finish(self):
+        if self.kind is None:
+            self._check_type()
+        sha256 = self.sha256.hexdigest()
+        name = upload_store.object_name(sha256, self.kind)
+        if self.file is not None:
+            self.file.close()
+            written = upload_store.publish(name, source=self.path)
+        else:
+            written = upload_store.publish(name, data=bytes(self.buffer))
+        return SavedUpload(name, self.size, sha256, self.kind, written)
+
+    def discard(self):
+        if self.file is not None:
+            self.file.close()
+            if os.path.exists(self.path):
+                os.remove(self.path)
+
+
+def parse_upload_form(specs):
+    """
+    Read the multipart request body in CHUNK_SIZE pieces, streaming the files named in
+    specs (field -> upload_spec) into the content-addressed upload_store. Size and magic
+    bytes are checked and the SHA-256 computed in that one pass, so an oversized or
+    mistyped part is rejected as soon as it is seen instead of after the whole body was
+    buffered, and a document that is already stored is not written again.
+
+    Returns (form, {field: SavedUpload}). File fields without a spec and empty file
+    inputs are skipped. Raises UploadError. Objects stored for a request that then fails
+    are left unreferenced and removed by upload_store's garbage collection.
+    Non-multipart requests are returned as (request.form, {}).
+    """
+    mimetype, options = parse_options_header(request.headers.get('Content-Type', ''))
+    if mimetype != 'multipart/form-data':
+        return request.form, {}
+    if not options.get('boundary'):
+        raise UploadError("Malformed multipart request.")
+    limit = current_app.config.get('MAX_CONTENT_LENGTH') or MAX_REQUEST_SIZE
+    if request.content_length is not None and request.content_length > limit:
+        raise UploadError(f"Request exceeds the {_size_label(limit)} upload limit.", 413)
+
+    decoder = MultipartDecoder(options['boundary'].encode(), max_form_memory_size=MAX_FIELD_SIZE, max_parts=MAX_PARTS)
+    fields, saved = [], {}
+    part, text, sink = None, None, None
+    received = text_size = 0
+    try:
+        while True:
+            chunk = request.stream.read(CHUNK_SIZE)
+            received += len(chunk)
+            if received > limit:
+                raise UploadError(f"Request exceeds the {_size_label(limit)} upload limit.", 413)
+            decoder.receive_data(chunk or None)
+            event = decoder.next_event()
+            while not isinstance(event, (Epilogue, NeedData)):
+                if isinstance(event, Field):
+                    part, text, sink, text_size = event, [], None, 0
+                elif isinstance(event, File):
+                    part, text = event, None
+                    spec = specs.get(event.name)
+                    sink = _FileSink(event.name, spec) if spec and event.filename else None
+                elif isinstance(event, Data):
+                    if text is not None:
+                        text.append(event.data)
+                        text_size += len(event.data)
+                        if text_size > MAX_FIELD_SIZE:
+                            raise UploadError(f"Field {part.name} is too large.", 413)
+                    elif sink is not None:
+                        sink.write(event.data)
+                    if not event.more_data:
+                        if text is not None:
+                            fields.append((part.name, b''.join(text).decode('utf-8', 'replace')))
+                        elif sink is not None:
+                            if sink.size:
+                                saved[part.name] = sink.finish()
+                                if sink.spec['variants']:
+                                    schedule_variants(saved[part.name].filename)
+                            else:
+                                sink.discard()
+                            sink = None
+                event = decoder.next_event()
+            if isinstance(event, Epilogue):
+                break
+            if not chunk:
+                raise UploadError("Upload was cut off before it finished.")
+    except Exception as e:
+        if sink is not None:
+            sink.discard()
+        if isinstance(e, UploadError):
+            raise
+        if isinstance(e, RequestEntityTooLarge):
+            raise UploadError(f"Request exceeds the {_size_label(limit)} upload limit.", 413)
+        if isinstance(e, ValueError):
+            raise UploadError("Malformed multipart request.")
+        raise
+    upload_store.maybe_collect_garbage()
+    return MultiDict(fields), saved
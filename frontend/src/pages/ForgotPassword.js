@@ -1,6 +1,7 @@
 import React, { useState } from 'react';
 import { useNavigate, Link } from 'react-router-dom';
 import axios from 'axios';
+import { watchOtpDelivery } from '../utils/otpDelivery';
 import './css/ForgotPassword.css';
 
 const ForgotPassword = () => {
@@ -93,11 +94,15 @@ const ForgotPassword = () => {
     setError('');
     
     try {
-      await axios.post('http://localhost:5000/auth/forgot-password', {
+      const response = await axios.post('http://localhost:5000/auth/forgot-password', {
         email: email
       });
       
       setSuccess('Password reset OTP sent successfully! Please check your email.');
+      watchOtpDelivery(response.data.delivery_id, () => {
+        setSuccess('');
+        setError('We could not deliver the OTP email. Please resend it.');
+      });
       setStep(2);
       startResendTimer();
     } catch (err) {
@@ -36,8 +36,10 @@ const MyApplications = () => {
       setDebugInfo(`Fetching applications for: ${user.email}`);
       
       // Since there's no dedicated user endpoint for admissions yet,
-      // we'll use the admin endpoint and filter
-      const response = await axios.get('http://localhost:5000/admin/admissions');
+      // we'll use the admin endpoint filtered by email on the server
+      const response = await axios.get('http://localhost:5000/admin/admissions', {
+        params: { email: user.email, limit: 500 }
+      });
       
       console.log('Response status:', response.status);
       console.log('Total applications in DB:', response.data.length);
@@ -70,7 +70,9 @@ const MyBookings = () => {
       // Try fallback to admin endpoint with filtering
       try {
         console.log('Trying fallback to admin endpoint...');
-        const fallbackResponse = await axios.get('http://localhost:5000/admin/bookings');
+        const fallbackResponse = await axios.get('http://localhost:5000/admin/bookings', {
+          params: { email: user.email, limit: 500 }
+        });
         
         if (fallbackResponse.data && Array.isArray(fallbackResponse.data)) {
           console.log('Total bookings from admin:', fallbackResponse.data.length);
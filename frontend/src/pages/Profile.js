@@ -2,6 +2,7 @@ import React, { useState, useEffect } from 'react';
 import { useNavigate } from 'react-router-dom';
 import { useAuth } from '../context/AuthContext';
 import axios from 'axios';
+import { watchOtpDelivery } from '../utils/otpDelivery';
 import './css/Profile.css';
 
 const Profile = () => {
@@ -151,11 +152,15 @@ const Profile = () => {
     setUpdateError('');
     
     try {
-      await axios.post('http://localhost:5000/auth/send-profile-update-otp', {
+      const response = await axios.post('http://localhost:5000/auth/send-profile-update-otp', {
         email: updateData.email
       });
       
       setUpdateSuccess('OTP sent successfully! Please check your email.');
+      watchOtpDelivery(response.data.delivery_id, () => {
+        setUpdateSuccess('');
+        setUpdateError('We could not deliver the OTP email. Please resend it.');
+      });
       setStep(2);
       startResendTimer();
     } catch (err) {
@@ -1,6 +1,7 @@
 import React, { useState } from 'react';
 import { useNavigate, Link } from 'react-router-dom';
 import axios from 'axios';
+import { watchOtpDelivery } from '../utils/otpDelivery';
 import './css/Register.css';
 
 const Register = () => {
@@ -103,12 +104,16 @@ const sendOtp = async () => {
   
   try {
     // Make sure to send the category along with email
-    await axios.post('http://localhost:5000/auth/send-registration-otp', {
+    const response = await axios.post('http://localhost:5000/auth/send-registration-otp', {
       email: formData.email,
       category: formData.category  // Add this line
     });
     
     setSuccess('OTP sent successfully! Please check your email.');
+    watchOtpDelivery(response.data.delivery_id, () => {
+      setSuccess('');
+      setError('We could not deliver the OTP email. Please resend it.');
+    });
     setStep(2);
     startResendTimer();
   } catch (err) {
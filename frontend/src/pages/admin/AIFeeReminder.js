@@ -31,11 +31,24 @@ const AIFeeReminder = () => {
   const [emailSent, setEmailSent] = useState(false);
   const [activeTab, setActiveTab] = useState("form");
   const [reminders, setReminders] = useState([]);
+  const [remindersCursor, setRemindersCursor] = useState(null); // keyset paging: id to continue after
   const [recycleBin, setRecycleBin] = useState([]);
   const [showRecycleBin, setShowRecycleBin] = useState(false);
   const [reminderId, setReminderId] = useState(null);
   const [validationErrors, setValidationErrors] = useState({});
   const [sendCount, setSendCount] = useState(0);
+  // Bulk campaign: one reminder per verified admission (School) or booking (Hostel)
+  const [campaignForm, setCampaignForm] = useState({
+    fee_type: "School",
+    group: "",
+    amount: "",
+    due_date: "",
+    tone: "formal",
+    late_fee: "",
+    remarks: ""
+  });
+  const [campaign, setCampaign] = useState(null);
+  const [campaignError, setCampaignError] = useState("");
 
   // Sample data for quick fill
   const sampleData = {
@@ -66,11 +79,52 @@ const AIFeeReminder = () => {
     cleanupRecycleBin();
   }, []);
 
-  const fetchReminders = async () => {
+  // Poll delivery progress while the campaign is being sent
+  useEffect(() => {
+    if (!campaign || campaign.status !== 'sending') return;
+    const timer = setTimeout(async () => {
+      try {
+        const response = await axios.get(`http://localhost:5000/ai/campaigns/${campaign.id}`);
+        if (response.data.success) {
+          setCampaign(response.data.campaign);
+        }
+      } catch (error) {
+        console.error('Error fetching campaign progress:', error);
+      }
+    }, 2000);
+    return () => clearTimeout(timer);
+  }, [campaign]);
+
+  const handleCampaignChange = (e) => {
+    setCampaignForm({ ...campaignForm, [e.target.name]: e.target.value });
+  };
+
+  const startCampaign = async () => {
+    setCampaignError("");
+    if (!campaignForm.amount || !campaignForm.due_date) {
+      setCampaignError("Amount and due date are required");
+      return;
+    }
+    setLoading(true);
+    try {
+      const { group, ...fields } = campaignForm;
+      const payload = { ...fields, [campaignForm.fee_type === 'School' ? 'class' : 'room']: group };
+      const response = await axios.post('http://localhost:5000/ai/campaigns', payload);
+      const progress = await axios.get(`http://localhost:5000/ai/campaigns/${response.data.campaign_id}`);
+      setCampaign(progress.data.campaign);
+    } catch (error) {
+      setCampaignError(error.response?.data?.error || 'Failed to start campaign');
+    } finally {
+      setLoading(false);
+    }
+  };
+
+  const fetchReminders = async (cursor = null) => {
     try {
-      const response = await axios.get('http://localhost:5000/ai/get-reminders');
+      const response = await axios.get('http://localhost:5000/ai/get-reminders', { params: cursor ? { cursor } : {} });
       if (response.data.success) {
-        setReminders(response.data.reminders);
+        setReminders((prev) => (cursor ? [...prev, ...response.data.reminders] : response.data.reminders));
+        setRemindersCursor(response.data.next_cursor);
       }
     } catch (error) {
       console.error('Error fetching reminders:', error);
@@ -180,7 +234,7 @@ const AIFeeReminder = () => {
     } else if (tab === 'history') {
       setShowRecycleBin(false);
       fetchReminders();
-    } else if (tab === 'preview') {
+    } else if (tab === 'preview' || tab === 'campaign') {
       setShowRecycleBin(false);
     }
   };
@@ -542,6 +596,13 @@ const AIFeeReminder = () => {
           <span className="tab-icon">📋</span>
           Recent Reminders
         </button>
+        <button 
+          className={`smartcity-fee-tab ${activeTab === 'campaign' && !showRecycleBin ? 'active' : ''}`}
+          onClick={() => handleTabChange('campaign')}
+        >
+          <span className="tab-icon">📣</span>
+          Campaign
+        </button>
         <button 
           className={`smartcity-fee-tab recycle-bin-tab ${showRecycleBin ? 'active' : ''}`}
           onClick={toggleRecycleBin}
@@ -1008,6 +1069,103 @@ const AIFeeReminder = () => {
           </div>
         )}
 
+        {/* Campaign Tab */}
+        {activeTab === 'campaign' && !showRecycleBin && (
+          <div className="smartcity-fee-form-section">
+            <div className="smartcity-fee-form-header">
+              <h2>Send Reminders to a Whole {campaignForm.fee_type === 'School' ? 'Class or School' : 'Room or Hostel'}</h2>
+            </div>
+
+            <div className="smartcity-fee-form-grid">
+              <div className="smartcity-fee-form-group">
+                <label className="smartcity-fee-label">
+                  <span className="label-icon">🏷️</span>
+                  Fee Type
+                </label>
+                <select name="fee_type" value={campaignForm.fee_type} onChange={handleCampaignChange} className="smartcity-fee-select">
+                  <option value="School">🏫 NextGen School Jauharabad</option>
+                  <option value="Hostel">🏨 Smart City Hostel Jauharabad</option>
+                </select>
+              </div>
+
+              <div className="smartcity-fee-form-group">
+                <label className="smartcity-fee-label">
+                  <span className="label-icon">🏫</span>
+                  {campaignForm.fee_type === 'School' ? 'Class' : 'Room No.'}
+                </label>
+                <input
+                  type="text"
+                  name="group"
+                  value={campaignForm.group}
+                  onChange={handleCampaignChange}
+                  placeholder="Leave empty for everyone"
+                  className="smartcity-fee-input"
+                />
+              </div>
+
+              <div className="smartcity-fee-form-group">
+                <label className="smartcity-fee-label">
+                  <span className="label-icon">💰</span>
+                  Amount (Rs.) *
+                </label>
+                <input type="number" name="amount" value={campaignForm.amount} onChange={handleCampaignChange} className="smartcity-fee-input" />
+              </div>
+
+              <div className="smartcity-fee-form-group">
+                <label className="smartcity-fee-label">
+                  <span className="label-icon">📅</span>
+                  Due Date *
+                </label>
+                <input type="date" name="due_date" value={campaignForm.due_date} onChange={handleCampaignChange} className="smartcity-fee-input" />
+              </div>
+
+              <div className="smartcity-fee-form-group">
+                <label className="smartcity-fee-label">
+                  <span className="label-icon">⚠️</span>
+                  Late Fee (Rs.)
+                </label>
+                <input type="number" name="late_fee" value={campaignForm.late_fee} onChange={handleCampaignChange} className="smartcity-fee-input" />
+              </div>
+
+              <div className="smartcity-fee-form-group">
+                <label className="smartcity-fee-label">
+                  <span className="label-icon">🎭</span>
+                  Message Tone
+                </label>
+                <select name="tone" value={campaignForm.tone} onChange={handleCampaignChange} className="smartcity-fee-select">
+                  <option value="formal">Formal</option>
+                  <option value="friendly">Friendly</option>
+                  <option value="strict">Strict</option>
+                </select>
+              </div>
+            </div>
+
+            {campaignError && <span className="error-text">{campaignError}</span>}
+
+            <div className="smartcity-fee-send-options">
+              <div className="send-buttons">
+                <button className="smartcity-fee-send-email-btn" onClick={startCampaign} disabled={loading || campaign?.status === 'sending'}>
+                  {loading ? <LoadingSpinner /> : (
+                    <>
+                      <span className="btn-icon">📣</span>
+                      Generate & Send Reminders
+                    </>
+                  )}
+                </button>
+              </div>
+            </div>
+
+            {campaign && (
+              <div className="smartcity-fee-success-message">
+                <span className="success-icon">{campaign.status === 'done' ? '✅' : '📤'}</span>
+                Campaign #{campaign.id}: {campaign.progress.sent} of {campaign.total} sent ({campaign.progress.percent}%)
+                {campaign.progress.failed > 0 && `, ${campaign.progress.failed} failed`}
+                {campaign.skipped > 0 && `, ${campaign.skipped} skipped without email`}
+              </div>
+            )}
+          </div>
+        )}
+
         {/* History Tab */}
         {activeTab === 'history' && !showRecycleBin && (
           <div className="smartcity-fee-history-section">
@@ -1042,6 +1200,13 @@ const AIFeeReminder = () => {
                 ))
               )}
             </div>
+            {remindersCursor && (
+              <div style={{ textAlign: 'center', marginTop: '15px' }}>
+                <button className="smartcity-fee-sample-btn" onClick={() => fetchReminders(remindersCursor)}>
+                  Load more
+                </button>
+              </div>
+            )}
           </div>
         )}
 
@@ -12,12 +12,16 @@ function AdminAdmissions() {
   const [newFiles, setNewFiles] = useState({});
   
   const [viewTrash, setViewTrash] = useState(false);
+  const [nextCursor, setNextCursor] = useState(null); // keyset paging: id to continue after
+  const [searchResults, setSearchResults] = useState(null); // server-side search hits (null = no active search)
 
-  const fetchAdmissions = async () => {
+  const fetchAdmissions = async (cursor = null) => {
     try {
-      const res = await fetch("http://127.0.0.1:5000/admin/admissions");
+      // Table rows only need the summary columns; openProfile loads the full record
+      const res = await fetch(`http://127.0.0.1:5000/admin/admissions?fields=summary${cursor ? `&cursor=${cursor}` : ""}`);
+      setNextCursor(res.headers.get("X-Next-Cursor"));
       const data = await res.json();
-      setAdmissions(data);
+      setAdmissions((prev) => (cursor ? [...prev, ...data] : data));
     } catch (err) {
       console.error("Error fetching admissions:", err);
     }
@@ -25,7 +29,7 @@ function AdminAdmissions() {
 
   const fetchTrash = async () => {
     try {
-      const res = await fetch("http://127.0.0.1:5000/admin/admissions/trash");
+      const res = await fetch("http://127.0.0.1:5000/admin/admissions/trash?fields=summary");
       const data = await res.json();
       setTrashAdmissions(data);
     } catch (err) {
@@ -38,10 +42,45 @@ function AdminAdmissions() {
     fetchTrash();
   }, []);
 
+  const openProfile = async (id) => {
+    try {
+      const res = await fetch(`http://127.0.0.1:5000/admin/admissions/${id}`);
+      const student = await res.json();
+      setSelectedStudent(student);
+      setFormData(student);
+      setEditMode(false);
+      setShowDocs(false);
+      setNewFiles({});
+    } catch (err) {
+      console.error("Error fetching admission:", err);
+    }
+  };
+
   const formatRegNo = (id) => `NGS-REG-${String(id).padStart(3, '0')}`;
 
+  // Searches of 2+ characters go to the full-text index instead of filtering only the loaded pages
+  useEffect(() => {
+    const q = searchTerm.trim();
+    // Registration numbers are derived from the id, not indexed, so keep matching them locally
+    if (q.length < 2 || /^ngs-reg/i.test(q)) {
+      setSearchResults(null);
+      return;
+    }
+    const timer = setTimeout(async () => {
+      try {
+        const res = await fetch(`http://127.0.0.1:5000/admin/search?type=admissions&limit=100&q=${encodeURIComponent(q)}`);
+        const data = await res.json();
+        setSearchResults(Array.isArray(data) ? data : []);
+      } catch (err) {
+        console.error("Search error:", err);
+      }
+    }, 250);
+    return () => clearTimeout(timer);
+  }, [searchTerm, admissions]);
+
   const filterList = (list) => {
     const searchStr = searchTerm.toLowerCase();
+    if (searchResults) return searchResults;
     return list.filter((s) => {
         const regNo = formatRegNo(s.id).toLowerCase();
         return (
@@ -197,19 +236,21 @@ function AdminAdmissions() {
                   </td>
                   <td>
                     <button className="delete-btn-sm" title="Move to Trash" onClick={() => handleDelete(s.id)}>🗑️</button>
-                    <button className="view-btn" onClick={() => { 
-                        setSelectedStudent(s); 
-                        setFormData(s); 
-                        setEditMode(false); 
-                        setShowDocs(false); 
-                        setNewFiles({}); 
-                    }}>Profile</button>
+                    <button className="view-btn" onClick={() => openProfile(s.id)}>Profile</button>
                   </td>
                 </tr>
               ))}
             </tbody>
           </table>
 
+          {nextCursor && (
+            <div style={{textAlign: 'center', marginTop: '15px'}}>
+              <button className="delete-btn-sm" style={{width: 'auto', padding: '10px 20px'}} onClick={() => fetchAdmissions(nextCursor)}>
+                Load more
+              </button>
+            </div>
+          )}
+
           {/* RECYCLE BIN ENTRY POINT AT BOTTOM */}
           <div style={{marginTop: '40px', textAlign: 'center', borderTop: '1px solid #ddd', paddingTop: '20px'}}>
              <button className="delete-btn-sm" style={{width: 'auto', padding: '10px 20px'}} onClick={() => setViewTrash(true)}>
@@ -340,26 +381,37 @@ function AdminAdmissions() {
               </div>
             ) : (
               <div className="docs-view">
+                {/* Previews load the downscaled variant; clicking a document opens the original */}
                 <div className="docs-grid">
                     <div className="doc-card">
                         <label>Student Photo</label>
-                        <img src={`http://127.0.0.1:5000/uploads/admissions/${selectedStudent.student_photos_path}`} alt="Student" />
+                        <a href={`http://127.0.0.1:5000/uploads/admissions/${selectedStudent.student_photos_path}`} target="_blank" rel="noreferrer">
+                          <img src={`http://127.0.0.1:5000/uploads/medium/${selectedStudent.student_photos_path}`} loading="lazy" alt="Student" />
+                        </a>
                     </div>
                     <div className="doc-card">
                         <label>B-Form</label>
-                        <img src={`http://127.0.0.1:5000/uploads/admissions/${selectedStudent.b_form_file_path}`} alt="BForm" />
+                        <a href={`http://127.0.0.1:5000/uploads/admissions/${selectedStudent.b_form_file_path}`} target="_blank" rel="noreferrer">
+                          <img src={`http://127.0.0.1:5000/uploads/medium/${selectedStudent.b_form_file_path}`} loading="lazy" alt="BForm" />
+                        </a>
                     </div>
                     <div className="doc-card">
                         <label>CNIC Front</label>
-                        <img src={`http://127.0.0.1:5000/uploads/admissions/${selectedStudent.father_cnic_front_path}`} alt="CNIC Front" />
+                        <a href={`http://127.0.0.1:5000/uploads/admissions/${selectedStudent.father_cnic_front_path}`} target="_blank" rel="noreferrer">
+                          <img src={`http://127.0.0.1:5000/uploads/medium/${selectedStudent.father_cnic_front_path}`} loading="lazy" alt="CNIC Front" />
+                        </a>
                     </div>
                     <div className="doc-card">
                         <label>CNIC Back</label>
-                        <img src={`http://127.0.0.1:5000/uploads/admissions/${selectedStudent.father_cnic_back_path}`} alt="CNIC Back" />
+                        <a href={`http://127.0.0.1:5000/uploads/admissions/${selectedStudent.father_cnic_back_path}`} target="_blank" rel="noreferrer">
+                          <img src={`http://127.0.0.1:5000/uploads/medium/${selectedStudent.father_cnic_back_path}`} loading="lazy" alt="CNIC Back" />
+                        </a>
                     </div>
                     <div className="doc-card">
                         <label>School Certificate</label>
-                        <img src={`http://127.0.0.1:5000/uploads/admissions/${selectedStudent.school_cert_file_path}`} alt="School Cert" />
+                        <a href={`http://127.0.0.1:5000/uploads/admissions/${selectedStudent.school_cert_file_path}`} target="_blank" rel="noreferrer">
+                          <img src={`http://127.0.0.1:5000/uploads/medium/${selectedStudent.school_cert_file_path}`} loading="lazy" alt="School Cert" />
+                        </a>
                     </div>
                     <div className="doc-card signature-card">
                         <label>Digital Signature</label>
@@ -12,6 +12,8 @@ function AdminBookings() {
   const [editId, setEditId] = useState(null);
   const [formData, setFormData] = useState({});
   const [loading, setLoading] = useState(true);
+  const [nextCursor, setNextCursor] = useState(null); // keyset paging: id to continue after
+  const [searchResults, setSearchResults] = useState(null); // server-side search hits (null = no active search)
 
   // Recycle Bin States
   const [showRecycleBin, setShowRecycleBin] = useState(false);
@@ -28,12 +30,16 @@ function AdminBookings() {
     fetchTrash(); // Load trash count on mount
   }, []);
 
-  const fetchBookings = () => {
-    setLoading(true);
-    fetch("http://127.0.0.1:5000/admin/bookings")
-      .then((res) => res.json())
+  const fetchBookings = (cursor = null) => {
+    if (!cursor) setLoading(true);
+    // Table rows only need the summary columns; full records are loaded per id (loadBooking)
+    fetch(`http://127.0.0.1:5000/admin/bookings?fields=summary${cursor ? `&cursor=${cursor}` : ""}`)
+      .then((res) => {
+        setNextCursor(res.headers.get("X-Next-Cursor"));
+        return res.json();
+      })
       .then((d) => {
-        setData(d);
+        setData((prev) => (cursor ? [...prev, ...d] : d));
         setLoading(false);
       })
       .catch((err) => {
@@ -50,7 +56,7 @@ function AdminBookings() {
   };
 
   const fetchTrash = () => {
-    fetch("http://127.0.0.1:5000/admin/recycle_bin")
+    fetch("http://127.0.0.1:5000/admin/recycle_bin?fields=summary")
       .then((res) => res.json())
       .then((d) => {
         if (Array.isArray(d)) {
@@ -141,10 +147,23 @@ function AdminBookings() {
       .catch((err) => console.error("Delete error:", err));
   };
 
-  const startEdit = (item) => {
-    setEditId(item.id);
-    setFormData({ ...item });
-    handleEditRoomChange(item.room_number);
+  const loadBooking = (id) =>
+    fetch(`http://127.0.0.1:5000/admin/bookings/${id}`).then((res) => res.json());
+
+  const openProfile = (id) => {
+    loadBooking(id)
+      .then((item) => { setSelectedProfile(item); setActiveTab("info"); })
+      .catch((err) => console.error("Profile fetch error:", err));
+  };
+
+  const startEdit = (id) => {
+    loadBooking(id)
+      .then((item) => {
+        setEditId(item.id);
+        setFormData({ ...item });
+        handleEditRoomChange(item.room_number);
+      })
+      .catch((err) => console.error("Booking fetch error:", err));
   };
 
   const handleUpdate = () => {
@@ -181,7 +200,23 @@ function AdminBookings() {
       .catch((err) => console.error("Update failed:", err));
   };
 
-  const filteredData = data.filter(
+  // Searches of 2+ characters go to the full-text index instead of filtering only the loaded pages
+  useEffect(() => {
+    const q = searchTerm.trim();
+    if (q.length < 2) {
+      setSearchResults(null);
+      return;
+    }
+    const timer = setTimeout(() => {
+      fetch(`http://127.0.0.1:5000/admin/search?type=bookings&limit=100&q=${encodeURIComponent(q)}`)
+        .then((res) => res.json())
+        .then((d) => setSearchResults(Array.isArray(d) ? d : []))
+        .catch((err) => console.error("Search error:", err));
+    }, 250);
+    return () => clearTimeout(timer);
+  }, [searchTerm, data]);
+
+  const filteredData = searchResults ?? data.filter(
     (item) =>
       (item.student_name && item.student_name.toLowerCase().includes(searchTerm.toLowerCase())) ||
       (item.cnic && item.cnic.includes(searchTerm))
@@ -320,11 +355,11 @@ function AdminBookings() {
                       </span>
                     </td>
                     <td>
-                      <button onClick={() => { setSelectedProfile(item); setActiveTab("info"); }} 
+                      <button onClick={() => openProfile(item.id)} 
                         style={{ cursor: "pointer", border: "1px solid #1e40af", background: "#eff6ff", color: "#1e40af", borderRadius: "4px", padding: "2px 8px", marginRight: "5px" }}>
                         👤 Profile
                       </button>
-                      <button onClick={() => startEdit(item)} className="btn-text-edit">Edit</button>
+                      <button onClick={() => startEdit(item.id)} className="btn-text-edit">Edit</button>
                       
                       {/* Show Verify button only if not Verified */}
                       {item.status !== "Verified" && item.status !== "Rejected" && (
@@ -352,6 +387,11 @@ function AdminBookings() {
                 ))}
               </tbody>
             </table>
+            {nextCursor && (
+              <div style={{ textAlign: "center", marginTop: "15px" }}>
+                <button className="btn-secondary" onClick={() => fetchBookings(nextCursor)}>Load more</button>
+              </div>
+            )}
           </div>
         )}
       </div>
@@ -511,7 +551,10 @@ const DocCard = ({ title, src, isSignature }) => (
   <div className="doc-card">
     <p style={{ fontSize: "11px", color: "#94a3b8", marginBottom: "10px", fontWeight: "600", textTransform: "uppercase" }}>{title}</p>
     {src ? (
-      <img src={`http://127.0.0.1:5000/uploads/${src}`} width="100%" style={{ background: isSignature ? "white" : "transparent", borderRadius: "4px" }} alt={title} />
+      // Previews load the downscaled variant; clicking opens the original
+      <a href={`http://127.0.0.1:5000/uploads/${src}`} target="_blank" rel="noreferrer">
+        <img src={isSignature ? `http://127.0.0.1:5000/uploads/${src}` : `http://127.0.0.1:5000/uploads/medium/${src}`} loading="lazy" width="100%" style={{ background: isSignature ? "white" : "transparent", borderRadius: "4px" }} alt={title} />
+      </a>
     ) : (
       <div style={{ padding: "20px", textAlign: "center", color: "#475569", border: "1px dashed #334155" }}>No file uploaded</div>
     )}
@@ -0,0 +1,21 @@
+import axios from "axios";
+
+// OTP emails are sent in the background; poll the delivery until it is sent or has
+// failed for good, and call onFailed so the page can ask the user to resend.
+export const watchOtpDelivery = async (deliveryId, onFailed, { interval = 2000, timeout = 60000 } = {}) => {
+  if (!deliveryId) return; // development mode: the code is printed on the server
+  const deadline = Date.now() + timeout;
+  while (Date.now() < deadline) {
+    await new Promise((resolve) => setTimeout(resolve, interval));
+    try {
+      const { data } = await axios.get(`http://localhost:5000/auth/otp-status/${deliveryId}`);
+      if (data.status === 'sent') return;
+      if (data.status === 'failed') {
+        onFailed();
+        return;
+      }
+    } catch (err) {
+      return;
+    }
+  }
+};